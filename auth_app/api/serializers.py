@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from auth_app.backends import normalize_email, users_by_email
+from auth_app.hashing import hash_password
 
 
 class LoginWithEmailSerializer(serializers.ModelSerializer):
@@ -24,7 +27,8 @@ class LoginWithEmailSerializer(serializers.ModelSerializer):
     
     def validate(self, data):
         """
-        Validate the login data by checking email and password.
+        Validate the login data by checking email and password
+        with a single lookup through auth_app.backends.EmailBackend.
 
         Args:
             data (dict): The data to validate containing email and password.
@@ -37,12 +41,7 @@ class LoginWithEmailSerializer(serializers.ModelSerializer):
         """
         email = data.get('email')
         password = data.get('password')  
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("Invalid email or password")
-
-        user = authenticate(username=user.username, password=password)
+        user = authenticate(self.context.get('request'), email=email, password=password)
 
         if user is None:
             raise serializers.ValidationError("Invalid email or password")
@@ -75,6 +74,7 @@ class RegistrationSerializer(serializers.ModelSerializer):
         Raises:
             serializers.ValidationError: password don't match
             serializers.ValidationError: the email already exists
+            serializers.ValidationError: the fullname already exists
 
         Returns:
             user data: a user information
@@ -87,11 +87,29 @@ class RegistrationSerializer(serializers.ModelSerializer):
         if pw != repeated_pw:
             raise serializers.ValidationError({'error':'passwords dont match'})
         
-        if User.objects.filter(email = self.validated_data['email']).exists():
-            raise serializers.ValidationError({'error':'this Email already exists'})
-        
-        account = User(email = self.validated_data['email'], username = self.validated_data['fullname'])
-        account.set_password(pw)
-        account.save()
+        email = normalize_email(self.validated_data['email'])
+        fullname = self.validated_data['fullname']
+        self.check_unique(email, fullname)
+
+        account = User(email = email, username = fullname)
+        account.password = hash_password(pw)
+        try:
+            with transaction.atomic():
+                account.save()
+        except IntegrityError:
+            # A concurrent registration took the email or the fullname after the check.
+            self.check_unique(email, fullname)
+            raise
         return account
+
+    def check_unique(self, email, fullname):
+        """ reject an email or a fullname that belongs to another user already.
+
+        Raises:
+            serializers.ValidationError: the email or the fullname already exists
+        """
+        if users_by_email(email).exists():
+            raise serializers.ValidationError({'error':'this Email already exists'})
+        if User.objects.filter(username = fullname).exists():
+            raise serializers.ValidationError({'error':'this Fullname already exists'})
         
\ No newline at end of file
@@ -48,7 +48,7 @@ class LoginView(ObtainAuthToken):
             and 400 if noting was probided or if informatons provided as incorrect.
         """
         
-        serializer = self.serializer_class(data = request.data)
+        serializer = self.serializer_class(data = request.data, context={'request': request})
         data = {}
         if serializer.is_valid():
             user = serializer.validated_data['user']
@@ -68,7 +68,8 @@ class LogoutView(APIView):
 
     def post(self, request):
         """
-        Logout user by delete the token in the Token database
+        Logout user by delete the token in the Token database.
+        Deleting the token also evicts it from the token cache of CachedTokenAuthentication.
         """
         request.user.auth_token.delete() 
         return Response({"detail": "Logout Successfully. Your Token was deleted"}, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class AuthAppConfig(AppConfig):
     name = 'auth_app'
+
+    def ready(self):
+        """
+        Connect the signal handlers that evict cached tokens.
+        """
+        from auth_app import signals  # noqa: F401
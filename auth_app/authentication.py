@@ -0,0 +1,246 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    Bounded LRU of token key -> (user, token) with a time to live.
+
+    The in-process tier is optionally backed by a cache shared by all workers, so
+    that workers can reuse each other's lookups. Evicting a token also marks it as
+    revoked in the shared tier, which every worker checks before trusting its own
+    in-process entry, so evictions take effect everywhere at once. Without a shared
+    tier, the other workers keep their entries until ``local_timeout`` runs out.
+
+    Raises:
+        ImproperlyConfigured: if the shared tier is a cache private to the process.
+    """
+    key_prefix = 'kanmind:token:'
+    revoked_prefix = 'kanmind:token-revoked:'
+
+    def __init__(self, max_size=10000, timeout=60, shared_alias=None, local_timeout=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.local_timeout = timeout if local_timeout is None else local_timeout
+        self.shared = caches[shared_alias] if shared_alias else None
+        if isinstance(self.shared, (LocMemCache, DummyCache)):
+            raise ImproperlyConfigured(f'The token cache alias {shared_alias!r} is not shared between processes.')
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared_key(self, prefix, key):
+        return prefix + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Look a token up in the in-process tier, then in the shared tier.
+
+        Args:
+            key (str): The token key.
+
+        Returns:
+            tuple | None: A copy of the cached ``(user, token)``, or None on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and self.shared is not None:
+            if self.shared.get(self._shared_key(self.revoked_prefix, key)):
+                self.evict(key, revoke=False)
+                return None
+        if entry is None and self.shared is not None:
+            value = self.shared.get(self._shared_key(self.key_prefix, key))
+            if value is not None:
+                self._store(key, value)
+                entry = (None, value)
+        if entry is None:
+            return None
+        user, token = entry[1]
+        return self._copy(user, token)
+
+    def set(self, key, user, token):
+        """
+        Cache the user and token of a valid token key in both tiers.
+        """
+        self._store(key, (user, token))
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(self.revoked_prefix, key))
+            self.shared.set(self._shared_key(self.key_prefix, key), (user, token), self.timeout)
+
+    def evict(self, key, revoke=True):
+        """
+        Remove a token from both tiers.
+
+        Args:
+            key (str): The token key.
+            revoke (bool): Also mark the token as revoked for the other workers.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared is not None and revoke:
+            self.shared.delete(self._shared_key(self.key_prefix, key))
+            self.shared.set(self._shared_key(self.revoked_prefix, key), True, self.timeout)
+
+    def clear(self):
+        """
+        Empty the in-process tier.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.local_timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _copy(self, user, token):
+        user = copy.copy(user)
+        token = copy.copy(token)
+        token.user = user
+        return user, token
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """
+    Get the token cache of this process, configured from the ``KANMIND_TOKEN_CACHE_*`` settings.
+
+    Returns:
+        TokenCache: The shared token cache instance.
+    """
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache(
+                    max_size=getattr(settings, 'KANMIND_TOKEN_CACHE_SIZE', 10000),
+                    timeout=getattr(settings, 'KANMIND_TOKEN_CACHE_TIMEOUT', 60),
+                    shared_alias=getattr(settings, 'KANMIND_TOKEN_CACHE_ALIAS', None),
+                    local_timeout=getattr(settings, 'KANMIND_TOKEN_CACHE_LOCAL_TIMEOUT', None),
+                )
+    return _token_cache
+
+
+def evict_tokens(keys):
+    """
+    Evict token keys from the token cache.
+
+    Args:
+        keys (Iterable[str]): The token keys to evict.
+    """
+    token_cache = get_token_cache()
+    for key in keys:
+        token_cache.evict(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement of DRF's TokenAuthentication that skips the token and
+    user query for tokens seen recently. Entries are evicted by the handlers in
+    auth_app.signals when a token is deleted (logout) or its user is saved.
+    """
+
+    def authenticate_credentials(self, key):
+        """
+        Resolve a token key to its user, from the token cache if possible.
+
+        Args:
+            key (str): The token key sent by the client.
+
+        Raises:
+            AuthenticationFailed: if the token is invalid or its user inactive.
+
+        Returns:
+            tuple: The authenticated user and token.
+        """
+        token_cache = get_token_cache()
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token)
+        return user, token
+
+    async def aauthenticate_credentials(self, key):
+        """
+        Resolve a token key to its user like authenticate_credentials(), with the
+        async ORM on a cache miss, so async views never block their event loop on it.
+
+        Args:
+            key (str): The token key sent by the client.
+
+        Raises:
+            AuthenticationFailed: if the token is invalid or its user inactive.
+
+        Returns:
+            tuple: The authenticated user and token.
+        """
+        token_cache = get_token_cache()
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            token = await self.get_model().objects.select_related('user').aget(key=key)
+        except self.get_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        token_cache.set(key, token.user, token)
+        return token.user, token
+
+
+def get_token_key(request):
+    """
+    Read the token of a plain Django request from the ``Authorization: Token ...`` header,
+    or from the ``token`` query parameter, since browsers cannot send headers with an EventSource.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        str | None: The token key.
+    """
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword == CachedTokenAuthentication.keyword and key.strip():
+        return key.strip()
+    return request.GET.get('token') or None
+
+
+async def aauthenticate_token(request):
+    """
+    Authenticate a plain Django request by its token, for the async views DRF cannot serve.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Raises:
+        AuthenticationFailed: if the token is invalid or its user inactive.
+
+    Returns:
+        User | None: The authenticated user, None if the request carries no token.
+    """
+    key = get_token_key(request)
+    if key is None:
+        return None
+    user, _ = await CachedTokenAuthentication().aauthenticate_credentials(key)
+    return user
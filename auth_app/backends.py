@@ -0,0 +1,73 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+from auth_app.hashing import averify_password, verify_password
+
+
+def normalize_email(email):
+    """
+    Normalize an email address the way it is compared and stored.
+
+    Args:
+        email (str): The email address entered by the user.
+
+    Returns:
+        str: The stripped, lower-cased email address.
+    """
+    return (email or '').strip().lower()
+
+
+def users_by_email(*emails):
+    """
+    Get the users registered with any of the given email addresses.
+
+    The lookup compares ``LOWER(email)`` and excludes empty emails, so it is served
+    by the partial unique index created in auth_app/migrations/0001_unique_user_email.py.
+
+    Args:
+        *emails (str): Email addresses in any case.
+
+    Returns:
+        QuerySet: The matching users.
+    """
+    return User.objects.alias(email_lower=Lower('email')).exclude(email='').filter(
+        email_lower__in=[normalize_email(email) for email in emails]
+    )
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate with email and password in a single indexed lookup.
+
+    Password hashing runs in the bounded pool of auth_app.hashing.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        """
+        Authenticate a user by email and password.
+
+        Args:
+            request (HttpRequest): The current request, if any.
+            email (str): The email address of the user.
+            password (str): The password of the user.
+
+        Returns:
+            User | None: The user if the credentials are valid.
+        """
+        if email is None or password is None:
+            return None
+        user = users_by_email(email).first()
+        if verify_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, email=None, password=None, **kwargs):
+        """
+        Async variant of authenticate() using the async ORM.
+        """
+        if email is None or password is None:
+            return None
+        user = await users_by_email(email).afirst()
+        if await averify_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
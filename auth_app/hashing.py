@@ -0,0 +1,87 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    """
+    Get the bounded thread pool running password hashing for this process.
+
+    At most ``KANMIND_PASSWORD_HASH_WORKERS`` passwords are hashed at the same
+    time, further logins wait for a free slot instead of taking more CPU.
+
+    Returns:
+        ThreadPoolExecutor: The hashing pool.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = getattr(settings, 'KANMIND_PASSWORD_HASH_WORKERS', None) or min(4, os.cpu_count() or 1)
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return _pool
+
+
+def hash_password(raw_password):
+    """
+    Hash a password in the hashing pool.
+
+    Args:
+        raw_password (str): The password to hash.
+
+    Returns:
+        str: The encoded password.
+    """
+    return get_hashing_pool().submit(make_password, raw_password).result()
+
+
+def _upgrade_password(user, raw_password):
+    """
+    Re-hash the password of a user when the hasher settings changed, like Django does on login.
+    """
+    if identify_hasher(user.password).must_update(user.password):
+        user.password = hash_password(raw_password)
+        user.save(update_fields=['password'])
+
+
+def verify_password(user, raw_password):
+    """
+    Check a password against the hash of a user in the hashing pool.
+
+    Args:
+        user (User): The user, or None to spend the same time on an unknown email.
+        raw_password (str): The password sent by the client.
+
+    Returns:
+        bool: True if the password is correct.
+    """
+    if user is None or not user.has_usable_password():
+        hash_password(raw_password)
+        return False
+    if not get_hashing_pool().submit(check_password, raw_password, user.password).result():
+        return False
+    _upgrade_password(user, raw_password)
+    return True
+
+
+async def averify_password(user, raw_password):
+    """
+    Async variant of verify_password() that awaits the hashing pool instead of
+    blocking the event loop.
+    """
+    pool = get_hashing_pool()
+    if user is None or not user.has_usable_password():
+        await asyncio.wrap_future(pool.submit(make_password, raw_password))
+        return False
+    if not await asyncio.wrap_future(pool.submit(check_password, raw_password, user.password)):
+        return False
+    if identify_hasher(user.password).must_update(user.password):
+        user.password = await asyncio.wrap_future(pool.submit(make_password, raw_password))
+        await user.asave(update_fields=['password'])
+    return True
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+UNIQUE_EMAIL = models.UniqueConstraint(
+    Lower('email'),
+    name='auth_user_email_ci_unique',
+    condition=~models.Q(email=''),
+)
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Refuse to create the unique index while users share an email address.
+    """
+    User = apps.get_model('auth', 'User')
+    duplicates = (
+        User.objects.using(schema_editor.connection.alias)
+        .exclude(email='')
+        .annotate(email_lower=Lower('email'))
+        .values('email_lower')
+        .annotate(count=models.Count('id'))
+        .filter(count__gt=1)
+        .values_list('email_lower', flat=True)
+    )
+    duplicates = list(duplicates)
+    if duplicates:
+        raise RuntimeError(
+            'Cannot make user emails unique, these emails are used by several accounts '
+            f'(ignoring case): {", ".join(sorted(duplicates))}. Merge or change them and migrate again.'
+        )
+
+
+def add_unique_email(apps, schema_editor):
+    schema_editor.add_constraint(apps.get_model('auth', 'User'), UNIQUE_EMAIL)
+
+
+def remove_unique_email(apps, schema_editor):
+    schema_editor.remove_constraint(apps.get_model('auth', 'User'), UNIQUE_EMAIL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunPython(add_unique_email, remove_unique_email),
+    ]
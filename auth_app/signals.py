@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from auth_app.authentication import evict_tokens
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """
+    Evict a deleted token, e.g. on logout, from the token cache.
+    """
+    evict_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def evict_user_tokens(sender, instance, created, **kwargs):
+    """
+    Evict the tokens of a saved user, so that deactivations and profile
+    changes are seen by the next request.
+    """
+    if not created:
+        evict_tokens(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
@@ -1,3 +1,169 @@
-from django.test import TestCase
+import tempfile
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from auth_app.api.serializers import RegistrationSerializer
+from auth_app.authentication import TokenCache, get_token_cache
+from auth_app.backends import EmailBackend
 
-# Create your tests here.
+
+class CachedTokenAuthenticationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user', 'user@example.com', 'secret-pw')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, len(ctx.captured_queries)
+
+    def test_cached_token_saves_one_query_per_request(self):
+        first, cold = self.count_queries('/api/boards/')
+        second, warm = self.count_queries('/api/boards/')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(cold - warm, 1)
+
+    def test_logout_evicts_token(self):
+        self.client.get('/api/boards/')
+
+        response = self.client.post('/api/logout/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/boards/').status_code, 401)
+
+    def test_deactivation_evicts_token(self):
+        self.client.get('/api/boards/')
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get('/api/boards/').status_code, 401)
+
+
+class TokenCacheTests(APITestCase):
+    def test_least_recently_used_entries_are_dropped(self):
+        token_cache = TokenCache(max_size=2, timeout=60)
+        for key in ('a', 'b'):
+            token_cache.set(key, User(username=key), Token(key=key))
+        token_cache.get('a')
+        token_cache.set('c', User(username='c'), Token(key='c'))
+
+        self.assertIsNone(token_cache.get('b'))
+        self.assertEqual(token_cache.get('a')[0].username, 'a')
+
+    def test_expired_entries_are_dropped(self):
+        token_cache = TokenCache(timeout=0)
+        token_cache.set('a', User(username='a'), Token(key='a'))
+
+        self.assertIsNone(token_cache.get('a'))
+
+    def use_shared_cache(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name},
+        })
+        shared.enable()
+        self.addCleanup(shared.disable)
+
+    def test_shared_tier_revocation_is_seen_by_other_workers(self):
+        self.use_shared_cache()
+        worker, other_worker = TokenCache(shared_alias='shared'), TokenCache(shared_alias='shared')
+        worker.set('a', User(username='a'), Token(key='a'))
+        self.assertEqual(other_worker.get('a')[0].username, 'a')
+
+        worker.evict('a')
+
+        self.assertIsNone(other_worker.get('a'))
+        self.assertIsNone(worker.get('a'))
+
+    def test_per_process_caches_are_refused_as_shared_tier(self):
+        with self.assertRaises(ImproperlyConfigured):
+            TokenCache(shared_alias='default')
+
+    def test_entries_of_other_workers_expire_after_the_local_timeout(self):
+        token_cache = TokenCache(timeout=60, local_timeout=2)
+        token_cache.set('a', User(username='a'), Token(key='a'))
+        self.assertIsNotNone(token_cache.get('a'))
+
+        with mock.patch('auth_app.authentication.time.monotonic', return_value=time.monotonic() + 3):
+            self.assertIsNone(token_cache.get('a'))
+
+
+class EmailLoginTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user', 'user@example.com', 'secret-pw')
+
+    def test_login_ignores_email_case(self):
+        response = self.client.post('/api/login/', {'email': 'User@Example.com', 'password': 'secret-pw'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user_id'], self.user.pk)
+
+    def test_backend_authenticates_with_one_lookup(self):
+        with self.assertNumQueries(1):
+            user = EmailBackend().authenticate(None, email='user@example.com', password='secret-pw')
+
+        self.assertEqual(user, self.user)
+        self.assertIsNone(EmailBackend().authenticate(None, email='user@example.com', password='wrong'))
+        self.assertIsNone(EmailBackend().authenticate(None, email='nobody@example.com', password='secret-pw'))
+
+    def test_registration_rejects_email_in_other_case(self):
+        response = self.client.post('/api/registration/', {
+            'fullname': 'other', 'email': 'USER@example.com', 'password': 'pw', 'repeated_password': 'pw',
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(User.objects.count(), 1)
+
+
+    def test_registration_rejects_a_taken_fullname_as_such(self):
+        response = self.client.post('/api/registration/', {
+            'fullname': 'user', 'email': 'other@example.com', 'password': 'pw', 'repeated_password': 'pw',
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'this Fullname already exists'})
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_registration_race_reports_the_taken_email(self):
+        check_unique = RegistrationSerializer.check_unique
+
+        def register_concurrently(serializer, email, fullname):
+            if not User.objects.filter(username='first').exists():
+                User.objects.create_user('first', 'race@example.com', 'pw')
+                return None
+            return check_unique(serializer, email, fullname)
+
+        with mock.patch.object(RegistrationSerializer, 'check_unique', autospec=True, side_effect=register_concurrently):
+            response = self.client.post('/api/registration/', {
+                'fullname': 'second', 'email': 'Race@example.com', 'password': 'pw', 'repeated_password': 'pw',
+            })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'this Email already exists'})
+
+
+class UniqueEmailIndexTests(TestCase):
+    def test_database_rejects_duplicate_emails_in_any_case(self):
+        User.objects.create_user('first', 'same@example.com', 'pw')
+        User.objects.create_user('blank', '', 'pw')
+        User.objects.create_user('other-blank', '', 'pw')
+
+        with self.assertRaises(IntegrityError):
+            User.objects.create_user('second', 'SAME@example.com', 'pw')
@@ -0,0 +1,134 @@
+"""
+gunicorn configuration of the production server:
+
+    gunicorn -c core/gunicorn.conf.py
+
+The app is preloaded and warmed up in the master (core/warmup.py), so workers fork
+ready to serve. Workers are recycled after ``max_requests`` requests and finish their
+requests in flight within ``graceful_timeout`` on SIGTERM. Cold start (config loaded
+to master ready) and time to first request of each worker are logged. The ``token``
+query parameter, which browsers send to /api/events/, is redacted from the access log.
+
+Environment variables:
+    KANMIND_BIND: Address to listen on, ``0.0.0.0:8000`` by default.
+    KANMIND_WORKER_CLASS: ``uvicorn`` (ASGI, default) or ``gthread`` (WSGI). The event
+        stream /api/events/ needs ASGI and answers 501 under WSGI.
+    KANMIND_WORKERS: Number of workers, derived from the CPU count by default.
+    KANMIND_THREADS: Threads per gthread worker, 4 by default.
+    KANMIND_MAX_REQUESTS: Requests after which a worker is replaced, 0 to never replace it.
+"""
+import logging
+import multiprocessing
+import os
+import re
+import time
+
+STARTED = time.monotonic()
+
+ASGI = os.environ.get('KANMIND_WORKER_CLASS', 'uvicorn') != 'gthread'
+CPUS = multiprocessing.cpu_count()
+
+wsgi_app = 'core.asgi:application' if ASGI else 'core.wsgi:application'
+bind = os.environ.get('KANMIND_BIND', '0.0.0.0:8000')
+# Thread workers wait on the database, so run more of them than cores;
+# an event loop per core is enough for ASGI workers.
+worker_class = 'uvicorn.workers.UvicornWorker' if ASGI else 'gthread'
+workers = int(os.environ.get('KANMIND_WORKERS', CPUS if ASGI else 2 * CPUS + 1))
+threads = int(os.environ.get('KANMIND_THREADS', 4))
+
+preload_app = True
+max_requests = int(os.environ.get('KANMIND_MAX_REQUESTS', 1000))
+# Spread the restarts, so that workers started together are not all recycled together.
+max_requests_jitter = max_requests // 10
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+TOKEN_PARAMETER = re.compile(r'(^|[?&])token=[^&\s"]*')
+
+
+class RedactTokenFilter(logging.Filter):
+    """
+    Replace the value of ``token`` query parameters in the arguments of access log records,
+    the atoms of gthread workers as well as the request path of uvicorn workers.
+    """
+
+    def redact(self, value):
+        return TOKEN_PARAMETER.sub(r'\1token=[redacted]', value) if isinstance(value, str) else value
+
+    def filter(self, record):
+        if isinstance(record.args, dict):
+            record.args = {key: self.redact(value) for key, value in record.args.items()}
+        elif record.args:
+            record.args = tuple(self.redact(value) for value in record.args)
+        return True
+
+
+def when_ready(server):
+    """
+    Warm up the preloaded app in the master, right before the workers are forked.
+    """
+    from django.conf import settings
+    from core.warmup import release_connections, warm_up
+
+    if server.cfg.workers > 1 and not settings.KANMIND_TOKEN_CACHE_ALIAS:
+        server.log.warning(
+            'No shared cache (KANMIND_REDIS_URL): a logout reaches the token caches of the other workers '
+            'only after %s seconds.', settings.KANMIND_TOKEN_CACHE_LOCAL_TIMEOUT,
+        )
+    if server.cfg.workers > 1 and getattr(settings, 'KANMIND_EVENT_BROKER', 'kanmind_app.events.LocalBroker') == 'kanmind_app.events.LocalBroker':
+        server.log.warning('The LocalBroker streams the changes made in the same worker only, run a single worker for /api/events/.')
+    timings = warm_up()
+    # warm_up() checked that the databases accept connections, but forked workers
+    # must not share the master's connections or pool: every worker opens its own.
+    release_connections()
+    steps = ', '.join(f'{name} {seconds * 1000:.0f} ms' for name, seconds in timings.items())
+    server.log.info('Cold start took %.0f ms (warm-up: %s).', (time.monotonic() - STARTED) * 1000, steps)
+
+
+def post_fork(server, worker):
+    """
+    Remember when a worker was forked, for the time to its first request.
+    """
+    worker.forked_at = time.monotonic()
+
+
+def post_worker_init(worker):
+    """
+    Keep tokens out of the access log of the worker, and time the first request of
+    ASGI workers, for which gunicorn does not call pre_request().
+    """
+    redact_tokens = RedactTokenFilter()
+    worker.log.access_log.addFilter(redact_tokens)
+    logging.getLogger('uvicorn.access').addFilter(redact_tokens)
+    if ASGI:
+        application = worker.wsgi
+
+        async def timed_application(scope, receive, send):
+            if scope['type'] == 'http':
+                log_first_request(worker)
+            return await application(scope, receive, send)
+
+        worker.wsgi = timed_application
+
+
+def pre_request(worker, req):
+    """
+    Log the time to the first request of a worker. Called by thread workers only.
+    """
+    log_first_request(worker)
+
+
+def log_first_request(worker):
+    """
+    Log the time to the first request of a worker, once.
+    """
+    if getattr(worker, 'first_request_at', None) is None:
+        worker.first_request_at = time.monotonic()
+        worker.log.info(
+            'Worker %s got its first request %.0f ms after forking, %.0f ms after the server started.',
+            worker.pid, (worker.first_request_at - worker.forked_at) * 1000, (worker.first_request_at - STARTED) * 1000,
+        )
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'kanmind_app.middleware.QueryTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -56,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'kanmind_app.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -81,13 +85,116 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# KANMIND_DB_PROFILE selects 'sqlite' (default) or 'postgres'. Connections are
+# kept open between requests (CONN_MAX_AGE) and checked before reuse.
+KANMIND_DB_PROFILE = os.environ.get('KANMIND_DB_PROFILE', 'sqlite')
+
+if KANMIND_DB_PROFILE == 'postgres':
+    # Pooled connections (psycopg[pool], see requirements.txt), or persistent ones with KANMIND_DB_POOL_SIZE=0.
+    KANMIND_DB_POOL_SIZE = int(os.environ.get('KANMIND_DB_POOL_SIZE', 10))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('KANMIND_DB_NAME', 'kanmind'),
+            'USER': os.environ.get('KANMIND_DB_USER', 'kanmind'),
+            'PASSWORD': os.environ.get('KANMIND_DB_PASSWORD', ''),
+            'HOST': os.environ.get('KANMIND_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('KANMIND_DB_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if KANMIND_DB_POOL_SIZE else int(os.environ.get('KANMIND_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {'min_size': 1, 'max_size': KANMIND_DB_POOL_SIZE, 'timeout': 10},
+            } if KANMIND_DB_POOL_SIZE else {},
+        }
+    }
+else:
+    # WAL lets readers run next to the writer, synchronous=NORMAL is durable in WAL mode
+    # short of a power loss, and the page cache (20 MB) and memory map (128 MB) save reads.
+    # Transactions take the write lock when they start, and wait for it up to ``timeout``
+    # seconds, instead of failing with "database is locked" when upgrading a read lock.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('KANMIND_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('KANMIND_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=134217728;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA temp_store=MEMORY'
+                ),
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # A file, so that the concurrency tests run with the pragmas above,
+            # kept in the temporary directory rather than the source tree.
+            'TEST': {'NAME': Path(tempfile.gettempdir()) / 'kanmind_test_db.sqlite3'},
+        }
+    }
+
+# Optional read replica of the primary, added as the 'replica' alias: a copy of the
+# SQLite file kept in sync by e.g. litestream (KANMIND_SQLITE_REPLICA_PATH), or a
+# PostgreSQL standby (KANMIND_DB_REPLICA_HOST). In tests, the SQLite replica is a
+# second file that stays empty unless written to, the standby mirrors the primary.
+if KANMIND_DB_PROFILE == 'postgres' and os.environ.get('KANMIND_DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['KANMIND_DB_REPLICA_HOST'],
+        'TEST': {'MIRROR': 'default'},
     }
+elif KANMIND_DB_PROFILE != 'postgres' and os.environ.get('KANMIND_SQLITE_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['KANMIND_SQLITE_REPLICA_PATH'],
+        'TEST': {'NAME': Path(tempfile.gettempdir()) / 'kanmind_test_replica.sqlite3'},
+    }
+
+DATABASE_ROUTERS = ['kanmind_app.routers.ReplicaRouter']
+
+# Safe-method requests of the kanmind_app views read from this alias, except for
+# KANMIND_REPLICA_PIN_SECONDS after a write of the same user, who then reads from the
+# primary to see their own writes. The pins must live in a cache shared by all workers.
+KANMIND_READ_REPLICA_ALIAS = 'replica' if 'replica' in DATABASES else None
+KANMIND_REPLICA_PIN_SECONDS = 5
+KANMIND_REPLICA_PIN_CACHE_ALIAS = 'default'
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'kanmind-responses',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 500,
+        },
+    },
 }
 
+# A cache shared by all workers and processes, e.g. redis://localhost:6379/0. The
+# locmem caches above are private to each process.
+if os.environ.get('KANMIND_REDIS_URL'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['KANMIND_REDIS_URL'],
+    }
+
+# Cache alias and lifetime (seconds) of the boards each user can access
+KANMIND_ACCESS_CACHE_ALIAS = 'default'
+
+KANMIND_ACCESS_CACHE_TIMEOUT = 300
+
+# Cache alias of the rendered board detail responses, keyed by board version
+KANMIND_RESPONSE_CACHE_ALIAS = 'responses'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -108,6 +215,16 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Email login is a single indexed lookup, usernames still work for the admin
+AUTHENTICATION_BACKENDS = [
+    'auth_app.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Number of passwords hashed at the same time per process (defaults to the CPU count, at most 4)
+KANMIND_PASSWORD_HASH_WORKERS = None
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
@@ -127,6 +244,9 @@ STATIC_URL = 'static/'
 
 STATIC_ROOT = BASE_DIR / 'static'
 
+# Uploaded files, i.e. the files of imports
+MEDIA_ROOT = os.environ.get('KANMIND_MEDIA_ROOT', BASE_DIR / 'media')
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -138,11 +258,93 @@ REST_FRAMEWORK = {
      'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.BasicAuthentication',
         # 'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'auth_app.authentication.CachedTokenAuthentication',
     ]
     
 }
 
+# Token cache of CachedTokenAuthentication: entries and lifetime (seconds), and the alias
+# of a cache shared by all workers, through which logouts, token deletions and deactivations
+# evict a token in every worker at once. Without it, other workers do not hear of evictions,
+# so each keeps its entries for KANMIND_TOKEN_CACHE_LOCAL_TIMEOUT seconds only.
+KANMIND_TOKEN_CACHE_SIZE = 10000
+
+KANMIND_TOKEN_CACHE_TIMEOUT = 60
+
+KANMIND_TOKEN_CACHE_ALIAS = 'shared' if 'shared' in CACHES else None
+
+KANMIND_TOKEN_CACHE_LOCAL_TIMEOUT = KANMIND_TOKEN_CACHE_TIMEOUT if KANMIND_TOKEN_CACHE_ALIAS else 2
+
+# Opt-in keyset pagination of the list endpoints (?page_size=...&cursor=...)
+KANMIND_PAGE_SIZE = 50
+
+KANMIND_MAX_PAGE_SIZE = 200
+
+# Largest number of items accepted by POST /api/tasks/bulk/
+KANMIND_BULK_MAX_ITEMS = 500
+
+# Rows read per query by the board export (GET /api/boards/<pk>/export/)
+KANMIND_EXPORT_BATCH_SIZE = 2000
+
+# Imports (POST /api/imports/ and the import_kanmind command): rows validated, inserted and
+# committed together, and the number of row errors kept on the job (all are counted).
+KANMIND_IMPORT_BATCH_SIZE = 500
+
+KANMIND_IMPORT_MAX_ERRORS = 1000
+
+# Board change feed (GET /api/events/): the broker fanning out events, the number of
+# events kept for resuming clients, the events queued per slow client and the seconds
+# between keep-alive comments. The LocalBroker only reaches streams of its own process.
+KANMIND_EVENT_BROKER = 'kanmind_app.events.LocalBroker'
+
+KANMIND_EVENT_BUFFER_SIZE = 1000
+
+KANMIND_EVENT_QUEUE_SIZE = 100
+
+KANMIND_EVENT_HEARTBEAT = 15
+
+# Days the tombstones of deleted tasks and comments are kept for delta sync
+# (GET /api/boards/<pk>/changes/), see the compact_tombstones command
+KANMIND_TOMBSTONE_RETENTION_DAYS = 30
+
+# Request timing (kanmind_app.middleware.QueryTimingMiddleware): whether responses carry
+# a Server-Timing header, and when the log line of a request becomes a warning, i.e.
+# from this many milliseconds or this many runs of the same SQL statement (N+1 queries).
+KANMIND_SERVER_TIMING = True
+
+KANMIND_TIMING_SLOW_MS = 500
+
+KANMIND_TIMING_DUPLICATE_QUERIES = 5
+
+# Profiling (kanmind_app.middleware.ProfilingMiddleware): the share of requests profiled
+# per URL name ('*' for the others), where the profiles go and how many bytes of them
+# are kept. Staff users can profile single requests with the X-Kanmind-Profile: 1 header.
+KANMIND_PROFILE_RATES = {}
+
+KANMIND_PROFILE_DIR = os.environ.get('KANMIND_PROFILE_DIR', BASE_DIR / 'profiles')
+
+KANMIND_PROFILE_MAX_BYTES = 50 * 1024 * 1024
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'kanmind_app.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('KANMIND_TIMING_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+        'kanmind_app.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5500",
     "http://localhost:5500",
@@ -0,0 +1,84 @@
+"""
+Warm-up of a server process before it accepts traffic.
+
+gunicorn (core/gunicorn.conf.py) calls warm_up() in the master process once the
+preloaded application is imported, so every forked worker starts with resolved
+URLs, populated model metadata and imported serializers and renderers, instead of
+paying for them on its first requests. Database connections cannot be shared across
+a fork: the master only checks that every database accepts connections, then releases
+them with release_connections().
+"""
+import time
+from contextlib import contextmanager
+from django.apps import apps
+from django.db import connections
+from django.urls import get_resolver
+
+
+@contextmanager
+def timed(timings, name):
+    """
+    Store the seconds spent in the block as ``timings[name]``.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - started
+
+
+def warm_up():
+    """
+    Load everything the first requests of a process would otherwise load lazily.
+
+    Returns:
+        dict: Seconds spent per step, keyed ``urls``, ``models``, ``serializers`` and ``database``.
+    """
+    timings = {}
+    with timed(timings, 'urls'):
+        # Populating the resolver imports every view module, and with them the serializers.
+        get_resolver().reverse_dict
+    with timed(timings, 'models'):
+        for model in apps.get_models():
+            model._meta.get_fields()
+    with timed(timings, 'serializers'):
+        warm_serializers()
+    with timed(timings, 'database'):
+        warm_connections()
+    return timings
+
+
+def warm_serializers():
+    """
+    Build the fields of every serializer once, which fills the model and DRF
+    caches they read, and import the configured renderers, parsers and authenticators.
+    """
+    from rest_framework.serializers import Serializer
+    from rest_framework.settings import api_settings
+    from auth_app.api import serializers as auth_serializers
+    from kanmind_app.api import serializers as kanmind_serializers
+
+    for setting in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES'):
+        getattr(api_settings, setting)
+    for module in (auth_serializers, kanmind_serializers):
+        for value in vars(module).values():
+            if isinstance(value, type) and issubclass(value, Serializer) and value.__module__ == module.__name__:
+                value().fields
+
+
+def warm_connections():
+    """
+    Open the connection of every configured database, failing early if one is unreachable.
+    """
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def release_connections():
+    """
+    Close the connections and connection pools of this process, before it forks workers.
+    """
+    for connection in connections.all():
+        connection.close()
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
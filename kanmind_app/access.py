@@ -0,0 +1,228 @@
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from kanmind_app.models import Board, Task
+
+ACCESS_CACHE_KEY = 'kanmind:board-access:{user_id}'
+
+_cache_counters = {'hits': 0, 'misses': 0}
+_cache_counters_lock = threading.Lock()
+
+
+def access_cache():
+    """
+    Get the cache holding the board access of each user, ``KANMIND_ACCESS_CACHE_ALIAS``.
+    """
+    return caches[getattr(settings, 'KANMIND_ACCESS_CACHE_ALIAS', 'default')]
+
+
+def _count_cache_lookup(hit):
+    with _cache_counters_lock:
+        _cache_counters['hits' if hit else 'misses'] += 1
+
+
+def access_cache_stats():
+    """
+    Get the number of access cache hits and misses of this process.
+
+    Returns:
+        dict: ``hits`` and ``misses`` counters.
+    """
+    with _cache_counters_lock:
+        return dict(_cache_counters)
+
+
+def reset_access_cache_stats():
+    """
+    Reset the access cache hit and miss counters of this process.
+    """
+    with _cache_counters_lock:
+        _cache_counters.update(hits=0, misses=0)
+
+
+def invalidate_board_access(user_ids):
+    """
+    Drop the cached board access of the given users.
+
+    The entries are dropped right away and again once the current transaction
+    commits, so a request reading the old membership in between cannot put a
+    stale entry back.
+
+    Args:
+        user_ids (Iterable[int]): IDs of the users whose boards changed.
+    """
+    keys = [ACCESS_CACHE_KEY.format(user_id=user_id) for user_id in set(user_ids) if user_id is not None]
+    if not keys:
+        return
+    cache = access_cache()
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class BoardAccess:
+    """
+    The boards a user can read and the boards they own, loaded with one query.
+
+    Permission classes get it through get_board_access(), which memoizes it on the
+    request, so stacked permission checks never repeat the membership query. Across
+    requests it is kept in the access cache until kanmind_app.signals invalidates it.
+    """
+
+    def __init__(self, user_id, readable_board_ids, owned_board_ids):
+        self.user_id = user_id
+        self.readable_board_ids = frozenset(readable_board_ids)
+        self.owned_board_ids = frozenset(owned_board_ids)
+        self._task_board_ids = {}
+
+    @classmethod
+    def load(cls, user, use_cache=True):
+        """
+        Load the boards the user owns or is a member of, from the access cache if possible.
+
+        Args:
+            user (User): The user whose access should be loaded.
+            use_cache (bool): False to read the database even if the access is cached,
+                e.g. right after the membership of the user changed.
+
+        Returns:
+            BoardAccess: The access of the user, empty for anonymous users.
+        """
+        if not user.is_authenticated:
+            return cls(None, [], [])
+        cache = access_cache()
+        key = ACCESS_CACHE_KEY.format(user_id=user.pk)
+        if use_cache:
+            cached = cache.get(key)
+            _count_cache_lookup(cached is not None)
+            if cached is not None:
+                return cls(user.pk, *cached)
+
+        # Read from the primary even on replica reads: a lagging replica would put an
+        # outdated membership into the cache for the whole cache timeout.
+        access = cls.from_rows(user, Board.objects.using(DEFAULT_DB_ALIAS).for_user(user).values_list('id', 'owner_id'))
+        cache.set(key, (access.readable_board_ids, access.owned_board_ids), getattr(settings, 'KANMIND_ACCESS_CACHE_TIMEOUT', 300))
+        return access
+
+    @classmethod
+    async def aload(cls, user, use_cache=True):
+        """
+        Load the access of the user like load(), with the async cache and ORM APIs.
+
+        Args:
+            user (User): The user whose access should be loaded.
+            use_cache (bool): False to read the database even if the access is cached.
+
+        Returns:
+            BoardAccess: The access of the user, empty for anonymous users.
+        """
+        if not user.is_authenticated:
+            return cls(None, [], [])
+        cache = access_cache()
+        key = ACCESS_CACHE_KEY.format(user_id=user.pk)
+        if use_cache:
+            cached = await cache.aget(key)
+            _count_cache_lookup(cached is not None)
+            if cached is not None:
+                return cls(user.pk, *cached)
+
+        rows = [row async for row in Board.objects.using(DEFAULT_DB_ALIAS).for_user(user).values_list('id', 'owner_id')]
+        access = cls.from_rows(user, rows)
+        await cache.aset(key, (access.readable_board_ids, access.owned_board_ids), getattr(settings, 'KANMIND_ACCESS_CACHE_TIMEOUT', 300))
+        return access
+
+    @classmethod
+    def from_rows(cls, user, rows):
+        """
+        Build the access of the user from the ``(board_id, owner_id)`` rows of their boards.
+        """
+        readable, owned = set(), set()
+        for board_id, owner_id in rows:
+            readable.add(board_id)
+            if owner_id == user.pk:
+                owned.add(board_id)
+        return cls(user.pk, readable, owned)
+
+    def can_read(self, board_id):
+        """
+        Check whether the user owns or is a member of the board.
+
+        Args:
+            board_id (int): ID of the board.
+
+        Returns:
+            bool: True if the user has read access.
+        """
+        return board_id in self.readable_board_ids
+
+    def owns(self, board_id):
+        """
+        Check whether the user owns the board.
+
+        Args:
+            board_id (int): ID of the board.
+
+        Returns:
+            bool: True if the user is the board owner.
+        """
+        return board_id in self.owned_board_ids
+
+    def task_board_id(self, task_id):
+        """
+        Get the board of a task, looking it up at most once per task.
+
+        Args:
+            task_id (int): ID of the task.
+
+        Returns:
+            int | None: ID of the board, or None if the task does not exist.
+        """
+        if task_id not in self._task_board_ids:
+            self._task_board_ids[task_id] = Task.objects.filter(id=task_id).values_list('board_id', flat=True).first()
+        return self._task_board_ids[task_id]
+
+    async def atask_board_id(self, task_id):
+        """
+        Get the board of a task like task_board_id(), with the async ORM. Async views
+        call it before the permission checks, which then read the memoized board.
+        """
+        if task_id not in self._task_board_ids:
+            self._task_board_ids[task_id] = await Task.objects.filter(id=task_id).values_list('board_id', flat=True).afirst()
+        return self._task_board_ids[task_id]
+
+
+def get_board_access(request):
+    """
+    Get the board access of the requesting user, loading it once per request.
+
+    Args:
+        request (Request): The DRF or Django request object.
+
+    Returns:
+        BoardAccess: The memoized access of the user.
+    """
+    http_request = getattr(request, '_request', request)
+    access = getattr(http_request, '_board_access', None)
+    if access is None or access.user_id != request.user.pk:
+        access = BoardAccess.load(request.user)
+        http_request._board_access = access
+    return access
+
+
+async def aget_board_access(request):
+    """
+    Get the board access of the requesting user like get_board_access(), loading it
+    with BoardAccess.aload(), so the permission classes find it memoized.
+
+    Args:
+        request (Request): The DRF or Django request object.
+
+    Returns:
+        BoardAccess: The memoized access of the user.
+    """
+    http_request = getattr(request, '_request', request)
+    access = getattr(http_request, '_board_access', None)
+    if access is None or access.user_id != request.user.pk:
+        access = await BoardAccess.aload(request.user)
+        http_request._board_access = access
+    return access
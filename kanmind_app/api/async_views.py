@@ -0,0 +1,238 @@
+from abc import ABC, abstractmethod
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import F, Prefetch
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from auth_app.authentication import CachedTokenAuthentication, aauthenticate_token
+from kanmind_app.access import aget_board_access
+from kanmind_app.models import Board, Comment, Task
+from kanmind_app.routers import areplica_alias_for, reset_read_alias, set_read_alias
+from .conditional import aconditional_response, alist_fingerprint, make_etag
+from .pagination import BoardPagination, CommentPagination, TaskPagination
+from .permissions import CanManageComment, IsBoardOwnerOrMember, IsOwnerAndDeleteOnly
+from .response_cache import response_cache, response_cache_key
+from .serializers import BoardDetailReadSerializer, BoardSerializer, CommentSerializer, TaskDetailValuesSerializer
+
+
+class AsyncReadView(View, ABC):
+    """
+    Base of the async variants of the read endpoints, served without a thread per request under ASGI.
+
+    DRF views are synchronous, so these views authenticate the ``Authorization: Token``
+    header, load the board access and query the database with Django's async APIs.
+    The permission classes of the DRF views are reused unchanged: they only read the
+    board access, which is loaded before they run. Responses carry the same bodies
+    and errors as the DRF views, and are read from the replica like ReplicaReadMixin does.
+    """
+    http_method_names = ['get']
+    permission_classes = [IsAuthenticated]
+    serializer_class = None
+
+    async def get(self, request, *args, **kwargs):
+        token = None
+        try:
+            request = await self.initial(request)
+            token = set_read_alias(await areplica_alias_for(request.user))
+            return await self.respond(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+        finally:
+            if token is not None:
+                reset_read_alias(token)
+
+    async def initial(self, request):
+        """
+        Authenticate the request, load the board access of the user and check the permissions.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Raises:
+            APIException: if the request is not authenticated or not permitted.
+
+        Returns:
+            Request: The request wrapped for the permission classes and serializers.
+        """
+        user = await aauthenticate_token(request)
+        request = self.request = Request(request)
+        request.user = user or AnonymousUser()
+        if user is None:
+            raise exceptions.NotAuthenticated()
+        await aget_board_access(request)
+        await self.load_permission_data(request)
+        for permission in self.get_permissions():
+            if not permission.has_permission(request, self):
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+        return request
+
+    async def load_permission_data(self, request):
+        """
+        Load what the permission classes read besides the board access.
+        """
+
+    def get_permissions(self):
+        return [permission() for permission in self.permission_classes]
+
+    def check_object_permissions(self, request, obj):
+        """
+        Check the object permissions like DRF views do.
+
+        Raises:
+            PermissionDenied: if a permission class refuses the object.
+        """
+        for permission in self.get_permissions():
+            if not permission.has_object_permission(request, self, obj):
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('context', {'request': self.request, 'view': self})
+        return self.serializer_class(*args, **kwargs)
+
+    @abstractmethod
+    async def respond(self, request, *args, **kwargs):
+        """
+        Build the response once the request passed the permission checks.
+        """
+
+    def render(self, data, status=200):
+        """
+        Render data as JSON, byte for byte like the DRF views do.
+        """
+        return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+    def handle_exception(self, exc):
+        """
+        Turn an API exception into the error response of the DRF views.
+        """
+        response = self.render(exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}, exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response['WWW-Authenticate'] = CachedTokenAuthentication().authenticate_header(self.request)
+        return response
+
+
+class AsyncListView(AsyncReadView):
+    """
+    Async list endpoint with the ETag and the opt-in keyset pagination of ConditionalListMixin.
+    """
+    pagination_class = None
+    etag_version_field = 'version'
+
+    @abstractmethod
+    def get_queryset(self):
+        """
+        Get the queryset of the list, read once the request passed the permission checks.
+        """
+
+    async def respond(self, request, *args, **kwargs):
+        """
+        Fingerprint the requested page or the queryset, then answer 304 or the full list.
+        """
+        queryset = self.get_queryset()
+        paginator = self.pagination_class() if self.pagination_class else None
+        page_queryset = paginator.get_page_queryset(queryset, request) if paginator else None
+        fingerprint = await alist_fingerprint(queryset, self.etag_version_field, page_queryset)
+        etag = make_etag(type(self).__name__, request.user.pk, request.get_full_path(), fingerprint)
+        return await aconditional_response(request, etag, lambda: self.list(request, queryset))
+
+    async def list(self, request, queryset):
+        """
+        Serialize the list, or the requested page of it.
+        """
+        paginator = self.pagination_class() if self.pagination_class else None
+        page = await paginator.apaginate_queryset(queryset, request, self) if paginator else None
+        if page is None:
+            return self.render(self.get_serializer([row async for row in queryset], many=True).data)
+        data = self.get_serializer(page, many=True).data
+        return self.render(paginator.get_paginated_response(data).data)
+
+
+class AsyncBoardListView(AsyncListView):
+    serializer_class = BoardSerializer
+    pagination_class = BoardPagination
+
+    def get_queryset(self):
+        """
+        Get the boards the user owns or is a member of, like BoardListCreateViewSet.
+        """
+        return Board.objects.for_user(self.request.user).select_related('stats')
+
+
+class AsyncBoardDetailView(AsyncReadView):
+    """
+    Async board detail, sharing the ETag and the cached rendered body of BoardRetrieveUpdateDestroy.
+    """
+    permission_classes = [IsBoardOwnerOrMember, IsAuthenticated, IsOwnerAndDeleteOnly]
+    serializer_class = BoardDetailReadSerializer
+    response_cache_prefix = 'board-detail'
+
+    async def respond(self, request, pk):
+        """
+        Check permissions on a lightweight copy of the board, then answer 304 or the full board.
+        """
+        obj = await Board.objects.only('id', 'owner_id').annotate(etag_version=F('version')).filter(pk=pk).afirst()
+        if obj is None:
+            raise exceptions.NotFound('No Board matches the given query.')
+        self.check_object_permissions(request, obj)
+        etag = make_etag(type(obj).__name__, obj.pk, obj.etag_version)
+        return await aconditional_response(request, etag, lambda: self.retrieve(obj))
+
+    async def retrieve(self, obj):
+        """
+        Serve the rendered board from the response cache, rendering it on a miss.
+        """
+        cache = response_cache()
+        key = response_cache_key(self.response_cache_prefix, obj.pk, obj.etag_version)
+        body = await cache.aget(key)
+        if body is None:
+            tasks = Task.objects.with_details().order_by('status', 'position')
+            board = await Board.objects.prefetch_related('members', Prefetch('tasks', queryset=tasks)).aget(pk=obj.pk)
+            body = JSONRenderer().render(self.get_serializer(board).data)
+            await cache.aset(key, body)
+        return HttpResponse(body, content_type='application/json')
+
+
+class AsyncTaskAssigneeView(AsyncListView):
+    serializer_class = TaskDetailValuesSerializer
+    pagination_class = TaskPagination
+    etag_version_field = 'board__version'
+
+    def get_queryset(self):
+        """
+        Get the tasks assigned to the user, like TaskAssigneeView.
+        """
+        return Task.objects.filter(assignee=self.request.user).with_details().values(*TaskDetailValuesSerializer.values)
+
+
+class AsyncTaskReviewerView(AsyncListView):
+    serializer_class = TaskDetailValuesSerializer
+    pagination_class = TaskPagination
+    etag_version_field = 'board__version'
+
+    def get_queryset(self):
+        """
+        Get the tasks the user reviews, like TaskReviewerView.
+        """
+        return Task.objects.filter(reviewer=self.request.user).with_details().values(*TaskDetailValuesSerializer.values)
+
+
+class AsyncCommentListView(AsyncListView):
+    serializer_class = CommentSerializer
+    pagination_class = CommentPagination
+    etag_version_field = 'task__board__version'
+    permission_classes = [IsAuthenticated, CanManageComment]
+
+    async def load_permission_data(self, request):
+        """
+        Look the board of the task up for CanManageComment.
+        """
+        await (await aget_board_access(request)).atask_board_id(self.kwargs['task_id'])
+
+    def get_queryset(self):
+        """
+        Get the comments of the task, newest first, like CommentViewSet.
+        """
+        return Comment.objects.filter(task_id=self.kwargs['task_id']).select_related('author').order_by('-created_at')
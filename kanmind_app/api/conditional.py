@@ -0,0 +1,172 @@
+import hashlib
+from django.db.models import Count, F, Max, Sum
+from django.http import HttpResponseNotModified
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the values a response depends on.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    return quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+def etag_matches(request, etag):
+    """
+    Check whether the client already holds the response with this ETag.
+
+    Args:
+        request (Request): The HTTP request object.
+        etag (str): The ETag of the current response.
+
+    Returns:
+        bool: True if ``If-None-Match`` contains the ETag.
+    """
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in etags or etag in etags
+
+
+def conditional_response(request, etag, build_response):
+    """
+    Answer with 304 Not Modified if the client holds ``etag``, otherwise build the response.
+
+    Args:
+        request (Request): The HTTP request object.
+        etag (str): The ETag of the current response.
+        build_response (callable): Builds the full response, only called on a mismatch.
+
+    Returns:
+        Response: The 304 or the full response, both carrying the ETag.
+    """
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = build_response()
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def fingerprint_aggregates(version_field):
+    """
+    Build the aggregates a list ETag is derived from: the number and IDs of the rows,
+    and the sum and maximum of their versions, which only ever grow.
+    """
+    return {
+        'rows': Count('pk'),
+        'ids': Sum('pk'),
+        'versions': Sum(version_field),
+        'latest': Max(version_field),
+    }
+
+
+def list_fingerprint(queryset, version_field, page_queryset=None):
+    """
+    Read what a list response depends on with one narrow query.
+
+    Args:
+        queryset (QuerySet): The filtered queryset of the list.
+        version_field (str): The version column whose changes change the ETag.
+        page_queryset (QuerySet | None): The query of the requested page, see
+            KeysetPagination.get_page_queryset(), None for an unpaginated list.
+
+    Returns:
+        list | dict: The IDs and versions of the rows of the page, or aggregates of
+            the whole list, so that no request reads more rows than it serves.
+    """
+    if page_queryset is not None:
+        return list(page_queryset.values_list('pk', version_field))
+    return queryset.aggregate(**fingerprint_aggregates(version_field))
+
+
+async def alist_fingerprint(queryset, version_field, page_queryset=None):
+    """
+    Read what a list response depends on like list_fingerprint(), with the async ORM.
+    """
+    if page_queryset is not None:
+        return [row async for row in page_queryset.values_list('pk', version_field)]
+    return await queryset.aaggregate(**fingerprint_aggregates(version_field))
+
+
+async def aconditional_response(request, etag, build_response):
+    """
+    Answer with 304 Not Modified like conditional_response(), for async views.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        etag (str): The ETag of the current response.
+        build_response (callable): Returns an awaitable of the full response, only called on a mismatch.
+
+    Returns:
+        HttpResponse: The 304 or the full response, both carrying the ETag.
+    """
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = await build_response()
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ConditionalRetrieveMixin:
+    """
+    Serve GET on a detail view with an ETag derived from a version column.
+
+    ``etag_queryset`` loads only the columns the permission classes need, so a
+    304 is answered before the full object is loaded and serialized.
+    """
+    etag_queryset = None
+    etag_version_field = 'version'
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Check permissions on a lightweight copy of the object, then answer 304 or the full object.
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.etag_queryset.annotate(etag_version=F(self.etag_version_field))
+        obj = get_object_or_404(queryset, **{self.lookup_field: kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, obj)
+        etag = make_etag(type(obj).__name__, obj.pk, obj.etag_version)
+        return conditional_response(request, etag, lambda: self.retrieve_modified(request, obj, *args, **kwargs))
+
+    def retrieve_modified(self, request, obj, *args, **kwargs):
+        """
+        Build the full response once the client's copy turned out to be outdated.
+
+        Args:
+            request (Request): The HTTP request object.
+            obj (Model): The lightweight object, annotated with ``etag_version``.
+
+        Returns:
+            Response: The serialized object.
+        """
+        return super().retrieve(request, *args, **kwargs)
+
+
+class ConditionalListMixin:
+    """
+    Serve GET on a list view with an ETag derived from the IDs and versions of its rows.
+
+    The fingerprint is read with one narrow query, over the requested page or as
+    aggregates of the filtered queryset (see list_fingerprint()), so a 304 is
+    answered before any row is serialized.
+    """
+    etag_version_field = 'version'
+
+    def list(self, request, *args, **kwargs):
+        """
+        Fingerprint the requested page or the filtered queryset, then answer 304 or the full list.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page_queryset = self.paginator.get_page_queryset(queryset, request) if self.paginator is not None else None
+        fingerprint = list_fingerprint(queryset, self.etag_version_field, page_queryset)
+        etag = make_etag(type(self).__name__, request.user.pk, request.get_full_path(), fingerprint)
+        return conditional_response(request, etag, lambda: super(ConditionalListMixin, self).list(request, *args, **kwargs))
@@ -0,0 +1,218 @@
+import base64
+import binascii
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (cursor) pagination.
+
+    Lists stay unpaginated unless the client sends ``cursor`` or ``page_size``.
+    Pages are ordered by ``ordering`` and the cursor holds the ordering values of
+    the last row of the previous page, so every page is a single indexed range
+    query, no matter how deep it is. NULL values sort after all other values.
+    """
+    ordering = ('id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return the page following the requested cursor, or None when the client
+        did not ask for pagination.
+
+        Args:
+            queryset (QuerySet): The filtered queryset of the view.
+            request (Request): The HTTP request object.
+            view: The view that is being paginated.
+
+        Returns:
+            list | None: The rows of the page.
+        """
+        queryset = self.get_page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.take_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Return the page following the requested cursor like paginate_queryset(),
+        fetching it with the async ORM.
+        """
+        queryset = self.get_page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.take_page([row async for row in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Build the query of the requested page, which fetches one extra row telling
+        whether there is a next page.
+
+        Returns:
+            QuerySet | None: The page query, or None when the client did not ask for pagination.
+        """
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.get_order_by())
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.filter_after(queryset.model, position))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset[:self.page_size + 1]
+
+    def take_page(self, rows):
+        """
+        Cut the extra row off the fetched rows and remember where the next page starts.
+
+        Returns:
+            list: The rows of the page.
+        """
+        page = rows[:self.page_size]
+        self.next_position = self.get_position(page[-1]) if len(rows) > self.page_size else None
+        return page
+
+    def get_paginated_response(self, data):
+        """
+        Wrap the serialized page together with the link to the next page.
+        """
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        """
+        Describe the paginated response for schema generation.
+        """
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        """
+        Read the requested page size, capped by ``KANMIND_MAX_PAGE_SIZE``.
+
+        Returns:
+            int: Number of rows per page.
+        """
+        page_size = getattr(settings, 'KANMIND_PAGE_SIZE', 50)
+        max_page_size = getattr(settings, 'KANMIND_MAX_PAGE_SIZE', 200)
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, page_size))
+        except ValueError:
+            pass
+        return max(1, min(page_size, max_page_size))
+
+    def get_order_by(self):
+        """
+        Build the ORDER BY expressions, sorting NULL values as the greatest values.
+        """
+        expressions = []
+        for field in self.ordering:
+            if field.startswith('-'):
+                expressions.append(F(field[1:]).desc(nulls_first=True))
+            else:
+                expressions.append(F(field).asc(nulls_last=True))
+        return expressions
+
+    def get_position(self, row):
+        """
+        Read the ordering values of a row, which may be a model instance or a dict.
+        """
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+        return [getattr(row, name) for name in names]
+
+    def filter_after(self, model, position):
+        """
+        Build the condition matching every row ordered after ``position``.
+
+        Args:
+            model (Model): Model of the paginated queryset.
+            position (list): Ordering values of the last row of the previous page.
+
+        Returns:
+            Q: Rows that follow the position.
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            nullable = model._meta.get_field(name).null
+            if field.startswith('-'):
+                after = Q(**{f'{name}__isnull': False}) if value is None else Q(**{f'{name}__lt': value})
+            elif value is None:
+                after = Q(pk__in=[])
+            else:
+                after = Q(**{f'{name}__gt': value})
+                if nullable:
+                    after |= Q(**{f'{name}__isnull': True})
+            condition |= equal & after
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, position):
+        """
+        Encode ordering values as an opaque URL-safe cursor.
+        """
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request):
+        """
+        Decode the cursor of the request.
+
+        Raises:
+            NotFound: if the cursor was tampered with.
+
+        Returns:
+            list | None: The ordering values, or None on the first page.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        """
+        Build the URL of the next page, or None on the last page.
+        """
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+
+class BoardPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class TaskPagination(KeysetPagination):
+    ordering = ('due_date', 'id')
+
+
+class CommentPagination(KeysetPagination):
+    ordering = ('-created_at', 'id')
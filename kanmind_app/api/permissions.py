@@ -1,26 +1,22 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 from rest_framework.exceptions import PermissionDenied, ValidationError, NotFound
-from django.shortcuts import get_object_or_404
-from kanmind_app.models import Board, Task
+from kanmind_app.access import get_board_access
+from kanmind_app.models import Board
 
-def user_can_read_task(user, task):
+def user_can_read_task(request, task):
     """
-        Check whether a user can read a task.
+        Check whether the requesting user can read a task.
         A user can read a task if they are:
         - The board owner
         - A board member
         Args:
-            user (User): Authenticated user.
+            request (Request): The HTTP request object.
             task (Task): Task instance.
             
         Returns:
         bool: True if user has read access.
     """
-    board = task.board
-    return (
-        board.owner == user
-        or board.members.filter(id=user.id).exists()
-    )
+    return get_board_access(request).can_read(task.board_id)
 
 class IsBoardOwnerOrMember(BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -35,14 +31,14 @@ class IsBoardOwnerOrMember(BasePermission):
         Returns:
             bool: True if the user has permission, False otherwise.
         """
-        user = request.user
+        access = get_board_access(request)
         if request.method in SAFE_METHODS:
-            return (obj.owner == user or obj.members.filter(id=user.id).exists())
+            return access.can_read(obj.pk)
         elif request.method =="POST":
-            return (obj.owner == user or obj.members.filter(id=user.id).exists())
+            return access.can_read(obj.pk)
         elif request.method == "DELETE":
-            return obj.owner == user
-        return obj.owner == user
+            return access.owns(obj.pk)
+        return access.owns(obj.pk)
 
 class IsOwnerAndDeleteOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -59,7 +55,7 @@ class IsOwnerAndDeleteOnly(BasePermission):
         """
         user = request.user
         if request.method == 'DELETE':
-            return obj.owner == user or obj.author == user
+            return getattr(obj, 'owner_id', None) == user.id or getattr(obj, 'author_id', None) == user.id
         return True
 
 class CanReadTask(BasePermission):
@@ -75,9 +71,8 @@ class CanReadTask(BasePermission):
         Returns:
             bool: True if the user can read the task, False otherwise.
         """
-        user = request.user
         if request.method in SAFE_METHODS:
-            return user_can_read_task(user, obj)
+            return user_can_read_task(request, obj)
         return False
 
 class IsAssigneeOrReviewerTask(BasePermission):
@@ -95,7 +90,7 @@ class IsAssigneeOrReviewerTask(BasePermission):
         """
         user = request.user
         if request.method in SAFE_METHODS:
-            return obj.assignee == user or obj.reviewer == user
+            return obj.assignee_id == user.id or obj.reviewer_id == user.id
         return False
 
 class CanManageTask(BasePermission):
@@ -121,13 +116,14 @@ class CanManageTask(BasePermission):
         if not board_id:
             raise ValidationError({"detail": "Board is required to create Task here"})
         try:
-            board = Board.objects.get(id=board_id)
-        except Board.DoesNotExist:
+            board_id = int(board_id)
+        except (TypeError, ValueError):
             raise NotFound("Board does not exist.")
-        user = request.user
-        if board.owner != user and not board.members.filter(id=user.id).exists():
-            raise PermissionDenied("You are not a member of this Board")
-        return True
+        if get_board_access(request).can_read(board_id):
+            return True
+        if not Board.objects.filter(id=board_id).exists():
+            raise NotFound("Board does not exist.")
+        raise PermissionDenied("You are not a member of this Board")
     
     def has_object_permission(self, request, view, obj):
         """
@@ -142,16 +138,15 @@ class CanManageTask(BasePermission):
             bool: True if the user has permission, False otherwise.
         """
         user = request.user
-        board = obj.board
 
         if request.method in SAFE_METHODS:
-            return user_can_read_task(user, obj)
+            return user_can_read_task(request, obj)
 
         if request.method =="PATCH":
-            return user_can_read_task(user, obj)
+            return user_can_read_task(request, obj)
         
         if request.method == "DELETE":
-            return board.owner == user or obj.owner == user
+            return get_board_access(request).owns(obj.board_id) or obj.owner_id == user.id
         
 class CanDeleteTask(BasePermission):
 
@@ -168,12 +163,11 @@ class CanDeleteTask(BasePermission):
             bool: True if the user can delete, False otherwise.
         """
         user = request.user
-        board = obj.board
         if request.method in SAFE_METHODS:
-            return user_can_read_task(user, obj)
+            return user_can_read_task(request, obj)
         elif request.method == "DELETE":
-            return obj.owner == user or board.owner == user
-        return obj.owner == user
+            return obj.owner_id == user.id or get_board_access(request).owns(obj.board_id)
+        return obj.owner_id == user.id
     
 class CanManageComment(BasePermission):
     
@@ -184,10 +178,11 @@ class CanManageComment(BasePermission):
         task_id = view.kwargs.get('task_id')
         if not task_id:
             raise NotFound("Task ID is missing.")
-        task = get_object_or_404(Task, id=task_id)
-        board = task.board
-        user = request.user
-        if board.owner == user or board.members.filter(id=user.id).exists():
+        access = get_board_access(request)
+        board_id = access.task_board_id(task_id)
+        if board_id is None:
+            raise NotFound("No Task matches the given query.")
+        if access.can_read(board_id):
             return True
         raise PermissionDenied("You must be a board member to perform this action")
 
@@ -205,7 +200,22 @@ class CanManageComment(BasePermission):
         """
         user = request.user
         if request.method in ["PATCH", "PUT", "DELETE"]:
-            if obj.author == user:
+            if obj.author_id == user.id:
                 return True
             raise PermissionDenied("You are not the Author for this comment.")
         return True
+
+class CanMoveTask(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        """
+        Allow every member of the board to move its tasks.
+
+        Args:
+            request (Request): The HTTP request object.
+            view: The view that is being accessed.
+            obj (Task): The task object.
+
+        Returns:
+            bool: True if the user can read the task, False otherwise.
+        """
+        return user_can_read_task(request, obj)
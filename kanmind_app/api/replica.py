@@ -0,0 +1,32 @@
+from rest_framework.permissions import SAFE_METHODS
+from kanmind_app.routers import pin_to_primary, replica_alias_for, reset_read_alias, set_read_alias
+
+
+class ReplicaReadMixin:
+    """
+    Read from the replica on GET, HEAD and OPTIONS, see kanmind_app.routers.
+
+    The user is authenticated first, since users who wrote within the last
+    ``KANMIND_REPLICA_PIN_SECONDS`` read from the primary. A successful write
+    request pins its user to the primary for that window.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        """
+        Select the database to read from before the permission checks run.
+        """
+        if request.method in SAFE_METHODS:
+            self.perform_authentication(request)
+            self.read_alias_token = set_read_alias(replica_alias_for(request.user))
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Restore the default routing, and pin the user to the primary after a write.
+        """
+        token = self.__dict__.pop('read_alias_token', None)
+        if token is not None:
+            reset_read_alias(token)
+        elif request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            pin_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,86 @@
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+_flight_locks = {}
+_flight_locks_guard = threading.Lock()
+
+
+@contextmanager
+def single_flight(key):
+    """
+    Let only one thread of the process build the value of ``key`` at a time.
+
+    Threads asking for the same key wait for the first one and can then read
+    its result from the cache instead of building it again.
+
+    Args:
+        key (str): The cache key being built.
+    """
+    with _flight_locks_guard:
+        lock, waiting = _flight_locks.get(key, (threading.Lock(), 0))
+        _flight_locks[key] = (lock, waiting + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _flight_locks_guard:
+            lock, waiting = _flight_locks[key]
+            if waiting == 1:
+                del _flight_locks[key]
+            else:
+                _flight_locks[key] = (lock, waiting - 1)
+
+
+def response_cache():
+    """
+    Get the cache holding rendered responses, ``KANMIND_RESPONSE_CACHE_ALIAS``.
+    """
+    return caches[getattr(settings, 'KANMIND_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def response_cache_key(prefix, pk, version):
+    """
+    Build the cache key of the rendered response of one object version.
+    """
+    return f'kanmind:{prefix}:{pk}:{version}'
+
+
+class VersionedResponseCacheMixin:
+    """
+    Cache the rendered JSON of a detail view per object version.
+
+    Listed before ConditionalRetrieveMixin, which checks the permissions of the
+    requesting user first, so cached bodies are only served to users allowed to
+    read them. A write bumps the version, which moves readers to a new key, while the
+    old entry ages out of the size-bounded cache ``KANMIND_RESPONSE_CACHE_ALIAS``.
+    """
+    response_cache_prefix = None
+
+    def get_response_cache(self):
+        """
+        Get the cache holding the rendered responses.
+        """
+        return response_cache()
+
+    def retrieve_modified(self, request, obj, *args, **kwargs):
+        """
+        Serve the rendered JSON of this object version from the cache, rendering it once on a miss.
+        """
+        renderer = request.accepted_renderer
+        if renderer.format != 'json':
+            return super().retrieve_modified(request, obj, *args, **kwargs)
+
+        cache = self.get_response_cache()
+        key = response_cache_key(self.response_cache_prefix, obj.pk, obj.etag_version)
+        body = cache.get(key)
+        if body is None:
+            with single_flight(key):
+                body = cache.get(key)
+                if body is None:
+                    response = super().retrieve_modified(request, obj, *args, **kwargs)
+                    body = renderer.render(response.data, renderer.media_type, self.get_renderer_context())
+                    cache.set(key, body)
+        return HttpResponse(body, content_type=renderer.media_type)
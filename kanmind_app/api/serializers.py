@@ -1,8 +1,24 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from kanmind_app.models import Task, Comment, Board
+from kanmind_app.models import Task, Comment, Board, ImportJob
 
 
+def annotated_or_property(obj, name):
+    """
+    Read a counter from its queryset annotation, falling back to the model property.
+
+    Args:
+        obj (Model): The model instance.
+        name (str): Name of the model property, annotated as ``annotated_<name>``.
+
+    Returns:
+        int: The counter value.
+    """
+    value = getattr(obj, f'annotated_{name}', None)
+    if value is None:
+        return getattr(obj, name)
+    return value
+
 class UserInfoSerializer(serializers.ModelSerializer):
     fullname = serializers.SerializerMethodField()
     class Meta:
@@ -44,7 +60,8 @@ class TaskSerializer(serializers.ModelSerializer):
     reviewer = UserInfoSerializer(read_only=True)
     class Meta:
         model = Task
-        fields = ['id', 'title', 'description','board','owner', 'status', 'priority', 'assignee','assignee_id', 'reviewer','reviewer_id', 'due_date', 'comments_count']
+        fields = ['id', 'title', 'description','board','owner', 'status', 'priority', 'assignee','assignee_id', 'reviewer','reviewer_id', 'due_date', 'comments_count', 'position']
+        read_only_fields = ['position']
         
     def get_comments_count(self, obj):
         """
@@ -56,7 +73,7 @@ class TaskSerializer(serializers.ModelSerializer):
         Returns:
             int: Number of comments.
         """
-        return obj.comments.count()
+        return annotated_or_property(obj, 'comments_count')
             
     def create(self, validated_data):
         """
@@ -64,7 +81,9 @@ class TaskSerializer(serializers.ModelSerializer):
         """
         request = self.context['request']
         validated_data['owner'] = request.user
-        return super().create(validated_data)
+        task = super().create(validated_data)
+        task.annotated_comments_count = 0
+        return task
         
 
 class TaskDetailSerializer(serializers.ModelSerializer):
@@ -90,16 +109,219 @@ class TaskDetailSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Task
-        fields = ['id', 'title', 'description','board','owner', 'status', 'priority', 'assignee','assignee_id', 'reviewer','reviewer_id', 'due_date', 'comments_count']
+        fields = ['id', 'title', 'description','board','owner', 'status', 'priority', 'assignee','assignee_id', 'reviewer','reviewer_id', 'due_date', 'comments_count', 'position']
+        read_only_fields = ['position']
         
-    def comments_count(self):
+    def get_comments_count(self, obj):
         """
         Get the count of comments on the task.
 
+        Args:
+            obj (Task): The task instance.
+
         Returns:
             int: Number of comments.
         """
-        return self.comments.count()
+        return annotated_or_property(obj, 'comments_count')
+
+    def update(self, instance, validated_data):
+        """
+        Update the task, appending it to its new column when its board or status changed.
+        """
+        board = validated_data.get('board')
+        if (board is not None and board.pk != instance.board_id) or validated_data.get('status', instance.status) != instance.status:
+            instance.position = ''
+        return super().update(instance, validated_data)
+
+
+def user_info(user_id, email, username):
+    """
+    Build the UserInfoSerializer representation of a user from its columns.
+
+    Returns:
+        dict | None: The user, or None when the task has no such user.
+    """
+    if user_id is None:
+        return None
+    return {'id': user_id, 'email': email, 'fullname': username}
+
+
+class TaskDetailValuesSerializer(serializers.BaseSerializer):
+    """
+    Read-only fast path of TaskDetailSerializer for long task lists.
+
+    It represents rows fetched with ``.values(*TaskDetailValuesSerializer.values)``
+    from a ``with_details()`` queryset as plain dicts, skipping the field machinery of
+    DRF per row and per nested user. The output must stay byte for byte the one of
+    TaskDetailSerializer, which the tests check.
+    """
+    values = [
+        'id', 'title', 'description', 'board_id', 'status', 'priority', 'due_date', 'annotated_comments_count', 'position',
+        'owner_id', 'owner__email', 'owner__username',
+        'assignee_id', 'assignee__email', 'assignee__username',
+        'reviewer_id', 'reviewer__email', 'reviewer__username',
+    ]
+
+    def to_representation(self, row):
+        """
+        Build the TaskDetailSerializer representation of one row.
+
+        Args:
+            row (dict): The task columns listed in ``values``.
+
+        Returns:
+            dict: The task, with its fields in the order of TaskDetailSerializer.
+        """
+        due_date = row['due_date']
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'board': row['board_id'],
+            'owner': user_info(row['owner_id'], row['owner__email'], row['owner__username']),
+            'status': row['status'],
+            'priority': row['priority'],
+            'assignee': user_info(row['assignee_id'], row['assignee__email'], row['assignee__username']),
+            'reviewer': user_info(row['reviewer_id'], row['reviewer__email'], row['reviewer__username']),
+            'due_date': due_date.isoformat() if due_date is not None else None,
+            'comments_count': row['annotated_comments_count'],
+            'position': row['position'],
+        }
+
+
+class TaskMoveSerializer(serializers.Serializer):
+    """
+    Move a task into a status column of its board, between two neighbour tasks.
+    """
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    before = serializers.IntegerField(required=False, allow_null=True)
+    after = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        """
+        Check that the neighbours are different tasks of the target column, with
+        ``before`` sorting before ``after``, before anything is written. Neighbours
+        sharing a position are ordered by ID, like the column is rebalanced.
+
+        Raises:
+            ValidationError: if the task cannot be placed between the neighbours.
+        """
+        task = self.instance
+        before, after = attrs.get('before'), attrs.get('after')
+        if before is not None and before == after:
+            raise serializers.ValidationError({'detail': 'Neighbour tasks must be two different tasks.'})
+        neighbour_ids = [task_id for task_id in (before, after) if task_id is not None]
+        column = Task.objects.filter(board_id=task.board_id, status=attrs.get('status', task.status)).exclude(pk=task.pk)
+        ranks = {pk: (position, pk) for pk, position in column.filter(pk__in=neighbour_ids).values_list('pk', 'position')}
+        if len(ranks) < len(neighbour_ids):
+            raise serializers.ValidationError({'detail': 'Neighbour tasks must be in the target column of the same board.'})
+        if before is not None and after is not None and ranks[before] > ranks[after]:
+            raise serializers.ValidationError({'detail': 'The task given as before must come before the task given as after.'})
+        return attrs
+
+    def update(self, instance, validated_data):
+        """
+        Place the task between its new neighbours and save only its status and position.
+
+        Raises:
+            ValidationError: if a neighbour is not in the target column.
+        """
+        instance.status = validated_data.get('status', instance.status)
+        try:
+            instance.place(validated_data.get('before'), validated_data.get('after'))
+        except Task.DoesNotExist:
+            raise serializers.ValidationError({'detail': 'Neighbour tasks must be in the target column of the same board.'})
+        instance.save(update_fields=['status', 'position'])
+        return instance
+
+
+class TaskBulkItemSerializer(serializers.ModelSerializer):
+    """
+    One item of a bulk task request: a partial update when it has an ``id``,
+    a new task otherwise. Boards and users are plain IDs here, the bulk view
+    resolves them for all items at once.
+    """
+    id = serializers.IntegerField(required=False)
+    board = serializers.IntegerField(required=False)
+    assignee_id = serializers.IntegerField(required=False, allow_null=True)
+    reviewer_id = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Task
+        fields = ['id', 'title', 'description', 'board', 'status', 'priority', 'assignee_id', 'reviewer_id', 'due_date']
+
+    def validate(self, attrs):
+        """
+        Require a board and a title for new tasks.
+
+        Raises:
+            ValidationError: if a new task misses its board or title.
+        """
+        if 'id' not in attrs:
+            missing = {field: ['This field is required.'] for field in ('board', 'title') if field not in attrs}
+            if missing:
+                raise serializers.ValidationError(missing)
+        return attrs
+
+
+class BoardImportSerializer(serializers.Serializer):
+    """
+    A board row of an import file. The importing user owns the board, the
+    owner and members of the file become its members.
+    """
+    id = serializers.IntegerField()
+    title = serializers.CharField(max_length=55, trim_whitespace=False)
+    owner = serializers.EmailField(required=False)
+    members = serializers.ListField(child=serializers.EmailField(), required=False)
+
+
+class TaskImportSerializer(serializers.ModelSerializer):
+    """
+    A task row of an import file, referring to its board by the ID in the file
+    and to users by email. Tasks without owner belong to the importing user.
+    """
+    id = serializers.IntegerField(required=False)
+    board = serializers.IntegerField()
+    owner = serializers.EmailField(required=False)
+    assignee = serializers.EmailField(required=False)
+    reviewer = serializers.EmailField(required=False)
+
+    class Meta:
+        model = Task
+        fields = ['id', 'board', 'title', 'description', 'status', 'priority', 'owner', 'assignee', 'reviewer', 'due_date', 'position']
+        # Imported texts are kept as exported.
+        extra_kwargs = {'title': {'trim_whitespace': False}, 'description': {'trim_whitespace': False}}
+
+
+class CommentImportSerializer(serializers.ModelSerializer):
+    """
+    A comment row of an import file, referring to its task by the ID in the file.
+    Comments without author are written by the importing user.
+    """
+    id = serializers.IntegerField(required=False)
+    task = serializers.IntegerField()
+    author = serializers.EmailField(required=False)
+    created_at = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'task', 'author', 'content', 'created_at']
+        extra_kwargs = {'content': {'trim_whitespace': False}}
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    file = serializers.FileField(write_only=True)
+    format = serializers.ChoiceField(choices=ImportJob.FORMAT_CHOICES, default='ndjson')
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'file', 'format', 'status', 'rows_done', 'boards_created', 'tasks_created', 'comments_created',
+            'error_count', 'errors', 'created_at', 'updated_at',
+        ]
+        read_only_fields = [
+            'status', 'rows_done', 'boards_created', 'tasks_created', 'comments_created', 'error_count', 'errors',
+        ]
 
     
 class CommentSerializer(serializers.ModelSerializer):
@@ -121,6 +343,13 @@ class CommentSerializer(serializers.ModelSerializer):
         """
         return obj.author.username
 
+class CommentChangeSerializer(CommentSerializer):
+    """
+    A comment in a delta sync response, which lists the comments of many tasks.
+    """
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ['task']
+
 class BoardDetailReadSerializer(serializers.ModelSerializer):
     owner_id = serializers.IntegerField(read_only=True)
     members = UserInfoSerializer(many=True, read_only=True)
@@ -187,7 +416,7 @@ class BoardSerializer(serializers.ModelSerializer):
         Returns:
             int: Number of members.
         """
-        return obj.members.count()
+        return annotated_or_property(obj, 'member_count')
 
     def get_ticket_count(self, obj):
         """
@@ -199,7 +428,7 @@ class BoardSerializer(serializers.ModelSerializer):
         Returns:
             int: Number of tasks.
         """
-        return obj.tasks.count()
+        return annotated_or_property(obj, 'ticket_count')
 
     def get_tasks_to_do_count(self, obj):
         """
@@ -211,7 +440,7 @@ class BoardSerializer(serializers.ModelSerializer):
         Returns:
             int: Number of to-do tasks.
         """
-        return obj.tasks.filter(status='to-do').count()
+        return annotated_or_property(obj, 'tasks_to_do_count')
 
     def get_tasks_high_prio_count(self, obj):
         """
@@ -223,7 +452,7 @@ class BoardSerializer(serializers.ModelSerializer):
         Returns:
             int: Number of high priority tasks.
         """
-        return obj.tasks.filter(priority='high').count()
+        return annotated_or_property(obj, 'tasks_high_prio_count')
 
 class BoardPatchSerialiser(serializers.ModelSerializer):
     owner_data = UserInfoSerializer(source = 'owner',read_only=True)
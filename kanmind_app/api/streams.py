@@ -0,0 +1,109 @@
+import json
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from auth_app.authentication import aauthenticate_token
+from kanmind_app.access import BoardAccess
+from kanmind_app.events import get_broker
+
+
+def get_last_event_id(request):
+    """
+    Read the ID of the last event the client received, from the ``Last-Event-ID``
+    header sent by reconnecting browsers or the ``last_event_id`` query parameter.
+
+    Returns:
+        int | None: The event ID, None for a new client.
+    """
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_event(event):
+    """
+    Encode an event in the Server-Sent Events wire format.
+
+    Args:
+        event (Event): The event to send.
+
+    Returns:
+        bytes: The encoded event.
+    """
+    return f'id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n'.encode()
+
+
+class EventStream:
+    """
+    The Server-Sent Events of one client: the events of the boards the user can read,
+    and heartbeat comments while idle.
+
+    Events naming the user among their ``user_ids`` reload the access of the user,
+    so boards the user was just added to are streamed from then on. Django calls
+    close() once the response ends, including when the client disconnects.
+    """
+
+    def __init__(self, user, access, subscription, heartbeat):
+        self.user = user
+        self.access = access
+        self.subscription = subscription
+        self.heartbeat = heartbeat
+
+    def __aiter__(self):
+        return self.stream()
+
+    async def stream(self):
+        yield b'retry: 3000\n\n'
+        while True:
+            event = await self.subscription.get(timeout=self.heartbeat)
+            if event is None:
+                yield b': keep-alive\n\n'
+                continue
+            if self.user.pk in event.user_ids:
+                self.access = await BoardAccess.aload(self.user, use_cache=False)
+            elif event.type != 'reset' and not self.access.can_read(event.board_id):
+                continue
+            yield format_event(event)
+
+    def close(self):
+        self.subscription.close()
+
+
+async def board_events(request):
+    """
+    Stream the task, comment and membership changes of the user's boards as Server-Sent Events.
+
+    Must be served under ASGI: a WSGI server would read the endless stream into memory
+    before sending anything, so it is refused there with a 501. Clients resume after a
+    reconnect with the ``Last-Event-ID`` header; a ``reset`` event tells them that events
+    were lost and the boards must be reloaded.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        StreamingHttpResponse: The ``text/event-stream`` response, or a 401 or 501 response.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'The event stream needs an ASGI server, see core/gunicorn.conf.py.'}, status=501)
+    try:
+        user = await aauthenticate_token(request)
+    except AuthenticationFailed as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=401)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    subscription = get_broker().subscribe(get_last_event_id(request))
+    try:
+        access = await BoardAccess.aload(user)
+    except BaseException:
+        subscription.close()
+        raise
+    heartbeat = getattr(settings, 'KANMIND_EVENT_HEARTBEAT', 15)
+    response = StreamingHttpResponse(EventStream(user, access, subscription, heartbeat), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,14 +1,29 @@
 from django.urls import path
-from .views import BoardListCreateViewSet,BoardRetrieveUpdateDestroy, TaskRetrieveUpdateDestroyView, CommentViewSet, EmailCheckView,TaskListCreateView ,TaskAssigneeView, TaskReviewerView, CommentRetrieveUpdateDestroy
+from .async_views import AsyncBoardListView, AsyncBoardDetailView, AsyncTaskAssigneeView, AsyncTaskReviewerView, AsyncCommentListView
+from .streams import board_events
+from .views import BoardListCreateViewSet,BoardRetrieveUpdateDestroy, BoardChangesView, BoardExportView, TaskRetrieveUpdateDestroyView, CommentViewSet, EmailCheckView,TaskListCreateView, TaskBulkView, TaskMoveView,TaskAssigneeView, TaskReviewerView, CommentRetrieveUpdateDestroy, ImportJobListCreateView, ImportJobDetailView, ImportJobResumeView
 
 urlpatterns = [
     path('email-check/', EmailCheckView.as_view(), name='email-check' ),
+    path('events/', board_events, name='board-events' ),
     path('boards/', BoardListCreateViewSet.as_view(), name='board-list-create' ),
     path('boards/<int:pk>/', BoardRetrieveUpdateDestroy.as_view(), name='board-detail' ),
+    path('boards/<int:pk>/changes/', BoardChangesView.as_view(), name='board-changes' ),
+    path('boards/<int:pk>/export/', BoardExportView.as_view(), name='board-export' ),
     path('tasks/', TaskListCreateView.as_view(), name='create-task' ),
+    path('tasks/bulk/', TaskBulkView.as_view(), name='task-bulk' ),
     path('tasks/assigned-to-me/', TaskAssigneeView.as_view(), name='taskassigned-user' ),
     path('tasks/reviewing/', TaskReviewerView.as_view(), name='taskreviewing-user' ),
     path('tasks/<int:pk>/', TaskRetrieveUpdateDestroyView.as_view(), name='task-detail' ),
+    path('tasks/<int:pk>/move/', TaskMoveView.as_view(), name='task-move' ),
     path('tasks/<int:task_id>/comments/', CommentViewSet.as_view(), name='tasklist-comments' ),
     path('tasks/<int:task_id>/comments/<int:pk>/', CommentRetrieveUpdateDestroy.as_view(), name='comment-detail' ), 
+    path('imports/', ImportJobListCreateView.as_view(), name='import-list-create' ),
+    path('imports/<int:pk>/', ImportJobDetailView.as_view(), name='import-detail' ),
+    path('imports/<int:pk>/resume/', ImportJobResumeView.as_view(), name='import-resume' ),
+    path('async/boards/', AsyncBoardListView.as_view(), name='async-board-list' ),
+    path('async/boards/<int:pk>/', AsyncBoardDetailView.as_view(), name='async-board-detail' ),
+    path('async/tasks/assigned-to-me/', AsyncTaskAssigneeView.as_view(), name='async-taskassigned-user' ),
+    path('async/tasks/reviewing/', AsyncTaskReviewerView.as_view(), name='async-taskreviewing-user' ),
+    path('async/tasks/<int:task_id>/comments/', AsyncCommentListView.as_view(), name='async-tasklist-comments' ),
 ]
\ No newline at end of file
@@ -1,30 +1,64 @@
+import csv
 from rest_framework import status
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from kanmind_app.models import Board, Task, Comment
-from .permissions import IsBoardOwnerOrMember, CanDeleteTask, IsAssigneeOrReviewerTask, IsOwnerAndDeleteOnly, CanManageComment, CanReadTask, CanManageTask
-from .serializers import CheckEmailSerializer, BoardSerializer, User,BoardDetailReadSerializer, TaskDetailSerializer, CommentSerializer, BoardPatchSerialiser, TaskSerializer
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch, Q
+from django.http import StreamingHttpResponse
+from auth_app.backends import users_by_email
+from kanmind_app.access import get_board_access
+from kanmind_app.events import publish_event
+from kanmind_app.exports import EXPORT_CONTENT_TYPES, BoardExport
+from kanmind_app.imports import DATA_ERRORS, BoardImport, ImportConflict
+from kanmind_app.models import Board, BoardStats, Task, Comment, ImportJob, Tombstone
+from kanmind_app.ranking import rank_between
+from .permissions import IsBoardOwnerOrMember, CanDeleteTask, IsAssigneeOrReviewerTask, IsOwnerAndDeleteOnly, CanManageComment, CanReadTask, CanManageTask, CanMoveTask
+from .replica import ReplicaReadMixin
+from .conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from .response_cache import VersionedResponseCacheMixin
+from .pagination import BoardPagination, TaskPagination, CommentPagination
+from .serializers import CheckEmailSerializer, BoardSerializer, BoardDetailReadSerializer, TaskDetailSerializer, TaskDetailValuesSerializer, CommentSerializer, BoardPatchSerialiser, TaskSerializer, TaskBulkItemSerializer, TaskMoveSerializer, CommentChangeSerializer, UserInfoSerializer, ImportJobSerializer
 
 
-class BoardListCreateViewSet(generics.ListCreateAPIView):
+class BoardListCreateViewSet(ReplicaReadMixin, ConditionalListMixin, generics.ListCreateAPIView):
     permission_classes = [ IsAuthenticated]
     serializer_class = BoardSerializer
+    pagination_class = BoardPagination
+
     def get_queryset(self):
         """
-        Get the queryset of boards that the authenticated user owns or is a member of.
+        Get the queryset of boards that the authenticated user owns or is a member of,
+        joined with the statistics record that holds the dashboard counters.
 
         Returns:
             QuerySet: Boards owned by or accessible to the user.
         """
         user = self.request.user
-        return Board.objects.filter(Q(owner=user) | Q(members=user)).distinct()
+        return Board.objects.for_user(user).select_related('stats')
 
-class BoardRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class BoardRetrieveUpdateDestroy(ReplicaReadMixin, VersionedResponseCacheMixin, ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsBoardOwnerOrMember, IsAuthenticated, IsOwnerAndDeleteOnly]
     queryset  = Board.objects.all()
+    etag_queryset = Board.objects.only('id', 'owner_id')
+    response_cache_prefix = 'board-detail'
+
+    def get_queryset(self):
+        """
+        Get the boards queryset, prefetching everything the detail serializer reads on GET:
+        the members, and the tasks joined with their assignee and reviewer and annotated
+        with their comment count.
+
+        Returns:
+            QuerySet: Boards ready to be serialized with a fixed number of queries.
+        """
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return queryset.prefetch_related('members', Prefetch('tasks', queryset=Task.objects.with_details().order_by('status', 'position')))
 
     def get_serializer_class(self):
         """
@@ -44,21 +78,295 @@ class BoardRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
         board = serializer.save(owner = self.request.user)
         board.members.add(self.request.user)
         
-class TaskListCreateView(generics.ListCreateAPIView):
+class BoardChangesView(generics.GenericAPIView):
+    """
+    Delta sync of a board: everything that changed after the sequence number ``since``.
+
+    Tasks and comments carry the board version of their last change as ``seq``, deleted
+    ones leave a tombstone, and ``members_seq`` tells whether the members changed. The
+    response holds the board version as the ``seq`` to send next time. When tombstones
+    after ``since`` were compacted away, ``reset`` is true and the full board is sent.
+    It always reads from the primary: a lagging replica would answer with a ``seq``
+    older than the one the client already holds.
+    """
+    permission_classes = [IsAuthenticated, IsBoardOwnerOrMember]
+    queryset = Board.objects.only('id', 'title', 'owner_id', 'version', 'members_seq', 'compacted_seq')
+
+    def get(self, request, *args, **kwargs):
+        """
+        List the tasks, comments, members and deletions of the board after ``since``.
+
+        Args:
+            request (Request): The HTTP request object with the ``since`` query parameter.
+
+        Returns:
+            Response: The changes of the board.
+        """
+        try:
+            since = int(request.query_params['since'])
+        except (KeyError, ValueError):
+            return Response({"detail": "The since query parameter must be a sequence number."}, status=status.HTTP_400_BAD_REQUEST)
+        board = self.get_object()
+        reset = since < board.compacted_seq or since > board.version
+        if reset:
+            since = 0
+
+        tasks = Task.objects.with_details().filter(board=board, seq__gt=since).order_by('seq', 'id')
+        comments = (
+            Comment.objects.filter(task__in=Task.objects.filter(board=board).values('id'), seq__gt=since)
+            .select_related('author').order_by('seq', 'id')
+        )
+        deleted = {'tasks': [], 'comments': []}
+        for model, object_id in board.tombstones.filter(seq__gt=since).order_by('seq').values_list('model', 'object_id'):
+            deleted[f'{model}s'].append(object_id)
+        members = UserInfoSerializer(board.members.all(), many=True).data if board.members_seq > since else None
+        return Response({
+            'seq': board.version,
+            'reset': reset,
+            'board': {'id': board.pk, 'title': board.title, 'owner_id': board.owner_id},
+            'members': members,
+            'tasks': TaskSerializer(tasks, many=True).data,
+            'comments': CommentChangeSerializer(comments, many=True).data,
+            'deleted': deleted,
+        })
+
+
+class BoardExportView(ReplicaReadMixin, generics.GenericAPIView):
+    """
+    Download a board with its tasks and comments, streamed as NDJSON or CSV (``?fmt=csv``).
+    """
+    permission_classes = [IsAuthenticated, IsBoardOwnerOrMember]
+    queryset = Board.objects.select_related('owner')
+
+    def get(self, request, *args, **kwargs):
+        """
+        Stream the export of the board, see kanmind_app.exports.BoardExport, as an
+        async iterator when served over ASGI.
+
+        Args:
+            request (Request): The HTTP request object with the optional ``fmt`` query parameter.
+
+        Returns:
+            StreamingHttpResponse: The export as an attachment.
+        """
+        fmt = request.query_params.get('fmt', 'ndjson')
+        if fmt not in EXPORT_CONTENT_TYPES:
+            return Response({"detail": f"The fmt query parameter must be one of {', '.join(EXPORT_CONTENT_TYPES)}."}, status=status.HTTP_400_BAD_REQUEST)
+        board = self.get_object()
+        export = BoardExport(board)
+        chunks = export.astream(fmt) if isinstance(request._request, ASGIRequest) else export.stream(fmt)
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="board-{board.pk}.{fmt}"'
+        return response
+
+
+class TaskListCreateView(ReplicaReadMixin, ConditionalListMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated,  CanDeleteTask, CanReadTask, CanManageTask ]
     serializer_class = TaskSerializer
-    queryset = Task.objects.all()
+    pagination_class = TaskPagination
+    queryset = Task.objects.with_details()
+    etag_version_field = 'board__version'
+
+
+class TaskBulkView(ReplicaReadMixin, generics.GenericAPIView):
+    """
+    Create and update many tasks with one request.
+
+    Items with an ``id`` are partial updates, which only the task owner may send,
+    items without one create a task on a board the user is a member of. Access is
+    checked once per board and referenced users are loaded with one query. Either
+    every item is written, within one transaction, or nothing is and the response
+    lists the errors of each item. The tasks to update are locked while they are
+    checked and written, and only the fields an item sends are written.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = TaskBulkItemSerializer
+
+    def post(self, request, *args, **kwargs):
+        """
+        Apply a list of task creations and partial updates.
+
+        Args:
+            request (Request): The HTTP request object with a list of task items.
+
+        Returns:
+            Response: The written tasks in request order, or the errors per item.
+        """
+        max_items = getattr(settings, 'KANMIND_BULK_MAX_ITEMS', 500)
+        if not isinstance(request.data, list):
+            return Response({"detail": "Expected a list of tasks."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > max_items:
+            return Response({"detail": f"Send at most {max_items} tasks per request."}, status=status.HTTP_400_BAD_REQUEST)
+        item_serializers = [self.get_serializer(data=item, partial=True) for item in request.data]
+        errors = [{} if serializer.is_valid() else dict(serializer.errors) for serializer in item_serializers]
+        items = [serializer.validated_data if not error else None for serializer, error in zip(item_serializers, errors)]
+
+        users = User.objects.in_bulk({
+            item[field] for item in items if item for field in ('assignee_id', 'reviewer_id') if item.get(field) is not None
+        })
+        with transaction.atomic():
+            tasks = Task.objects.select_for_update().in_bulk([item['id'] for item in items if item and 'id' in item])
+            self.check_items(request, items, tasks, users, errors)
+            if any(errors):
+                return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+            written = self.write_items(request, items, tasks, users)
+        tasks = Task.objects.with_details().in_bulk([task.pk for task in written])
+        data = TaskSerializer([tasks[task.pk] for task in written], many=True).data
+        return Response(data, status=status.HTTP_200_OK)
+
+    def check_items(self, request, items, tasks, users, errors):
+        """
+        Check every valid item against the loaded tasks and users and the board access
+        of the user, adding the problems found to the errors of the item.
+
+        Args:
+            request (Request): The HTTP request object.
+            items (list[dict | None]): The validated items, None where validation failed.
+            tasks (dict): Tasks to update by ID.
+            users (dict): Referenced users by ID.
+            errors (list[dict]): The errors of each item, empty for valid items.
+        """
+        access = get_board_access(request)
+        board_ids = {item['board'] for item in items if item and 'board' in item}
+        unreadable = {board_id for board_id in board_ids if not access.can_read(board_id)}
+        existing = set(Board.objects.filter(id__in=unreadable).values_list('id', flat=True)) if unreadable else set()
+        seen = set()
+        for item, item_errors in zip(items, errors):
+            if item is None:
+                continue
+            task = tasks.get(item.get('id'))
+            if 'id' in item:
+                if task is None:
+                    item_errors['id'] = ['Task does not exist.']
+                elif item['id'] in seen:
+                    item_errors['id'] = ['Task is listed more than once.']
+                elif task.owner_id != request.user.id or not access.can_read(task.board_id):
+                    item_errors['id'] = ['You are not the owner of this task.']
+                seen.add(item['id'])
+            board_id = item.get('board')
+            if board_id in unreadable:
+                item_errors['board'] = ['You are not a member of this Board' if board_id in existing else 'Board does not exist.']
+            for field in ('assignee_id', 'reviewer_id'):
+                user_id = item.get(field)
+                if user_id is not None and user_id not in users:
+                    item_errors[field] = [f'Invalid pk "{user_id}" - object does not exist.']
+
+    def write_items(self, request, items, tasks, users):
+        """
+        Stamp the checked items with the next sequence number of their board, write them
+        with one bulk insert and one bulk update per set of changed fields, then move the
+        board counters and publish the changes. Tasks moved to another board leave a
+        tombstone on the previous one, and their comments take the new sequence number.
+
+        Bulk writes send no model signals, so the work of kanmind_app.signals is done here.
+
+        Returns:
+            list[Task]: The created and updated tasks, in request order.
+        """
+        written = []
+        created = []
+        updated = []
+        changed_fields = {}
+        for item in items:
+            values = {
+                field: users.get(item[f'{field}_id']) for field in ('assignee', 'reviewer') if f'{field}_id' in item
+            }
+            values.update({field: item[field] for field in ('title', 'description', 'status', 'priority', 'due_date') if field in item})
+            if 'board' in item:
+                values['board_id'] = item['board']
+            if 'id' in item:
+                task = tasks[item['id']]
+                updated.append(task)
+                changed_fields[task.pk] = {field.removesuffix('_id') for field in values} | {'seq'}
+            else:
+                task = Task(owner=request.user)
+                created.append(task)
+            for field, value in values.items():
+                setattr(task, field, value)
+            written.append(task)
+
+        replaced = [task for task in updated if task._counted[:2] != (task.board_id, task.status)]
+        self.place_at_column_ends(created + replaced)
+        for task in replaced:
+            changed_fields[task.pk].add('position')
+        moved = [(task, task._counted[0]) for task in updated if task._counted[0] != task.board_id]
+        seqs = Board.next_seq({task.board_id for task in written} | {board_id for _, board_id in moved})
+        for task in written:
+            task.seq = seqs[task.board_id]
+        Task.objects.bulk_create(created)
+        updates = {}
+        for task in updated:
+            updates.setdefault(frozenset(changed_fields[task.pk]), []).append(task)
+        for fields, group in updates.items():
+            Task.objects.bulk_update(group, sorted(fields))
+        Tombstone.objects.bulk_create(
+            Tombstone(board_id=board_id, model='task', object_id=task.pk, seq=seqs[board_id]) for task, board_id in moved
+        )
+        moved_ids = {}
+        for task, _ in moved:
+            moved_ids.setdefault(task.board_id, []).append(task.pk)
+        for board_id, task_ids in moved_ids.items():
+            Comment.objects.filter(task_id__in=task_ids).update(seq=seqs[board_id])
+
+        changes = [((task.board_id, task.status, task.priority), 1) for task in created]
+        for task in updated:
+            current = (task.board_id, task.status, task.priority)
+            if task._counted != current:
+                changes += [(task._counted, -1), (current, 1)]
+            task.remember_counters()
+        BoardStats.count_tasks(changes)
+        for type, tasks in (('task.created', created), ('task.updated', updated)):
+            for task in tasks:
+                publish_event(type, task.board_id, {'board': task.board_id, 'task': task.pk})
+        for task, previous_board_id in moved:
+            publish_event('task.deleted', previous_board_id, {'board': previous_board_id, 'task': task.pk})
+        return written
+
+    def place_at_column_ends(self, tasks):
+        """
+        Append new tasks and tasks that changed column to the end of their column, in request order.
+        """
+        ends = Task.column_ends((task.board_id, task.status) for task in tasks)
+        for task in tasks:
+            column = (task.board_id, task.status)
+            task.position = ends[column] = rank_between(ends.get(column))
 
     
-class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class TaskRetrieveUpdateDestroyView(ReplicaReadMixin, ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated,  CanDeleteTask ]
     serializer_class = TaskDetailSerializer
-    queryset = Task.objects.all()
+    queryset = Task.objects.with_details()
+    etag_queryset = Task.objects.only('id', 'board_id', 'owner_id', 'assignee_id', 'reviewer_id')
+    etag_version_field = 'board__version'
     def perform_update(self, serializer):
         serializer.save()
 
-class CommentViewSet(generics.ListCreateAPIView):
+class TaskMoveView(ReplicaReadMixin, generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, CanMoveTask]
+    serializer_class = TaskMoveSerializer
+    queryset = Task.objects.with_details()
+
+    def post(self, request, *args, **kwargs):
+        """
+        Move a task to a status column and between two neighbour tasks,
+        writing only the row of the moved task.
+
+        Args:
+            request (Request): The HTTP request object with ``status``, ``before`` and ``after``.
+
+        Returns:
+            Response: The moved task.
+        """
+        task = self.get_object()
+        serializer = self.get_serializer(task, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(TaskDetailSerializer(task).data, status=status.HTTP_200_OK)
+
+class CommentViewSet(ReplicaReadMixin, ConditionalListMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
+    pagination_class = CommentPagination
+    etag_version_field = 'task__board__version'
     permission_classes = [IsAuthenticated, CanManageComment]
     
     def get_queryset(self):
@@ -69,8 +377,7 @@ class CommentViewSet(generics.ListCreateAPIView):
             QuerySet: Comments associated with the task. and ordered comments.
         """
         task_id = self.kwargs['task_id']
-        task = get_object_or_404(Task, id=task_id)
-        return Comment.objects.filter(Q(task = task)).order_by("-created_at")
+        return Comment.objects.filter(Q(task_id = task_id)).select_related('author').order_by("-created_at")
     
     def perform_create(self, serializer):
         """
@@ -79,11 +386,9 @@ class CommentViewSet(generics.ListCreateAPIView):
         Args:
             serializer (CommentSerializer): The serializer instance with validated data.
         """
-        task_id = self.kwargs['task_id']
-        task = get_object_or_404(Task, id=task_id)
-        serializer.save(author=self.request.user, task=task)
+        serializer.save(author=self.request.user, task_id=self.kwargs['task_id'])
 
-class CommentRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class CommentRetrieveUpdateDestroy(ReplicaReadMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated, CanManageComment]
     def get_queryset(self):
@@ -94,35 +399,39 @@ class CommentRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
             QuerySet: Comments authored by the user.
         """
         user = self.request.user
-        return Comment.objects.filter(Q(author = user))
+        return Comment.objects.filter(Q(author = user)).select_related('author')
       
-class TaskAssigneeView(generics.ListAPIView):
-    serializer_class = TaskDetailSerializer
+class TaskAssigneeView(ReplicaReadMixin, ConditionalListMixin, generics.ListAPIView):
+    serializer_class = TaskDetailValuesSerializer
+    pagination_class = TaskPagination
+    etag_version_field = 'board__version'
     permission_classes = [IsAuthenticated, IsAssigneeOrReviewerTask]
     def get_queryset(self):
         """
         Get the queryset of tasks assigned to the authenticated user.
 
         Returns:
-            QuerySet: Tasks where the user is the assignee.
+            QuerySet: Rows of the tasks where the user is the assignee, for TaskDetailValuesSerializer.
         """
         user = self.request.user
-        return Task.objects.filter(Q(assignee=user))
+        return Task.objects.filter(Q(assignee=user)).with_details().values(*TaskDetailValuesSerializer.values)
        
-class TaskReviewerView(generics.ListAPIView):
-    serializer_class = TaskDetailSerializer
+class TaskReviewerView(ReplicaReadMixin, ConditionalListMixin, generics.ListAPIView):
+    serializer_class = TaskDetailValuesSerializer
+    pagination_class = TaskPagination
+    etag_version_field = 'board__version'
     permission_classes = [IsAuthenticated, IsAssigneeOrReviewerTask]
     def get_queryset(self):
         """
         Get the queryset of tasks where the authenticated user is the reviewer.
 
         Returns:
-            QuerySet: Tasks where the user is the reviewer.
+            QuerySet: Rows of the tasks where the user is the reviewer, for TaskDetailValuesSerializer.
         """
         user = self.request.user
-        return Task.objects.filter(Q(reviewer=user))
+        return Task.objects.filter(Q(reviewer=user)).with_details().values(*TaskDetailValuesSerializer.values)
 
-class EmailCheckView(generics.GenericAPIView):
+class EmailCheckView(ReplicaReadMixin, generics.GenericAPIView):
     permission_classes  = [IsAuthenticated]
     serializer_class = CheckEmailSerializer
     
@@ -139,9 +448,8 @@ class EmailCheckView(generics.GenericAPIView):
         email = request.query_params.get("email")
         if not email:
             return Response({"detail": "Email query parameter is required"},status=status.HTTP_400_BAD_REQUEST)
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
+        user = users_by_email(email).first()
+        if user is None:
             return Response({"detail": "User not found"},status=status.HTTP_404_NOT_FOUND
         )
         data = {
@@ -151,3 +459,71 @@ class EmailCheckView(generics.GenericAPIView):
         }
         return Response(data, status=status.HTTP_200_OK)
 
+
+class ImportJobMixin:
+    """
+    Imports of the requesting user, run within the request.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ImportJobSerializer
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def run_import(self, job, status_code):
+        """
+        Import the rows of the job that are not imported yet, see kanmind_app.imports.BoardImport.
+
+        Returns:
+            Response: The job with its progress and row errors, or the failed job
+                when the file could not be imported.
+        """
+        try:
+            BoardImport(job).run()
+        except ImportConflict as error:
+            return Response({"detail": str(error)}, status=status.HTTP_409_CONFLICT)
+        except (UnicodeDecodeError, csv.Error) as error:
+            return Response({"detail": f"The file could not be read: {error}"}, status=status.HTTP_400_BAD_REQUEST)
+        except DATA_ERRORS as error:
+            return Response({**self.get_serializer(job).data, "detail": f"The import failed: {error}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(job).data, status=status_code)
+
+
+class ImportJobListCreateView(ReplicaReadMixin, ImportJobMixin, generics.ListCreateAPIView):
+    def create(self, request, *args, **kwargs):
+        """
+        Store an uploaded NDJSON or CSV file as a new import and run it.
+
+        Args:
+            request (Request): The multipart request with the ``file`` and its ``format``.
+
+        Returns:
+            Response: The finished job; rows that failed are listed in ``errors``.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(user=request.user)
+        return self.run_import(job, status.HTTP_201_CREATED)
+
+
+class ImportJobDetailView(ReplicaReadMixin, ImportJobMixin, generics.RetrieveAPIView):
+    """
+    The progress of an import, updated after every batch of rows.
+    """
+
+
+class ImportJobResumeView(ReplicaReadMixin, ImportJobMixin, generics.GenericAPIView):
+    def post(self, request, *args, **kwargs):
+        """
+        Continue an interrupted import after its last committed batch.
+
+        Args:
+            request (Request): The HTTP request object.
+
+        Returns:
+            Response: The job, unchanged when it was done already.
+        """
+        job = self.get_object()
+        if job.status == 'done':
+            return Response(self.get_serializer(job).data)
+        return self.run_import(job, status.HTTP_200_OK)
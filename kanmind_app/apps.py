@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class KanmindAppConfig(AppConfig):
     name = 'kanmind_app'
+
+    def ready(self):
+        """
+        Connect the signal handlers that keep the board statistics up to date.
+        """
+        from kanmind_app import signals  # noqa: F401
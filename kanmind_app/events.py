@@ -0,0 +1,223 @@
+import asyncio
+import secrets
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Event:
+    """
+    A change of a board, pushed to the users who can read the board.
+
+    Args:
+        id (int): Increasing ID of the event, sent as the SSE event ID.
+        type (str): Kind of change, e.g. ``task.updated``.
+        board_id (int | None): ID of the changed board, None for a ``reset``.
+        data (dict): JSON payload sent to the clients.
+        user_ids (Iterable[int]): Users to notify even if they cannot read the
+            board (anymore), e.g. members that were just removed.
+    """
+
+    def __init__(self, id, type, board_id, data, user_ids=()):
+        self.id = id
+        self.type = type
+        self.board_id = board_id
+        self.data = data
+        self.user_ids = frozenset(user_ids)
+
+    def __repr__(self):
+        return f'<Event {self.id} {self.type} board={self.board_id}>'
+
+
+class Subscription(ABC):
+    """
+    The stream of events of one client connection, created by Broker.subscribe().
+    """
+
+    @abstractmethod
+    async def get(self, timeout=None):
+        """
+        Wait for the next event.
+
+        Args:
+            timeout (float | None): Seconds to wait before giving up.
+
+        Returns:
+            Event | None: The next event, or None if the timeout passed first.
+        """
+
+    @abstractmethod
+    def close(self):
+        """
+        Stop receiving events.
+        """
+
+
+class Broker(ABC):
+    """
+    Fans out board change events to the open event streams.
+
+    ``KANMIND_EVENT_BROKER`` names the broker class. The LocalBroker only reaches
+    streams served by the same process; deployments running several server
+    processes need a broker backed by a shared message bus.
+    """
+
+    @abstractmethod
+    def publish(self, type, board_id, data, user_ids=()):
+        """
+        Send an event to all subscriptions.
+
+        Args:
+            type (str): Kind of change.
+            board_id (int): ID of the changed board.
+            data (dict): JSON payload of the event.
+            user_ids (Iterable[int]): Users to notify even without access to the board.
+
+        Returns:
+            Event: The published event.
+        """
+
+    @abstractmethod
+    def subscribe(self, last_event_id=None):
+        """
+        Open a subscription, replaying the events after ``last_event_id``.
+
+        When events after ``last_event_id`` are no longer available, the subscription
+        starts with a ``reset`` event telling the client to reload its boards.
+
+        Args:
+            last_event_id (int | None): ID of the last event the client received.
+
+        Returns:
+            Subscription: The subscription, to be closed by the caller.
+        """
+
+
+class LocalSubscription(Subscription):
+    def __init__(self, broker, queue_size):
+        self.broker = broker
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def deliver(self, event):
+        """
+        Queue an event, on the event loop of the subscription. A client too slow to
+        keep up loses its queued events and gets a ``reset`` instead.
+        """
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = self.broker.reset_event()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker(Broker):
+    """
+    In-process broker keeping the latest events in a ring buffer for resuming clients.
+
+    Publishing is thread-safe: events published from request threads are handed to
+    the event loop of every subscription with ``call_soon_threadsafe``.
+
+    Event IDs count up from a random epoch in their upper 32 bits, drawn when the broker
+    is created. A ``Last-Event-ID`` issued by another worker process, or by this one
+    before a restart, thus never falls into the buffer of this broker and the client
+    gets a ``reset`` instead of a replay of unrelated events.
+    """
+
+    def __init__(self, buffer_size=None, queue_size=None):
+        self.buffer = deque(maxlen=buffer_size or getattr(settings, 'KANMIND_EVENT_BUFFER_SIZE', 1000))
+        self.queue_size = queue_size or getattr(settings, 'KANMIND_EVENT_QUEUE_SIZE', 100)
+        self.last_id = secrets.randbits(31) << 32
+        self.subscriptions = set()
+        self.lock = threading.Lock()
+
+    def publish(self, type, board_id, data, user_ids=()):
+        with self.lock:
+            self.last_id += 1
+            event = Event(self.last_id, type, board_id, data, user_ids)
+            self.buffer.append(event)
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The event loop of the subscription is closed.
+                self.unsubscribe(subscription)
+        return event
+
+    def reset_event(self):
+        """
+        Build the event telling a client that it missed events.
+        """
+        return Event(self.last_id, 'reset', None, {})
+
+    def subscribe(self, last_event_id=None):
+        subscription = LocalSubscription(self, self.queue_size)
+        with self.lock:
+            if last_event_id is not None:
+                oldest = self.buffer[0].id if self.buffer else self.last_id + 1
+                if last_event_id > self.last_id or last_event_id + 1 < oldest:
+                    subscription.deliver(self.reset_event())
+                else:
+                    for event in self.buffer:
+                        if event.id > last_event_id:
+                            subscription.deliver(event)
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Forget a closed subscription.
+        """
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+
+def get_broker():
+    """
+    Get the broker of this process, an instance of ``KANMIND_EVENT_BROKER``.
+    """
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, 'KANMIND_EVENT_BROKER', 'kanmind_app.events.LocalBroker'))()
+        return _broker
+
+
+def reset_broker():
+    """
+    Drop the broker of this process, so the next get_broker() builds a new one.
+    """
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def publish_event(type, board_id, data, user_ids=()):
+    """
+    Publish a board change once the current transaction commits, so that
+    clients never reload a change that was rolled back.
+
+    Args:
+        type (str): Kind of change, e.g. ``task.updated``.
+        board_id (int): ID of the changed board.
+        data (dict): JSON payload of the event.
+        user_ids (Iterable[int]): Users to notify even without access to the board.
+    """
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: get_broker().publish(type, board_id, data, user_ids))
@@ -0,0 +1,136 @@
+import csv
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from kanmind_app.models import Comment, Task
+
+EXPORT_CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Columns of a CSV export, the union of the fields of all record types.
+CSV_COLUMNS = [
+    'type', 'id', 'board', 'task', 'title', 'description', 'status', 'priority', 'owner', 'members',
+    'assignee', 'reviewer', 'due_date', 'position', 'author', 'content', 'created_at',
+]
+
+TASK_VALUES = {
+    'id': 'id', 'board': 'board_id', 'title': 'title', 'description': 'description', 'status': 'status',
+    'priority': 'priority', 'owner': 'owner__email', 'assignee': 'assignee__email', 'reviewer': 'reviewer__email',
+    'due_date': 'due_date', 'position': 'position',
+}
+
+COMMENT_VALUES = {'id': 'id', 'task': 'task_id', 'author': 'author__email', 'content': 'content', 'created_at': 'created_at'}
+
+
+class EchoBuffer:
+    """
+    File-like object handing what csv.writer writes straight back, for streaming.
+    """
+
+    def write(self, value):
+        return value
+
+
+class BoardExport:
+    """
+    A board with its tasks and comments as a stream of records, one per object.
+
+    Every record has a ``type`` (``board``, ``task`` or ``comment``) and refers to
+    users by email and to its board or task by ID, the format read back by the
+    import. Rows are read in keyset batches of ``KANMIND_EXPORT_BATCH_SIZE``, each a
+    short query consumed with iterator(), so neither the memory nor the database
+    connection is held for the whole download, which runs at the pace of the client.
+    """
+
+    def __init__(self, board, batch_size=None):
+        self.board = board
+        self.batch_size = batch_size or getattr(settings, 'KANMIND_EXPORT_BATCH_SIZE', 2000)
+        # The stream is read after the view returned, so the database its request
+        # reads from (see kanmind_app.routers) is fixed here.
+        self.using = Task.objects.db
+
+    def records(self):
+        """
+        Yield the records in batches: the board, then its tasks, then their comments.
+
+        Yields:
+            list[dict]: The records of one batch.
+        """
+        board = self.board
+        members = board.members.using(self.using).order_by('id').values_list('email', flat=True)
+        yield [{'type': 'board', 'id': board.pk, 'title': board.title, 'owner': board.owner.email, 'members': list(members)}]
+        tasks = Task.objects.using(self.using).filter(board_id=board.pk)
+        comments = Comment.objects.using(self.using).filter(task__board_id=board.pk)
+        for record_type, queryset, fields in [('task', tasks, TASK_VALUES), ('comment', comments, COMMENT_VALUES)]:
+            for rows in self.batches(queryset.values(*fields.values())):
+                yield [{'type': record_type, **{name: row[column] for name, column in fields.items()}} for row in rows]
+
+    def batches(self, queryset):
+        """
+        Read a queryset of ``values()`` rows in batches ordered by ID.
+
+        Yields:
+            list[dict]: The rows of one batch.
+        """
+        last_id = 0
+        while True:
+            page = queryset.filter(id__gt=last_id).order_by('id')[:self.batch_size]
+            rows = list(page.iterator(chunk_size=self.batch_size))
+            self.release_connection()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < self.batch_size:
+                return
+            last_id = rows[-1]['id']
+
+    def release_connection(self):
+        # A pooled connection goes back to the pool while the client reads the batch.
+        connection = connections[self.using]
+        if getattr(connection, 'pool', None) is not None and not connection.in_atomic_block:
+            connection.close()
+
+    def ndjson(self):
+        """
+        Yield the export as newline delimited JSON, one chunk per batch.
+        """
+        for records in self.records():
+            yield ''.join(json.dumps(record, cls=DjangoJSONEncoder) + '\n' for record in records)
+
+    def csv(self):
+        """
+        Yield the export as CSV with the CSV_COLUMNS header, one chunk per batch.
+        The emails of the board members are separated by spaces.
+        """
+        writer = csv.DictWriter(EchoBuffer(), CSV_COLUMNS)
+        yield writer.writeheader()
+        for records in self.records():
+            yield ''.join(writer.writerow(self.csv_row(record)) for record in records)
+
+    def csv_row(self, record):
+        row = {}
+        for name, value in record.items():
+            if name == 'members':
+                value = ' '.join(value)
+            elif hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            row[name] = '' if value is None else value
+        return row
+
+    def stream(self, fmt):
+        """
+        Get the chunks of the export in a format of EXPORT_CONTENT_TYPES.
+        """
+        return self.ndjson() if fmt == 'ndjson' else self.csv()
+
+    async def astream(self, fmt):
+        """
+        Yield the chunks of stream() to an ASGI server, reading one batch at a time
+        in a thread. Given a sync iterator, Django's ASGI handler would read all of it
+        into memory before sending the first chunk.
+        """
+        chunks = self.stream(fmt)
+        read_chunk = sync_to_async(next)
+        while (chunk := await read_chunk(chunks, None)) is not None:
+            yield chunk
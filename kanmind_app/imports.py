@@ -0,0 +1,370 @@
+import csv
+import io
+import itertools
+import json
+from collections import Counter
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from auth_app.backends import normalize_email, users_by_email
+from kanmind_app.api.serializers import BoardImportSerializer, CommentImportSerializer, TaskImportSerializer
+from kanmind_app.events import publish_event
+from kanmind_app.models import Board, BoardStats, Comment, ImportJob, ImportRef, Task
+from kanmind_app.ranking import rank_between
+
+ROW_SERIALIZERS = {'board': BoardImportSerializer, 'task': TaskImportSerializer, 'comment': CommentImportSerializer}
+
+# Errors caused by the contents of a file, which fail the import instead of the server.
+DATA_ERRORS = (csv.Error, DataError, IntegrityError, KeyError, TypeError, ValueError)
+
+# Fields of each row type holding user emails.
+USER_FIELDS = {'board': ['owner', 'members'], 'task': ['owner', 'assignee', 'reviewer'], 'comment': ['author']}
+
+
+class ImportConflict(Exception):
+    """
+    Raised when another process imports the same job at the same time.
+    """
+
+
+def read_rows(file, fmt):
+    """
+    Read the rows of an import file in the format of kanmind_app.exports.
+
+    Empty values are left out, so they fall back to the defaults of the row
+    serializers; CSV cannot tell an empty description from a missing one. In CSV,
+    the emails of the board members are separated by spaces.
+
+    Args:
+        file: The file opened in binary mode.
+        fmt (str): ``ndjson`` or ``csv``.
+
+    Yields:
+        tuple[int, dict | None]: The line (NDJSON) or record (CSV) number and the row,
+            None when the line is no JSON object.
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+    if fmt == 'csv':
+        for number, record in enumerate(csv.DictReader(text), 1):
+            row = {name: value for name, value in record.items() if name and value not in ('', None)}
+            if 'members' in row:
+                row['members'] = row['members'].split()
+            yield number, row
+        return
+    for number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, {name: value for name, value in row.items() if value is not None} if isinstance(row, dict) else None
+
+
+class BoardImport:
+    """
+    Import the boards, tasks and comments of the file of an ImportJob.
+
+    The rows are handled in batches of ``KANMIND_IMPORT_BATCH_SIZE``: they are
+    validated, their users are looked up by email with one query, and their tasks
+    and comments are inserted with bulk_create. Each batch commits in its own
+    transaction together with the progress of the job, so that run() resumes an
+    interrupted import after its last committed batch. Rows refer to boards and
+    tasks by their ID in the file, which ImportRef maps to the created objects.
+    """
+
+    def __init__(self, job, batch_size=None):
+        self.job = job
+        self.batch_size = batch_size or getattr(settings, 'KANMIND_IMPORT_BATCH_SIZE', 500)
+
+    def run(self, progress=None):
+        """
+        Import the rows after ``rows_done``, batch by batch.
+
+        Args:
+            progress (Callable[[ImportJob], None]): Called after every committed batch.
+
+        Raises:
+            ImportConflict: if another process imports the job meanwhile.
+            Exception: any other error, after marking the job as failed; the
+                errors of DATA_ERRORS are caused by the file.
+        """
+        job = self.job
+        job.status = 'running'
+        job.save(update_fields=['status', 'updated_at'])
+        try:
+            with job.file.open('rb') as file:
+                rows = itertools.islice(read_rows(file, job.format), job.rows_done, None)
+                while batch := list(itertools.islice(rows, self.batch_size)):
+                    self.import_batch(batch)
+                    if progress is not None:
+                        progress(job)
+        except ImportConflict:
+            raise
+        except Exception:
+            ImportJob.objects.filter(pk=job.pk).update(status='failed')
+            job.status = 'failed'
+            raise
+        job.status = 'done'
+        job.save(update_fields=['status', 'updated_at'])
+
+    def import_batch(self, batch):
+        """
+        Validate and insert one batch of rows, and record the progress of the job, in one transaction.
+
+        Args:
+            batch (list[tuple[int, dict | None]]): Numbered rows, see read_rows().
+        """
+        job = self.job
+        with transaction.atomic():
+            rows_done = ImportJob.objects.select_for_update().filter(pk=job.pk).values_list('rows_done', flat=True).get()
+            if rows_done != job.rows_done:
+                raise ImportConflict(f'Import {job.pk} was continued by another process.')
+            self.errors = []
+            self.new_refs = []
+            self.task_boards = {}
+            self.changed_board_ids = set()
+            rows = self.validate(batch)
+            self.load_references(rows)
+            created = Counter()
+            created['board'] = self.create_boards(rows['board'])
+            created['task'] = self.create_tasks(rows['task'])
+            created['comment'] = self.create_comments(rows['comment'])
+            ImportRef.objects.bulk_create(self.new_refs)
+
+            job.rows_done += len(batch)
+            job.boards_created += created['board']
+            job.tasks_created += created['task']
+            job.comments_created += created['comment']
+            self.errors.sort(key=lambda error: error['row'])
+            job.error_count += len(self.errors)
+            job.errors += self.errors[:max(0, getattr(settings, 'KANMIND_IMPORT_MAX_ERRORS', 1000) - len(job.errors))]
+            job.save(update_fields=[
+                'rows_done', 'boards_created', 'tasks_created', 'comments_created', 'error_count', 'errors', 'updated_at',
+            ])
+            for board_id in self.changed_board_ids:
+                publish_event('board.updated', board_id, {'board': board_id})
+
+    def add_error(self, number, errors):
+        self.errors.append({'row': number, 'errors': errors})
+
+    def validate(self, batch):
+        """
+        Validate the fields of every row with the serializer of its type.
+
+        Returns:
+            dict: The valid ``(number, data)`` rows by type, in file order.
+        """
+        rows = {row_type: [] for row_type in ROW_SERIALIZERS}
+        for number, row in batch:
+            if row is None:
+                self.add_error(number, {'non_field_errors': ['Not a JSON object.']})
+                continue
+            row_type = row.get('type')
+            serializer_class = ROW_SERIALIZERS.get(row_type) if isinstance(row_type, str) else None
+            if serializer_class is None:
+                self.add_error(number, {'type': [f'Must be one of {", ".join(ROW_SERIALIZERS)}.']})
+                continue
+            serializer = serializer_class(data=row)
+            if serializer.is_valid():
+                rows[row['type']].append((number, serializer.validated_data))
+            else:
+                self.add_error(number, serializer.errors)
+        return rows
+
+    def load_references(self, rows):
+        """
+        Look up the users of the batch by email, and the boards and tasks it refers
+        to or defines by their ID in the file, with one query each.
+        """
+        emails = set()
+        for row_type, fields in USER_FIELDS.items():
+            for _, data in rows[row_type]:
+                for field in fields:
+                    value = data.get(field)
+                    emails.update(value if isinstance(value, list) else [value] if value else [])
+        self.users = {normalize_email(user.email): user for user in users_by_email(*emails)} if emails else {}
+
+        source_ids = {data['board'] for _, data in rows['task']} | {data['task'] for _, data in rows['comment']}
+        source_ids |= {data['id'] for row_type in ('board', 'task') for _, data in rows[row_type] if 'id' in data}
+        refs = ImportRef.objects.filter(job=self.job, source_id__in=source_ids).values_list('model', 'source_id', 'target_id')
+        self.refs = {(model, source_id): target_id for model, source_id, target_id in refs}
+        self.members, self.member_boards = set(), set()
+
+    def resolve_users(self, number, data, fields, board_id=None):
+        """
+        Replace the emails of a row by users, who must be members of the board if given.
+
+        Returns:
+            dict | None: The users by field, a list of them for ``members``, or None
+                when the row was rejected.
+        """
+        users, errors = {}, {}
+        for field in fields:
+            if field not in data:
+                continue
+            emails = data[field] if isinstance(data[field], list) else [data[field]]
+            found = [self.users.get(normalize_email(email)) for email in emails]
+            messages = [f'Unknown user {email}.' for email, user in zip(emails, found) if user is None]
+            if board_id is not None:
+                messages += [f'{user.email} is not a member of the board.' for user in found if user and (board_id, user.pk) not in self.members]
+            if messages:
+                errors[field] = messages
+            users[field] = found if isinstance(data[field], list) else found[0]
+        if errors:
+            self.add_error(number, errors)
+            return None
+        return users
+
+    def resolve_ref(self, number, model, source_id, field):
+        """
+        Get the ID of the board or task created for an ID of the file.
+
+        Returns:
+            int | None: The ID, None when the row was rejected.
+        """
+        target_id = self.refs.get((model, source_id))
+        if target_id is None:
+            self.add_error(number, {field: [f'Unknown {model} {source_id}, its row is missing or was rejected.']})
+        return target_id
+
+    def claim_id(self, number, model, source_id):
+        """
+        Reserve the ID of a board or task of the file for the row defining it.
+
+        Returns:
+            bool: False if an earlier row used the ID already.
+        """
+        if source_id is None:
+            return True
+        if (model, source_id) in self.refs:
+            self.add_error(number, {'id': [f'Duplicate {model} {source_id}.']})
+            return False
+        self.refs[(model, source_id)] = None
+        return True
+
+    def add_ref(self, model, source_id, target_id):
+        if source_id is not None:
+            self.refs[(model, source_id)] = target_id
+            self.new_refs.append(ImportRef(job=self.job, model=model, source_id=source_id, target_id=target_id))
+
+    def load_members(self, board_ids):
+        """
+        Load the memberships of the given boards, which the users of tasks and comments must have.
+        """
+        board_ids = set(board_ids) - self.member_boards
+        if board_ids:
+            self.members |= set(Board.members.through.objects.filter(board_id__in=board_ids).values_list('board_id', 'user_id'))
+            self.member_boards |= board_ids
+
+    def create_boards(self, rows):
+        """
+        Create the boards of the batch, owned by the importing user. Boards are few,
+        so they are saved one by one, which keeps their statistics and access caches.
+        """
+        created = 0
+        for number, data in rows:
+            users = self.resolve_users(number, data, USER_FIELDS['board'])
+            if users is None or not self.claim_id(number, 'board', data['id']):
+                continue
+            members = {self.job.user, *filter(None, [users.get('owner'), *users.get('members', [])])}
+            board = Board.objects.create(title=data['title'], owner=self.job.user)
+            board.members.add(*members)
+            self.add_ref('board', data['id'], board.pk)
+            self.members |= {(board.pk, user.pk) for user in members}
+            self.member_boards.add(board.pk)
+            created += 1
+        return created
+
+    def create_tasks(self, rows):
+        """
+        Insert the tasks of the batch with one bulk_create, stamped with the next
+        version of their boards, and count them in the board statistics.
+        """
+        targets = [(number, data, self.resolve_ref(number, 'board', data['board'], 'board')) for number, data in rows]
+        targets = [(number, data, board_id) for number, data, board_id in targets if board_id is not None]
+        self.load_members(board_id for _, _, board_id in targets)
+        tasks = []
+        for number, data, board_id in targets:
+            users = self.resolve_users(number, data, USER_FIELDS['task'], board_id)
+            if users is None or not self.claim_id(number, 'task', data.get('id')):
+                continue
+            tasks.append((number, data.get('id'), Task(
+                board_id=board_id,
+                owner=users.get('owner') or self.job.user,
+                title=data['title'],
+                description=data.get('description'),
+                status=data.get('status', 'to-do'),
+                priority=data.get('priority', 'medium'),
+                assignee=users.get('assignee'),
+                reviewer=users.get('reviewer'),
+                due_date=data.get('due_date'),
+                position=data.get('position', ''),
+            )))
+        if not tasks:
+            return 0
+
+        # A resumed import finds no version for boards deleted since the earlier batches.
+        seqs = Board.next_seq([task.board_id for _, _, task in tasks])
+        for number, _, task in tasks:
+            if task.board_id not in seqs:
+                self.add_error(number, {'board': ['The board no longer exists.']})
+        tasks = [(source_id, task) for _, source_id, task in tasks if task.board_id in seqs]
+        if not tasks:
+            return 0
+
+        # Tasks without a position are appended to their column.
+        ends = Task.column_ends({(task.board_id, task.status) for _, task in tasks if not task.position})
+        for _, task in tasks:
+            if not task.position:
+                task.position = rank_between(ends.get((task.board_id, task.status)))
+                ends[(task.board_id, task.status)] = task.position
+            task.seq = seqs[task.board_id]
+        Task.objects.bulk_create([task for _, task in tasks])
+        for source_id, task in tasks:
+            self.add_ref('task', source_id, task.pk)
+            self.task_boards[task.pk] = task.board_id
+        BoardStats.count_tasks([((task.board_id, task.status, task.priority), 1) for _, task in tasks])
+        self.changed_board_ids.update(seqs)
+        return len(tasks)
+
+    def create_comments(self, rows):
+        """
+        Insert the comments of the batch with one bulk_create, stamped with the next version of their boards.
+        """
+        targets = [(number, data, self.resolve_ref(number, 'task', data['task'], 'task')) for number, data in rows]
+        targets = [(number, data, task_id) for number, data, task_id in targets if task_id is not None]
+        if not targets:
+            return 0
+        task_boards = self.task_boards
+        missing = {task_id for _, _, task_id in targets} - set(task_boards)
+        if missing:
+            task_boards.update(Task.objects.filter(pk__in=missing).values_list('id', 'board_id'))
+        # A resumed import does not find tasks deleted since the earlier batches.
+        for number, _, task_id in targets:
+            if task_id not in task_boards:
+                self.add_error(number, {'task': ['The task no longer exists.']})
+        targets = [(number, data, task_id) for number, data, task_id in targets if task_id in task_boards]
+        self.load_members(task_boards.values())
+        comments = []
+        for number, data, task_id in targets:
+            users = self.resolve_users(number, data, USER_FIELDS['comment'], task_boards[task_id])
+            if users is None:
+                continue
+            comment = Comment(task_id=task_id, author=users.get('author') or self.job.user, content=data['content'])
+            comment.imported_created_at = data.get('created_at')
+            comments.append(comment)
+        if not comments:
+            return 0
+
+        seqs = Board.next_seq([task_boards[comment.task_id] for comment in comments])
+        for comment in comments:
+            comment.seq = seqs[task_boards[comment.task_id]]
+        Comment.objects.bulk_create(comments)
+        # created_at is set on insert, so the dates of the file are written afterwards.
+        dated = [comment for comment in comments if comment.imported_created_at is not None]
+        for comment in dated:
+            comment.created_at = comment.imported_created_at
+        if dated:
+            Comment.objects.bulk_update(dated, ['created_at'])
+        self.changed_board_ids.update(seqs)
+        return len(comments)
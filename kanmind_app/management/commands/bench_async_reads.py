@@ -0,0 +1,78 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ['boards/', 'tasks/assigned-to-me/', 'tasks/reviewing/']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the concurrent throughput of the read endpoints served by the WSGI '
+        'application (core/wsgi.py) with their async variants served by the ASGI one (core/asgi.py).'
+    )
+
+    def add_arguments(self, parser):
+        """
+        Register the command line options of the command.
+        """
+        parser.add_argument('--token', required=True, help='Token of the user making the requests.')
+        parser.add_argument('--wsgi-url', default='http://127.0.0.1:8000', help='Base URL of the WSGI server, e.g. gunicorn.')
+        parser.add_argument('--asgi-url', default='http://127.0.0.1:8001', help='Base URL of the ASGI server, e.g. uvicorn.')
+        parser.add_argument('--host', help='Host header to send, one of ALLOWED_HOSTS.')
+        parser.add_argument('--path', action='append', dest='paths', help=f'Endpoint below /api/, repeatable (default: {", ".join(DEFAULT_PATHS)}).')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and server.')
+
+    def handle(self, *args, **options):
+        """
+        Load every endpoint on both servers and print requests per second and latency percentiles.
+        """
+        headers = {'Authorization': f'Token {options["token"]}'}
+        if options['host']:
+            headers['Host'] = options['host']
+        self.stdout.write(f'{"endpoint":<40} {"server":<6} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errors":>7}')
+        for path in options['paths'] or DEFAULT_PATHS:
+            for server, url in (('wsgi', f'{options["wsgi_url"]}/api/{path}'), ('asgi', f'{options["asgi_url"]}/api/async/{path}')):
+                rate, latencies, errors = self.load(url, headers, options['requests'], options['concurrency'])
+                p50, p95 = (statistics.quantiles(latencies, n=100)[i] * 1000 for i in (49, 94))
+                self.stdout.write(f'{path:<40} {server:<6} {rate:>8.1f} {p50:>8.1f} {p95:>8.1f} {errors:>7}')
+
+    def load(self, url, headers, count, concurrency):
+        """
+        Send ``count`` GET requests to ``url`` from ``concurrency`` threads.
+
+        Returns:
+            tuple: Requests per second, the latency of every request in seconds, and the number of failed requests.
+        """
+        def fetch(_):
+            request = urllib.request.Request(url, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                failed = False
+            except (urllib.error.URLError, OSError):
+                failed = True
+            return time.perf_counter() - started, failed
+
+        self.check_endpoint(url, headers)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(fetch, range(count)))
+        elapsed = time.perf_counter() - started
+        return count / elapsed, [latency for latency, _ in results], sum(failed for _, failed in results)
+
+    def check_endpoint(self, url, headers):
+        """
+        Fail early with a readable error when a server is down or refuses the token.
+
+        Raises:
+            CommandError: if the endpoint does not answer 200.
+        """
+        try:
+            urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=10).close()
+        except (urllib.error.URLError, OSError) as exc:
+            raise CommandError(f'GET {url} failed: {exc}')
@@ -0,0 +1,238 @@
+import itertools
+import json
+import math
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from auth_app.api.urls import urlpatterns as auth_urlpatterns
+from kanmind_app.api.urls import urlpatterns as kanmind_urlpatterns
+from kanmind_app.exports import BoardExport
+from kanmind_app.models import Board, Comment, ImportJob, Task
+
+# Routes that cannot be timed as one request and response.
+SKIPPED = {'board-events': 'endless event stream'}
+
+
+def percentile(values, percent):
+    """
+    Get the nearest-rank percentile of a list of numbers.
+    """
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Call every route of the kanmind and auth APIs through the test client and write latency '
+        'percentiles, query counts and response sizes as JSON, to compare runs across commits. '
+        'Runs against the configured database, e.g. filled by seed_kanmind, and rolls back its writes.'
+    )
+
+    def add_arguments(self, parser):
+        """
+        Register the command line options of the command.
+        """
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario before timing.')
+        parser.add_argument('--board', type=int, help='Board to work on, the one with the most tasks by default.')
+        parser.add_argument('--password', default='kanmind-seed', help='Password of the board owner, for the login scenario.')
+        parser.add_argument('--only', action='append', help='Run only the scenarios of this route name, repeatable.')
+        parser.add_argument('--output', help='File to write the JSON results to, instead of stdout.')
+
+    def handle(self, *args, **options):
+        """
+        Run every scenario within a transaction that is rolled back at the end.
+
+        Raises:
+            CommandError: if there is no board to work on.
+        """
+        board = self.get_board(options['board'])
+        self.board = board
+        self.user = board.owner
+        self.member = board.members.exclude(pk=self.user.pk).first() or self.user
+        self.password = options['password']
+        self.counter = itertools.count()
+        routes = {pattern.name: str(pattern.pattern) for pattern in [*kanmind_urlpatterns, *auth_urlpatterns]}
+        missing = sorted(set(routes) - {name for name, _, _ in self.get_scenarios()} - set(SKIPPED))
+        if missing:
+            raise CommandError(f'No benchmark scenario for the routes {", ".join(missing)}.')
+
+        results = []
+        media = tempfile.TemporaryDirectory()
+        settings_override = override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], MEDIA_ROOT=media.name)
+        with media, settings_override, transaction.atomic():
+            self.client = Client(headers={'Authorization': f'Token {Token.objects.get_or_create(user=self.user)[0].key}'})
+            self.task = self.new_task()
+            self.comment = Comment.objects.create(task=self.task, author=self.user, content='Benchmark comment')
+            # The board row and the first 200 tasks and comments of the board.
+            self.import_content = '\n'.join(''.join(BoardExport(board).ndjson()).splitlines()[:201]).encode()
+            self.import_job = ImportJob.objects.create(user=self.user, format='ndjson', status='done', file=self.import_file())
+            for name, method, build in self.get_scenarios():
+                if options['only'] and name not in options['only']:
+                    continue
+                results.append({'name': name, 'route': routes[name], 'method': method, **self.run(build, method, options)})
+            transaction.set_rollback(True)
+
+        report = {
+            'commit': self.get_commit(),
+            'created_at': timezone.now().isoformat(),
+            'iterations': options['iterations'],
+            'dataset': {
+                'users': User.objects.count(),
+                'boards': Board.objects.count(),
+                'tasks': Task.objects.count(),
+                'comments': Comment.objects.count(),
+                'board_tasks': board.tasks.count(),
+                'board_members': board.members.count(),
+            },
+            'skipped': SKIPPED,
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+            self.write_table(results)
+        else:
+            self.stdout.write(output)
+
+    def get_board(self, board_id):
+        boards = Board.objects.select_related('owner')
+        if board_id is not None:
+            board = boards.filter(pk=board_id).first()
+        else:
+            board = boards.order_by('-stats__ticket_count', 'id').first()
+        if board is None:
+            raise CommandError('No board to benchmark, create some with seed_kanmind first.')
+        return board
+
+    def get_commit(self):
+        try:
+            result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return result.stdout.strip() or None
+
+    def get_scenarios(self):
+        """
+        List the requests to time as ``(route name, method, build)``. ``build`` is called
+        untimed before every request and returns its path, JSON body and extra headers,
+        creating what the request consumes, e.g. the task it deletes.
+        """
+        board = self.board
+        return [
+            ('email-check', 'GET', lambda: (f'/api/email-check/?email={self.member.email}', None, {})),
+            ('board-list-create', 'GET', lambda: ('/api/boards/', None, {})),
+            ('board-list-create', 'POST', lambda: ('/api/boards/', {'title': 'Benchmark board', 'members': [self.member.pk]}, {})),
+            ('board-detail', 'GET', lambda: (f'/api/boards/{board.pk}/', None, {})),
+            ('board-detail', 'PATCH', lambda: (f'/api/boards/{board.pk}/', {'title': f'Benchmark board {next(self.counter)}'}, {})),
+            ('board-detail', 'DELETE', lambda: (f'/api/boards/{self.new_board().pk}/', None, {})),
+            ('board-changes', 'GET', lambda: (f'/api/boards/{board.pk}/changes/?since=0', None, {})),
+            ('board-export', 'GET', lambda: (f'/api/boards/{board.pk}/export/', None, {})),
+            ('board-export', 'GET', lambda: (f'/api/boards/{board.pk}/export/?fmt=csv', None, {})),
+            ('create-task', 'GET', lambda: ('/api/tasks/?page_size=50', None, {})),
+            ('create-task', 'POST', lambda: ('/api/tasks/', {'board': board.pk, 'title': 'Benchmark task', 'status': 'to-do', 'priority': 'low'}, {})),
+            ('task-bulk', 'POST', lambda: ('/api/tasks/bulk/', self.bulk_items(), {})),
+            ('taskassigned-user', 'GET', lambda: ('/api/tasks/assigned-to-me/', None, {})),
+            ('taskreviewing-user', 'GET', lambda: ('/api/tasks/reviewing/', None, {})),
+            ('task-detail', 'GET', lambda: (f'/api/tasks/{self.task.pk}/', None, {})),
+            ('task-detail', 'PATCH', lambda: (f'/api/tasks/{self.task.pk}/', {'priority': 'high'}, {})),
+            ('task-detail', 'DELETE', lambda: (f'/api/tasks/{self.new_task().pk}/', None, {})),
+            ('task-move', 'POST', lambda: (f'/api/tasks/{self.task.pk}/move/', {'status': Task.STATUS_CHOICES[next(self.counter) % 4][0]}, {})),
+            ('tasklist-comments', 'GET', lambda: (f'/api/tasks/{self.task.pk}/comments/', None, {})),
+            ('tasklist-comments', 'POST', lambda: (f'/api/tasks/{self.task.pk}/comments/', {'content': 'Benchmark comment'}, {})),
+            ('comment-detail', 'PATCH', lambda: (f'/api/tasks/{self.task.pk}/comments/{self.comment.pk}/', {'content': 'Edited'}, {})),
+            ('comment-detail', 'DELETE', lambda: (f'/api/tasks/{self.task.pk}/comments/{self.new_comment().pk}/', None, {})),
+            ('async-board-list', 'GET', lambda: ('/api/async/boards/', None, {})),
+            ('async-board-detail', 'GET', lambda: (f'/api/async/boards/{board.pk}/', None, {})),
+            ('async-taskassigned-user', 'GET', lambda: ('/api/async/tasks/assigned-to-me/', None, {})),
+            ('async-taskreviewing-user', 'GET', lambda: ('/api/async/tasks/reviewing/', None, {})),
+            ('async-tasklist-comments', 'GET', lambda: (f'/api/async/tasks/{self.task.pk}/comments/', None, {})),
+            ('import-list-create', 'GET', lambda: ('/api/imports/', None, {})),
+            ('import-list-create', 'POST', lambda: ('/api/imports/', {'file': self.import_file(), 'format': 'ndjson'}, {})),
+            ('import-detail', 'GET', lambda: (f'/api/imports/{self.import_job.pk}/', None, {})),
+            ('import-resume', 'POST', lambda: (f'/api/imports/{self.import_job.pk}/resume/', None, {})),
+            ('login', 'POST', lambda: ('/api/login/', {'email': self.user.email, 'password': self.password}, {})),
+            ('registration', 'POST', lambda: ('/api/registration/', self.new_registration(), {})),
+            ('logout', 'POST', lambda: ('/api/logout/', None, {'Authorization': f'Token {Token.objects.get_or_create(user=self.member)[0].key}'})),
+        ]
+
+    def new_board(self):
+        board = Board.objects.create(title='Benchmark board', owner=self.user)
+        board.members.add(self.user, self.member)
+        return board
+
+    def new_task(self):
+        return Task.objects.create(board=self.board, owner=self.user, title='Benchmark task')
+
+    def new_comment(self):
+        return Comment.objects.create(task=self.task, author=self.user, content='Benchmark comment')
+
+    def import_file(self):
+        return SimpleUploadedFile('board.ndjson', self.import_content)
+
+    def new_registration(self):
+        number = next(self.counter)
+        return {'fullname': f'bench-{number}', 'email': f'bench-{number}@example.com', 'password': 'bench-pw-1', 'repeated_password': 'bench-pw-1'}
+
+    def bulk_items(self):
+        # Only their owner may update tasks.
+        ids = self.board.tasks.filter(owner=self.user).order_by('id').values_list('id', flat=True)[:10]
+        return [{'id': task_id, 'priority': 'medium'} for task_id in ids]
+
+    def run(self, build, method, options):
+        """
+        Send the warm-up requests, then the timed ones, of one scenario.
+
+        Returns:
+            dict: Latency percentiles in milliseconds, query counts, response sizes and status codes.
+        """
+        latencies, queries, sizes, statuses = [], [], [], Counter()
+        for i in range(options['warmup'] + options['iterations']):
+            path, data, headers = build()
+            with CaptureQueriesContext(connections['default']) as captured:
+                started = time.perf_counter()
+                if method == 'GET':
+                    response = self.client.get(path, headers=headers)
+                elif isinstance(data, dict) and 'file' in data:
+                    response = self.client.post(path, data, headers=headers)
+                else:
+                    body = json.dumps(data) if data is not None else ''
+                    response = self.client.generic(method, path, body, content_type='application/json', headers=headers)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - started
+            if i < options['warmup']:
+                continue
+            latencies.append(elapsed * 1000)
+            queries.append(len(captured))
+            sizes.append(len(content))
+            statuses[response.status_code] += 1
+        return {
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'queries': round(statistics.median(queries)),
+            'max_queries': max(queries),
+            'bytes': round(statistics.median(sizes)),
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        }
+
+    def write_table(self, results):
+        self.stdout.write(f'{"route":<26} {"method":<7} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8} {"bytes":>9}  statuses')
+        for result in results:
+            self.stdout.write(
+                f'{result["name"]:<26} {result["method"]:<7} {result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} '
+                f'{result["p99_ms"]:>8.2f} {result["queries"]:>8} {result["bytes"]:>9}  {result["statuses"]}'
+            )
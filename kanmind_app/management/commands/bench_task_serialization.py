@@ -0,0 +1,55 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from kanmind_app.api.serializers import TaskDetailSerializer, TaskDetailValuesSerializer
+from kanmind_app.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare fetching, serializing and rendering a task list with TaskDetailSerializer and with '
+        'its values() fast path, TaskDetailValuesSerializer. Runs on the configured database, e.g. '
+        'filled by seed_kanmind.'
+    )
+
+    def add_arguments(self, parser):
+        """
+        Register the command line options of the command.
+        """
+        parser.add_argument('--rows', type=int, default=2000, help='Tasks per list.')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed runs per path.')
+
+    def handle(self, *args, **options):
+        """
+        Time both paths alternately and print their median durations.
+
+        Raises:
+            CommandError: if there are no tasks, or the paths render different bytes.
+        """
+        queryset = Task.objects.with_details().order_by('due_date', 'id')[:options['rows']]
+        paths = {
+            'serializer': lambda: JSONRenderer().render(TaskDetailSerializer(list(queryset), many=True).data),
+            'values': lambda: JSONRenderer().render(
+                TaskDetailValuesSerializer(list(queryset.values(*TaskDetailValuesSerializer.values)), many=True).data
+            ),
+        }
+        bodies = {name: render() for name, render in paths.items()}
+        if bodies['serializer'] == b'[]':
+            raise CommandError('No tasks to serialize, create some with seed_kanmind first.')
+        if bodies['values'] != bodies['serializer']:
+            raise CommandError('The values() fast path renders different bytes than TaskDetailSerializer.')
+
+        timings = {name: [] for name in paths}
+        for _ in range(options['iterations']):
+            for name, render in paths.items():
+                started = time.perf_counter()
+                render()
+                timings[name].append((time.perf_counter() - started) * 1000)
+
+        rows = bodies['serializer'].count(b'"comments_count"')
+        medians = {name: statistics.median(values) for name, values in timings.items()}
+        self.stdout.write(f'{rows} tasks, {len(bodies["serializer"])} bytes, median of {options["iterations"]} runs:')
+        for name, median in medians.items():
+            self.stdout.write(f'{name:<12} {median:>9.2f} ms  {rows / median * 1000:>10.0f} tasks/s')
+        self.stdout.write(self.style.SUCCESS(f'values() path is {medians["serializer"] / medians["values"]:.1f}x faster.'))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from kanmind_app.models import Board, Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete old tombstones; clients that synced before them get their full board again.'
+
+    def add_arguments(self, parser):
+        """
+        Register the command line options of the command.
+        """
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'KANMIND_TOMBSTONE_RETENTION_DAYS', 30),
+            help='Keep tombstones younger than this many days.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Raise ``compacted_seq`` of the affected boards past the deleted tombstones, then delete them.
+        """
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        old = Tombstone.objects.filter(created_at__lt=cutoff)
+        last_seq = old.filter(board=OuterRef('pk')).order_by().values('board').annotate(last=Max('seq')).values('last')
+        with transaction.atomic():
+            boards = Board.objects.filter(id__in=old.values('board_id')).update(compacted_seq=Greatest(F('compacted_seq'), Subquery(last_seq)))
+            deleted, _ = old.delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones of {boards} boards.'))
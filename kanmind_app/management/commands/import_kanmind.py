@@ -0,0 +1,72 @@
+import os
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from auth_app.backends import users_by_email
+from kanmind_app.imports import DATA_ERRORS, BoardImport, ImportConflict
+from kanmind_app.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Import boards, tasks and comments from an NDJSON or CSV file in the format of the board export. '
+        'The file is stored as an import job, which --resume continues after an interruption.'
+    )
+
+    def add_arguments(self, parser):
+        """
+        Register the command line options of the command.
+        """
+        parser.add_argument('path', nargs='?', help='File to import.')
+        parser.add_argument('--user', help='Email of the user importing, who owns the imported boards.')
+        parser.add_argument('--format', choices=['ndjson', 'csv'], help='Format of the file, by default from its extension.')
+        parser.add_argument('--resume', type=int, metavar='JOB_ID', help='Continue an interrupted import instead.')
+        parser.add_argument('--batch-size', type=int, help='Rows validated and committed together, KANMIND_IMPORT_BATCH_SIZE by default.')
+
+    def handle(self, *args, **options):
+        """
+        Create the import job, or load the one to resume, and run it with progress output.
+
+        Raises:
+            CommandError: if the arguments are incomplete, the job is done or busy, or the file failed it.
+        """
+        job = self.resume_job(options['resume']) if options['resume'] else self.create_job(options)
+        try:
+            BoardImport(job, options['batch_size']).run(progress=self.write_progress)
+        except ImportConflict as error:
+            raise CommandError(str(error))
+        except DATA_ERRORS as error:
+            raise CommandError(f'Import {job.pk} failed: {error}')
+        for error in job.errors[:20]:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Import {job.pk} done: {job.boards_created} boards, {job.tasks_created} tasks, '
+            f'{job.comments_created} comments, {job.error_count} rows rejected.'
+        ))
+
+    def create_job(self, options):
+        if not options['path'] or not options['user']:
+            raise CommandError('Pass the file to import and --user, or --resume.')
+        user = users_by_email(options['user']).first()
+        if user is None:
+            raise CommandError(f'No user with the email {options["user"]}.')
+        fmt = options['format'] or ('csv' if options['path'].lower().endswith('.csv') else 'ndjson')
+        job = ImportJob(user=user, format=fmt)
+        with open(options['path'], 'rb') as file:
+            job.file.save(os.path.basename(options['path']), File(file), save=False)
+        job.save()
+        self.stdout.write(f'Created import {job.pk}, resume it with --resume {job.pk} if interrupted.')
+        return job
+
+    def resume_job(self, job_id):
+        job = ImportJob.objects.filter(pk=job_id).first()
+        if job is None:
+            raise CommandError(f'No import {job_id}.')
+        if job.status == 'done':
+            raise CommandError(f'Import {job_id} is done already.')
+        return job
+
+    def write_progress(self, job):
+        self.stdout.write(
+            f'{job.rows_done} rows: {job.boards_created} boards, {job.tasks_created} tasks, '
+            f'{job.comments_created} comments, {job.error_count} errors'
+        )
@@ -0,0 +1,44 @@
+import pstats
+from collections import defaultdict
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SORT_KEYS = ['cumulative', 'tottime', 'calls']
+
+
+class Command(BaseCommand):
+    help = 'Merge the profiles written by ProfilingMiddleware and print the hottest functions per endpoint.'
+
+    def add_arguments(self, parser):
+        """
+        Register the command line options of the command.
+        """
+        parser.add_argument('--dir', default=getattr(settings, 'KANMIND_PROFILE_DIR', None), help='Directory of the profiles.')
+        parser.add_argument('--endpoint', action='append', help='Summarize only this URL name, repeatable.')
+        parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative', help='Order of the functions.')
+        parser.add_argument('--limit', type=int, default=20, help='Functions listed per endpoint.')
+
+    def handle(self, *args, **options):
+        """
+        Group the profiles by the URL name their file starts with and print one merged report per group.
+
+        Raises:
+            CommandError: if there are no profiles to summarize.
+        """
+        if options['dir'] is None:
+            raise CommandError('No profile directory, set KANMIND_PROFILE_DIR or pass --dir.')
+        endpoints = defaultdict(list)
+        for path in sorted(Path(options['dir']).glob('*.prof')):
+            url_name = path.name.split('.', 1)[0]
+            if not options['endpoint'] or url_name in options['endpoint']:
+                endpoints[url_name].append(str(path))
+        if not endpoints:
+            raise CommandError(f'No profiles in {options["dir"]}.')
+
+        for url_name, paths in sorted(endpoints.items()):
+            stats = pstats.Stats(*paths, stream=self.stdout)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{url_name}: {len(paths)} requests, {stats.total_tt / len(paths) * 1000:.1f} ms each on average'
+            ))
+            stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
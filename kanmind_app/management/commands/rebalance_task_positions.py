@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.db.models.functions import Length
+from kanmind_app.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Give the task columns whose positions grew long short, evenly spaced positions again.'
+
+    def add_arguments(self, parser):
+        """
+        Register the command line options of the command.
+        """
+        parser.add_argument('--max-length', type=int, default=8, help='Rebalance columns with a position longer than this.')
+        parser.add_argument('--all', action='store_true', help='Rebalance every column, whatever its position lengths.')
+
+    def handle(self, *args, **options):
+        """
+        Find the columns to rebalance with one grouped query and rebalance them one by one.
+        """
+        columns = Task.objects.order_by().values_list('board_id', 'status').annotate(longest=Max(Length('position')))
+        if not options['all']:
+            columns = columns.filter(longest__gt=options['max_length'])
+        moved = 0
+        count = 0
+        for board_id, status, _ in columns:
+            moved += Task.rebalance_column(board_id, status)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebalanced {count} columns, {moved} tasks got a new position.'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from kanmind_app.models import Board, BoardStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized board statistics from scratch, or check them for drift.'
+
+    def add_arguments(self, parser):
+        """
+        Register the command line options of the command.
+        """
+        parser.add_argument('--check', action='store_true', help='Only report boards whose statistics drifted.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of boards counted per query.')
+
+    def handle(self, *args, **options):
+        """
+        Walk over all boards in batches and rebuild or check their statistics.
+
+        Raises:
+            CommandError: if ``--check`` found statistics that drifted.
+        """
+        board_ids = list(Board.objects.order_by('id').values_list('id', flat=True))
+        batch_size = options['batch_size']
+        mismatches = []
+        for start in range(0, len(board_ids), batch_size):
+            batch = board_ids[start:start + batch_size]
+            if options['check']:
+                mismatches.extend(BoardStats.drift(batch))
+            else:
+                BoardStats.rebuild(batch)
+
+        if not options['check']:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics of {len(board_ids)} boards.'))
+            return
+        for board_id, field, stored, actual in mismatches:
+            self.stdout.write(f'Board {board_id}: {field} is {stored}, expected {actual}')
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} board statistics drifted.')
+        self.stdout.write(self.style.SUCCESS(f'Statistics of {len(board_ids)} boards are up to date.'))
@@ -0,0 +1,111 @@
+import random
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from kanmind_app.models import Board, BoardStats, Comment, Task
+from kanmind_app.ranking import spread_ranks
+
+# Most cards of a real board wait in the backlog or are done, few are high priority.
+STATUS_WEIGHTS = {'to-do': 35, 'in-progress': 20, 'review': 10, 'done': 35}
+PRIORITY_WEIGHTS = {'low': 30, 'medium': 50, 'high': 20}
+
+
+class Command(BaseCommand):
+    help = 'Generate users, boards with members, tasks and comments, e.g. for bench_endpoints.'
+
+    def add_arguments(self, parser):
+        """
+        Register the command line options of the command.
+        """
+        parser.add_argument('--users', type=int, default=50, help='Number of users.')
+        parser.add_argument('--boards', type=int, default=20, help='Number of boards.')
+        parser.add_argument('--members', type=int, default=8, help='Members per board, the owner included.')
+        parser.add_argument('--tasks', type=int, default=100, help='Average number of tasks per board.')
+        parser.add_argument('--comments', type=int, default=3, help='Average number of comments per task.')
+        parser.add_argument('--prefix', default='seed', help='Prefix of the usernames and board titles.')
+        parser.add_argument('--password', default='kanmind-seed', help='Password of every generated user.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator, for reproducible datasets.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows inserted per query.')
+
+    def handle(self, *args, **options):
+        """
+        Insert the dataset in bulk, within one transaction.
+
+        Bulk inserts skip the model signals, so the counters, versions and sequence
+        numbers they would maintain are set here: every row gets ``seq`` 1, the
+        version of its new board, and the statistics are rebuilt at the end.
+        """
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        with transaction.atomic():
+            users = self.create_users(prefix, options['users'], options['password'])
+            boards = self.create_boards(prefix, options['boards'], users, options['members'])
+            tasks = self.create_tasks(boards, options['tasks'])
+            comments = self.create_comments(tasks, boards, options['comments'])
+            BoardStats.rebuild([board.pk for board in boards])
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users, {len(boards)} boards, {len(tasks)} tasks and {comments} comments. '
+            f'Log in as {users[0].email if users else "-"} with password {options["password"]!r}.'
+        ))
+
+    def create_users(self, prefix, count, password):
+        # Hashing is slow on purpose, so all users share one hash.
+        password = make_password(password)
+        start = User.objects.filter(username__startswith=f'{prefix}-user-').count()
+        users = [
+            User(username=f'{prefix}-user-{i}', email=f'{prefix}-user-{i}@example.com', password=password)
+            for i in range(start, start + count)
+        ]
+        return User.objects.bulk_create(users, batch_size=self.batch_size)
+
+    def create_boards(self, prefix, count, users, members):
+        boards = Board.objects.bulk_create(
+            [Board(title=f'{prefix} board {i}', owner=self.random.choice(users), members_seq=1) for i in range(count)],
+            batch_size=self.batch_size,
+        )
+        memberships = []
+        for board in boards:
+            others = [user for user in users if user.pk != board.owner_id]
+            board.member_list = [board.owner, *self.random.sample(others, min(members - 1, len(others)))]
+            memberships.extend(Board.members.through(board_id=board.pk, user_id=user.pk) for user in board.member_list)
+        Board.members.through.objects.bulk_create(memberships, batch_size=self.batch_size)
+        return boards
+
+    def create_tasks(self, boards, average):
+        today = timezone.localdate()
+        tasks = []
+        for board in boards:
+            columns = {status: [] for status in STATUS_WEIGHTS}
+            for i in range(self.random.randint(average // 2, average * 3 // 2)):
+                status = self.random.choices(list(STATUS_WEIGHTS), weights=STATUS_WEIGHTS.values())[0]
+                columns[status].append(Task(
+                    board=board,
+                    owner=self.random.choice(board.member_list),
+                    title=f'Task {i} of {board.title}',
+                    description=self.random.choice(['', 'Short note.', 'A longer description of what has to be done. ' * 3]),
+                    status=status,
+                    priority=self.random.choices(list(PRIORITY_WEIGHTS), weights=PRIORITY_WEIGHTS.values())[0],
+                    assignee=self.random.choice([None, *board.member_list]),
+                    reviewer=self.random.choice([None, None, *board.member_list]),
+                    due_date=self.random.choice([None, today + timedelta(days=self.random.randint(-30, 60))]),
+                    seq=1,
+                ))
+            for column in columns.values():
+                for task, position in zip(column, spread_ranks(len(column))):
+                    task.position = position
+                tasks.extend(column)
+        return Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+
+    def create_comments(self, tasks, boards, average):
+        members = {board.pk: board.member_list for board in boards}
+        comments = [
+            Comment(task=task, author=self.random.choice(members[task.board_id]), content=f'Comment {i} on {task.title}.', seq=1)
+            for task in tasks
+            for i in range(self.random.randint(0, 2 * average))
+        ]
+        Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        return len(comments)
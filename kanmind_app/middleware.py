@@ -0,0 +1,253 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.exceptions import AuthenticationFailed
+from auth_app.authentication import CachedTokenAuthentication, get_token_key
+
+logger = logging.getLogger('kanmind_app.timing')
+profile_logger = logging.getLogger('kanmind_app.profiling')
+
+PROFILE_HEADER = 'X-Kanmind-Profile'
+
+_request_timings = ContextVar('kanmind_request_timings', default=None)
+
+# Lists of placeholders vary with the number of values, e.g. ``IN (%s, %s)``.
+PLACEHOLDER_LIST = re.compile(r'\((?:%s, )*%s\)')
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper of every database connection, installed by kanmind_app.signals,
+    timing the queries of the request being measured by QueryTimingMiddleware.
+
+    The timings are found through a context variable, which sync_to_async() passes on
+    to the threads running the queries of async views.
+    """
+    timings = _request_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(connection):
+    """
+    Add record_query() to the execute wrappers of a connection, once.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestTimings:
+    """
+    Where the time of one request went: SQL, the view, rendering the response.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.patterns = Counter()
+        self.view_started = None
+        self.view_finished = None
+
+    def add_query(self, sql, seconds):
+        self.queries += 1
+        self.sql_seconds += seconds
+        self.patterns[PLACEHOLDER_LIST.sub('(...)', sql)] += 1
+
+    def duplicates(self, threshold):
+        """
+        Get the SQL statements run at least ``threshold`` times, the sign of an N+1 query.
+
+        Returns:
+            list[tuple[str, int]]: The statements and their counts, the most frequent first.
+        """
+        return [(sql, count) for sql, count in self.patterns.most_common() if count >= threshold]
+
+    def metrics(self, finished):
+        """
+        Get the durations of the request in milliseconds.
+
+        ``view`` covers the view including its queries and serializers, ``render`` the
+        rendering of a DRF response after the view returned.
+        """
+        view_started = self.view_started or self.started
+        view_finished = self.view_finished or finished
+        return {
+            'total': (finished - self.started) * 1000,
+            'db': self.sql_seconds * 1000,
+            'view': (view_finished - view_started) * 1000,
+            'render': (finished - view_finished) * 1000,
+        }
+
+
+class QueryTimingMiddleware:
+    """
+    Measure every request: query count, SQL time, view time and render time.
+
+    The numbers are sent in a ``Server-Timing`` header, which browser dev tools show
+    next to the request, and logged to ``kanmind_app.timing`` as one JSON line tagged
+    with the URL name. Requests slower than ``KANMIND_TIMING_SLOW_MS`` or repeating a
+    statement ``KANMIND_TIMING_DUPLICATE_QUERIES`` times are logged as warnings.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called once the view returned a DRF response, right before it is rendered.
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.view_finished = time.perf_counter()
+        return response
+
+    def finish(self, request, response, timings):
+        """
+        Add the Server-Timing header to the response and log the measurements.
+        """
+        metrics = timings.metrics(time.perf_counter())
+        if getattr(settings, 'KANMIND_SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={value:.1f}' + (f';desc="{timings.queries} queries"' if name == 'db' else '')
+                for name, value in metrics.items()
+            )
+
+        match = request.resolver_match
+        duplicates = timings.duplicates(getattr(settings, 'KANMIND_TIMING_DUPLICATE_QUERIES', 5))
+        slow = metrics['total'] >= getattr(settings, 'KANMIND_TIMING_SLOW_MS', 500)
+        line = {
+            'url_name': match.url_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timings.queries,
+            **{f'{name}_ms': round(value, 2) for name, value in metrics.items()},
+        }
+        if duplicates:
+            line['duplicate_queries'] = [{'sql': sql, 'count': count} for sql, count in duplicates]
+        logger.log(logging.WARNING if duplicates or slow else logging.INFO, json.dumps(line), extra={'timing': line})
+        return response
+
+
+def prune_profiles(directory, max_bytes):
+    """
+    Delete the oldest profiles of a directory until its profiles fit into ``max_bytes``.
+    """
+    files = []
+    for path in Path(directory).glob('*.prof'):
+        try:
+            files.append((path.stat(), path))
+        except FileNotFoundError:
+            # Pruned by another worker meanwhile.
+            continue
+    total = 0
+    for stat, path in sorted(files, key=lambda file: file[0].st_mtime, reverse=True):
+        total += stat.st_size
+        if total > max_bytes:
+            path.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """
+    Run cProfile around the view of sampled requests, on a live server.
+
+    A request is sampled at the rate of its URL name in ``KANMIND_PROFILE_RATES``,
+    e.g. ``{'board-detail': 0.01}`` (``'*'`` covers the other names), or when a staff
+    user sends the ``X-Kanmind-Profile: 1`` header. The stats are written as
+    ``<url name>.<time>.<pid>.prof`` to ``KANMIND_PROFILE_DIR``, whose oldest files
+    are deleted beyond ``KANMIND_PROFILE_MAX_BYTES``; profile_summary merges them.
+
+    Only sync views are profiled, cProfile cannot follow a coroutine across awaits.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        directory = getattr(settings, 'KANMIND_PROFILE_DIR', None)
+        if directory is None or iscoroutinefunction(view_func) or not self.should_profile(request):
+            return None
+        profiler = cProfile.Profile()
+        response = profiler.runcall(view_func, request, *view_args, **view_kwargs)
+        path = self.save(profiler, Path(directory), request.resolver_match.url_name or 'unnamed')
+        response[PROFILE_HEADER] = path.name
+        return response
+
+    def should_profile(self, request):
+        """
+        Check whether the request is sampled, or asked to be profiled by a staff user.
+        """
+        if request.headers.get(PROFILE_HEADER) == '1' and self.is_staff(request):
+            return True
+        rates = getattr(settings, 'KANMIND_PROFILE_RATES', {})
+        rate = rates.get(request.resolver_match.url_name, rates.get('*', 0))
+        return rate > 0 and random.random() < rate
+
+    def is_staff(self, request):
+        # DRF authenticates within the view, so the token is checked here already.
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+        key = get_token_key(request)
+        if key is None:
+            return False
+        try:
+            user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+        except AuthenticationFailed:
+            return False
+        return user.is_staff
+
+    def save(self, profiler, directory, url_name):
+        """
+        Write the stats of a profiled request and keep the directory within its size cap.
+
+        Returns:
+            Path: The written file.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{url_name}.{time.time_ns()}.{os.getpid()}.prof'
+        profiler.dump_stats(path)
+        prune_profiles(directory, getattr(settings, 'KANMIND_PROFILE_MAX_BYTES', 50 * 1024 * 1024))
+        profile_logger.info('Profiled %s into %s', url_name, path)
+        return path
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-17 06:05
+
+from itertools import groupby
+
+from django.conf import settings
+from django.db import migrations, models
+
+from kanmind_app.ranking import spread_ranks
+
+
+def place_existing_tasks(apps, schema_editor):
+    """
+    Give the existing tasks of every column positions in the order they were created.
+    """
+    Task = apps.get_model('kanmind_app', 'Task')
+    tasks = Task.objects.order_by('board_id', 'status', 'id').only('id', 'board_id', 'status')
+    for _, column in groupby(tasks.iterator(chunk_size=2000), key=lambda task: (task.board_id, task.status)):
+        column = list(column)
+        for task, position in zip(column, spread_ranks(len(column))):
+            task.position = position
+        Task.objects.bulk_update(column, ['position'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanmind_app', '0003_board_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='position',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(place_existing_tasks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['board', 'status', 'position'], name='task_board_status_pos_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_board_status_idx',
+        ),
+    ]
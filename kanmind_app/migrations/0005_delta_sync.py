@@ -0,0 +1,82 @@
+# Generated by Django 5.2 on 2026-10-17 06:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def stamp_existing_rows(apps, schema_editor):
+    """
+    Stamp the existing tasks, comments and memberships with the current version of their board,
+    so a first delta sync with ``since=0`` returns all of them.
+    """
+    Board = apps.get_model('kanmind_app', 'Board')
+    Task = apps.get_model('kanmind_app', 'Task')
+    Comment = apps.get_model('kanmind_app', 'Comment')
+    Board.objects.update(members_seq=F('version'))
+    Task.objects.update(seq=Subquery(Board.objects.filter(pk=OuterRef('board_id')).values('version')))
+    Comment.objects.update(seq=Subquery(Task.objects.filter(pk=OuterRef('task_id')).values('seq')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanmind_app', '0004_task_position'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('task', 'Task'), ('comment', 'Comment')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('seq', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='compacted_seq',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='members_seq',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='seq',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='seq',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(stamp_existing_rows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['task', 'seq'], name='comment_task_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['board', 'seq'], name='task_board_seq_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='board',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to='kanmind_app.board'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['board', 'seq'], name='tombstone_board_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['created_at'], name='tombstone_created_idx'),
+        ),
+    ]
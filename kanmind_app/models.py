@@ -1,12 +1,142 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from kanmind_app.events import publish_event
+from kanmind_app.ranking import rank_between, spread_ranks
+
+
+def count_subquery(queryset, group_by):
+    """
+    Turn a queryset correlated with OuterRef into a COUNT subquery expression.
+
+    Args:
+        queryset (QuerySet): Rows to count, filtered on an OuterRef.
+        group_by (str): The field the queryset is correlated on.
+
+    Returns:
+        Coalesce: The count, 0 when no row matches.
+    """
+    count = queryset.order_by().values(group_by).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(count), 0)
+
+
+class BoardQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """
+        Restrict the queryset to boards the user owns or is a member of.
+
+        Membership is matched through a subquery on the members table instead of a
+        join, so no DISTINCT is needed and aggregates stay correct.
+
+        Args:
+            user (User): The user whose boards should be returned.
+
+        Returns:
+            BoardQuerySet: Boards owned by or shared with the user.
+        """
+        memberships = Board.members.through.objects.filter(user=user).values('board_id')
+        return self.filter(Q(owner=user) | Q(id__in=memberships))
+
+    def with_counts(self):
+        """
+        Annotate every board with its member and task counters in the same query.
+
+        Each counter stored on BoardStats is computed live as ``annotated_<field>``,
+        which is used to rebuild the statistics and to check them for drift.
+
+        Returns:
+            BoardQuerySet: Boards annotated with ``annotated_*`` counters.
+        """
+        counters = {
+            'annotated_member_count': count_subquery(Board.members.through.objects.filter(board=OuterRef('pk')), 'board'),
+            'annotated_ticket_count': Count('tasks'),
+        }
+        for status, field in BoardStats.STATUS_COUNTERS.items():
+            counters[f'annotated_{field}'] = Count('tasks', filter=Q(tasks__status=status))
+        for priority, field in BoardStats.PRIORITY_COUNTERS.items():
+            counters[f'annotated_{field}'] = Count('tasks', filter=Q(tasks__priority=priority))
+        return self.annotate(**counters)
 
 
 class Board(models.Model):
     title = models.CharField(max_length=55)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_board')
     members = models.ManyToManyField(User, related_name='boards')
-    
+    version = models.PositiveBigIntegerField(default=1)
+    members_seq = models.PositiveBigIntegerField(default=0)
+    compacted_seq = models.PositiveBigIntegerField(default=0)
+
+    # Only ever changed with UPDATEs relative to the stored row, never written by save().
+    SEQUENCE_FIELDS = {'version', 'members_seq', 'compacted_seq'}
+
+    objects = BoardQuerySet.as_manager()
+
+    @classmethod
+    def bump_version(cls, board_ids=None, task_id=None):
+        """
+        Increment the version of boards whose content changed, which changes their ETags.
+
+        Args:
+            board_ids (list[int]): IDs of the changed boards.
+            task_id (int): ID of a changed task, whose board is bumped as well.
+        """
+        condition = Q(id__in=[board_id for board_id in board_ids or [] if board_id is not None])
+        if task_id is not None:
+            condition |= Q(id__in=Task.objects.filter(id=task_id).values('board_id'))
+        cls.objects.filter(condition).update(version=F('version') + 1)
+
+    @classmethod
+    def next_seq(cls, board_ids=None, task_id=None):
+        """
+        Bump the version of boards and read it back, to stamp the rows changed
+        with it as their change sequence number.
+
+        The bump locks the board row until the transaction ends, so the changes of
+        a board commit in the order of their sequence numbers.
+
+        Args:
+            board_ids (list[int]): IDs of the changed boards.
+            task_id (int): ID of a changed task, whose board is bumped as well.
+
+        Returns:
+            dict: The new version by board ID.
+        """
+        cls.bump_version(board_ids, task_id)
+        condition = Q(id__in=[board_id for board_id in board_ids or [] if board_id is not None])
+        if task_id is not None:
+            condition |= Q(tasks=task_id)
+        return dict(cls.objects.filter(condition).values_list('id', 'version'))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the owner a board was loaded with, so that a change of owner
+        can invalidate the cached board access of both users.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_owner_id = instance.__dict__.get('owner_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Save the board. An edited board leaves out SEQUENCE_FIELDS, which tasks,
+        comments and members may have bumped since it was loaded, and reads back its
+        bumped version instead, in the same transaction.
+        """
+        if self._state.adding or kwargs.get('force_insert'):
+            return super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            deferred = self.get_deferred_fields()
+            update_fields = [field.attname for field in self._meta.concrete_fields if not field.primary_key and field.attname not in deferred]
+        kwargs['update_fields'] = [name for name in update_fields if name not in self.SEQUENCE_FIELDS]
+        if not kwargs['update_fields']:
+            return
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.version = Board.next_seq([self.pk])[self.pk]
+
     def __str__(self):
         """
         Return the string representation of the Board instance.
@@ -16,6 +146,19 @@ class Board(models.Model):
         """
         return self.title
     
+    def get_stats(self):
+        """
+        Get the denormalized statistics of the board, rebuilding them if missing.
+
+        Returns:
+            BoardStats: The statistics record of the board.
+        """
+        try:
+            return self.stats
+        except BoardStats.DoesNotExist:
+            self.stats = BoardStats.rebuild([self.pk])[0]
+            return self.stats
+
     @property
     def member_count(self):
         """
@@ -24,7 +167,7 @@ class Board(models.Model):
         Returns:
             int: Number of members.
         """
-        return self.members.count()
+        return self.get_stats().member_count
 
     @property
     def ticket_count(self):
@@ -34,7 +177,7 @@ class Board(models.Model):
         Returns:
             int: Number of tasks.
         """
-        return self.tasks.count()
+        return self.get_stats().ticket_count
     
     @property
     def tasks_to_do_count(self):
@@ -44,7 +187,7 @@ class Board(models.Model):
         Returns:
             int: Number of to-do tasks.
         """
-        return self.tasks.filter(status="to-do").count()
+        return self.get_stats().tasks_to_do_count
 
     @property
     def tasks_high_prio_count(self):
@@ -54,7 +197,22 @@ class Board(models.Model):
         Returns:
             int: Number of high priority tasks.
         """
-        return self.tasks.filter(priority="high").count()
+        return self.get_stats().tasks_high_prio_count
+
+class TaskQuerySet(models.QuerySet):
+    def with_details(self):
+        """
+        Join the users shown next to a task and annotate its comment count,
+        so that task serializers do not query per row. The count is a correlated
+        subquery, so narrower ``values()`` projections of the queryset skip it.
+
+        Returns:
+            TaskQuerySet: Tasks with owner, assignee and reviewer loaded and
+                ``annotated_comments_count`` set.
+        """
+        comments_count = count_subquery(Comment.objects.filter(task=OuterRef('pk')), 'task')
+        return self.select_related('owner', 'assignee', 'reviewer').annotate(annotated_comments_count=comments_count)
+
 
 class Task(models.Model):
     STATUS_CHOICES = [
@@ -68,15 +226,141 @@ class Task(models.Model):
         ("medium", "Medium"),
         ("high", "High"),
     ]
-    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='tasks' )
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='tasks', db_index=False)
     owner= models.ForeignKey(User, on_delete=models.CASCADE, related_name='owner_task')
     title = models.CharField(max_length=100)
     description = models.TextField(max_length=255, blank=True, null=True)
     status = models.CharField(max_length=20, choices = STATUS_CHOICES, default='to-do')
     priority = models.CharField(max_length=20, choices = PRIORITY_CHOICES, default='medium')
-    assignee = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='assigned_tasks', null=True, blank=True)
-    reviewer = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='review_tasks', null=True, blank=True)
+    assignee = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='assigned_tasks', null=True, blank=True, db_index=False)
+    reviewer = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='review_tasks', null=True, blank=True, db_index=False)
     due_date = models.DateField(null=True, blank=True)
+    position = models.CharField(max_length=255, blank=True, default='')
+    seq = models.PositiveBigIntegerField(default=0)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        # The foreign keys these indexes start with are not indexed on their own.
+        indexes = [
+            models.Index(fields=['board', 'status', 'position'], name='task_board_status_pos_idx'),
+            models.Index(fields=['board', 'priority'], name='task_board_priority_idx'),
+            models.Index(fields=['assignee', 'due_date'], name='task_assignee_due_idx'),
+            models.Index(fields=['reviewer', 'due_date'], name='task_reviewer_due_idx'),
+            models.Index(fields=['board', 'seq'], name='task_board_seq_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the counted values a task was loaded with, so that the board
+        statistics can be moved when its board, status or priority changes.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance.remember_counters()
+        return instance
+
+    def remember_counters(self):
+        """
+        Store the board, status and priority currently counted in BoardStats.
+        """
+        self._counted = (self.__dict__.get('board_id'), self.__dict__.get('status'), self.__dict__.get('priority'))
+
+    def save(self, *args, **kwargs):
+        """
+        Save the task, stamped with the next sequence number of its board, and update
+        the board statistics in the same transaction. A task without a position is
+        appended to its column.
+        """
+        with transaction.atomic():
+            if not self.position:
+                self.position = rank_between(Task.column_ends([(self.board_id, self.status)]).get((self.board_id, self.status)))
+            self.seq = Board.next_seq([self.board_id])[self.board_id]
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'seq'}
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def column_ends(cls, columns):
+        """
+        Get the position of the last task of each given column.
+
+        Args:
+            columns (Iterable[tuple]): ``(board_id, status)`` pairs.
+
+        Returns:
+            dict: The last position by ``(board_id, status)``, missing for empty columns.
+        """
+        columns = set(columns)
+        rows = (
+            cls.objects.filter(board_id__in={board_id for board_id, _ in columns}, status__in={status for _, status in columns})
+            .order_by().values_list('board_id', 'status').annotate(end=Max('position'))
+        )
+        return {(board_id, status): end for board_id, status, end in rows if (board_id, status) in columns and end}
+
+    def place(self, before_id=None, after_id=None):
+        """
+        Set the position of the task between two neighbours in the column of its
+        board and status. Only this task needs to be saved afterwards.
+
+        When only one neighbour is given, the task is placed right next to it, and
+        without neighbours it is appended to the column. Neighbours sharing a
+        position, which concurrent moves can leave behind, get the column rebalanced.
+
+        Args:
+            before_id (int | None): ID of the task the moved task should follow.
+            after_id (int | None): ID of the task the moved task should precede.
+
+        Raises:
+            Task.DoesNotExist: if a neighbour is not in the target column.
+        """
+        column = Task.objects.filter(board_id=self.board_id, status=self.status).exclude(pk=self.pk)
+        neighbour_ids = [task_id for task_id in (before_id, after_id) if task_id is not None]
+        for attempt in range(2):
+            positions = dict(column.filter(pk__in=neighbour_ids).values_list('pk', 'position'))
+            if len(positions) < len(set(neighbour_ids)):
+                raise Task.DoesNotExist('Neighbour tasks must be in the target column.')
+            before, after = positions.get(before_id), positions.get(after_id)
+            ordered = column.order_by('position').values_list('position', flat=True)
+            if before_id is None and after_id is None:
+                before = ordered.last()
+            elif after_id is None:
+                after = ordered.filter(position__gt=before).first()
+            elif before_id is None:
+                before = ordered.filter(position__lt=after).last()
+            try:
+                self.position = rank_between(before, after)
+                return
+            except ValueError:
+                if attempt:
+                    raise
+                Task.rebalance_column(self.board_id, self.status)
+
+    @classmethod
+    def rebalance_column(cls, board_id, status):
+        """
+        Give the tasks of a column short, evenly spaced positions, keeping their order.
+
+        Args:
+            board_id (int): ID of the board.
+            status (str): Status of the column.
+
+        Returns:
+            int: Number of tasks whose position changed.
+        """
+        tasks = list(cls.objects.filter(board_id=board_id, status=status).order_by('position', 'id').only('id', 'position'))
+        changed = []
+        for task, position in zip(tasks, spread_ranks(len(tasks))):
+            if task.position != position:
+                task.position = position
+                changed.append(task)
+        if changed:
+            seq = Board.next_seq([board_id])[board_id]
+            for task in changed:
+                task.seq = seq
+            cls.objects.bulk_update(changed, ['position', 'seq'], batch_size=500)
+            publish_event('board.updated', board_id, {'board': board_id})
+        return len(changed)
     
     def __str__(self):
         """
@@ -101,10 +385,17 @@ class Task(models.Model):
 
 
 class Comment(models.Model):
-    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments', db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    seq = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['task', '-created_at'], name='comment_task_created_idx'),
+            models.Index(fields=['task', 'seq'], name='comment_task_seq_idx'),
+        ]
     
     def __str__(self):
         """
@@ -114,7 +405,262 @@ class Comment(models.Model):
             str: A string indicating the author of the comment.
         """
         return f"Comment by {self.author.username}"
-    
 
+    def save(self, *args, **kwargs):
+        """
+        Save the comment, stamped with the next sequence number of its board.
+        The board is remembered as ``_board_id`` for the signal handlers.
+        """
+        with transaction.atomic():
+            self._board_id, self.seq = next(iter(Board.next_seq(task_id=self.task_id).items()), (None, 0))
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'seq'}
+            super().save(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """
+    Marks a deleted task or comment, so that delta sync clients drop it as well.
+
+    Comments deleted together with their task get no tombstone of their own.
+    Tombstones older than ``KANMIND_TOMBSTONE_RETENTION_DAYS`` are removed by the
+    compact_tombstones command, which raises ``Board.compacted_seq``; clients
+    that synced before that sequence number get the full board again.
+    """
+    MODEL_CHOICES = [
+        ('task', 'Task'),
+        ('comment', 'Comment'),
+    ]
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='tombstones', db_index=False)
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    seq = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['board', 'seq'], name='tombstone_board_seq_idx'),
+            models.Index(fields=['created_at'], name='tombstone_created_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Return the string representation of the Tombstone instance.
+
+        Returns:
+            str: The deleted model and object ID.
+        """
+        return f"Deleted {self.model} {self.object_id}"
+
+    @classmethod
+    def record(cls, model, object_id, board_id=None, task_id=None):
+        """
+        Record the deletion of an object of a board, stamped with the next sequence number of the board.
+
+        Args:
+            model (str): ``task`` or ``comment``.
+            object_id (int): ID of the deleted object.
+            board_id (int): ID of the board of the object.
+            task_id (int): ID of the task of a deleted comment, to find its board.
+
+        Returns:
+            int | None: ID of the board, None if it no longer exists.
+        """
+        seqs = Board.next_seq([board_id], task_id)
+        if not seqs:
+            return None
+        board_id, seq = seqs.popitem()
+        cls.objects.create(board_id=board_id, model=model, object_id=object_id, seq=seq)
+        return board_id
+
+
+class BoardStats(models.Model):
+    """
+    Denormalized counters of a board, kept up to date by the handlers in
+    kanmind_app.signals whenever tasks or members change.
+
+    ``QuerySet.update()``, ``bulk_create()`` and ``bulk_update()`` send no signals and
+    skip the counters: code changing tasks that way must call count_tasks() or rebuild()
+    itself, like TaskBulkView does. ``manage.py rebuild_board_stats --check`` reports drift.
+    """
+    STATUS_COUNTERS = {
+        'to-do': 'tasks_to_do_count',
+        'in-progress': 'tasks_in_progress_count',
+        'review': 'tasks_review_count',
+        'done': 'tasks_done_count',
+    }
+    PRIORITY_COUNTERS = {
+        'low': 'tasks_low_prio_count',
+        'medium': 'tasks_medium_prio_count',
+        'high': 'tasks_high_prio_count',
+    }
+    COUNTERS = ['member_count', 'ticket_count', *STATUS_COUNTERS.values(), *PRIORITY_COUNTERS.values()]
+
+    board = models.OneToOneField(Board, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    member_count = models.PositiveIntegerField(default=0)
+    ticket_count = models.PositiveIntegerField(default=0)
+    tasks_to_do_count = models.PositiveIntegerField(default=0)
+    tasks_in_progress_count = models.PositiveIntegerField(default=0)
+    tasks_review_count = models.PositiveIntegerField(default=0)
+    tasks_done_count = models.PositiveIntegerField(default=0)
+    tasks_low_prio_count = models.PositiveIntegerField(default=0)
+    tasks_medium_prio_count = models.PositiveIntegerField(default=0)
+    tasks_high_prio_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        """
+        Return the string representation of the BoardStats instance.
+
+        Returns:
+            str: A string indicating the board of the statistics.
+        """
+        return f"Stats of board {self.board_id}"
+
+    @classmethod
+    def compute(cls, board_ids):
+        """
+        Count the statistics of the given boards from the tasks and members tables.
+
+        Args:
+            board_ids (list[int]): IDs of the boards to count.
+
+        Returns:
+            dict: Counter values keyed by board ID.
+        """
+        annotated = [f'annotated_{field}' for field in cls.COUNTERS]
+        rows = Board.objects.filter(id__in=board_ids).with_counts().values('id', *annotated)
+        return {row['id']: {field: row[f'annotated_{field}'] for field in cls.COUNTERS} for row in rows}
+
+    @classmethod
+    def rebuild(cls, board_ids):
+        """
+        Recount and store the statistics of the given boards.
+
+        Args:
+            board_ids (list[int]): IDs of the boards to rebuild.
+
+        Returns:
+            list[BoardStats]: The rebuilt statistics records.
+        """
+        stats = [cls(board_id=board_id, **counters) for board_id, counters in cls.compute(board_ids).items()]
+        return cls.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['board'],
+            update_fields=cls.COUNTERS,
+        )
+
+    @classmethod
+    def drift(cls, board_ids):
+        """
+        Compare the stored statistics of the given boards with a fresh count.
+
+        Args:
+            board_ids (list[int]): IDs of the boards to check.
+
+        Returns:
+            list[tuple]: ``(board_id, field, stored, actual)`` for every mismatch.
+                A missing statistics record is reported with ``stored`` set to None.
+        """
+        stored = {stats.board_id: stats for stats in cls.objects.filter(board_id__in=board_ids)}
+        mismatches = []
+        for board_id, counters in cls.compute(board_ids).items():
+            for field, actual in counters.items():
+                value = getattr(stored[board_id], field) if board_id in stored else None
+                if value != actual:
+                    mismatches.append((board_id, field, value, actual))
+        return mismatches
+
+    @classmethod
+    def count_tasks(cls, changes):
+        """
+        Apply task count changes, with one UPDATE per board.
+
+        Boards without a statistics record yet are rebuilt from scratch instead.
+
+        Args:
+            changes (list[tuple]): ``((board_id, status, priority), delta)`` pairs, where
+                delta is 1 when a task is counted and -1 when it is removed.
+        """
+        deltas = {}
+        for (board_id, status, priority), delta in changes:
+            board_deltas = deltas.setdefault(board_id, {})
+            for field in ('ticket_count', cls.STATUS_COUNTERS.get(status), cls.PRIORITY_COUNTERS.get(priority)):
+                if field:
+                    board_deltas[field] = board_deltas.get(field, 0) + delta
+        for board_id, board_deltas in deltas.items():
+            counters = {field: F(field) + delta for field, delta in board_deltas.items() if delta}
+            if counters and not cls.objects.filter(board_id=board_id).update(**counters):
+                cls.rebuild([board_id])
 
+    @classmethod
+    def refresh_member_count(cls, board_ids):
+        """
+        Recount the members of the given boards.
+
+        Args:
+            board_ids (list[int]): IDs of the boards whose members changed.
+        """
+        member_count = count_subquery(Board.members.through.objects.filter(board=OuterRef('board')), 'board')
+        cls.objects.filter(board_id__in=board_ids).update(member_count=member_count)
+
+
+class ImportJob(models.Model):
+    """
+    An import of boards, tasks and comments from an NDJSON or CSV file, in the format
+    of the board export, run by kanmind_app.imports.BoardImport.
+
+    Every batch of rows commits together with ``rows_done``, so an interrupted
+    import resumes after the last committed batch.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    FORMAT_CHOICES = [
+        ('ndjson', 'NDJSON'),
+        ('csv', 'CSV'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs')
+    file = models.FileField(upload_to='imports/')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    rows_done = models.PositiveIntegerField(default=0)
+    boards_created = models.PositiveIntegerField(default=0)
+    tasks_created = models.PositiveIntegerField(default=0)
+    comments_created = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """
+        Return the string representation of the ImportJob instance.
+
+        Returns:
+            str: The ID and status of the import.
+        """
+        return f"Import {self.pk} ({self.status})"
+
+
+class ImportRef(models.Model):
+    """
+    Maps the ID of a board or task in an imported file to the object created for it,
+    so that later rows, also of a resumed import, can refer to it.
+    """
+    MODEL_CHOICES = [
+        ('board', 'Board'),
+        ('task', 'Task'),
+    ]
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name='refs')
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    source_id = models.BigIntegerField()
+    target_id = models.PositiveBigIntegerField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'model', 'source_id'], name='importref_job_source_uniq'),
+        ]
@@ -0,0 +1,76 @@
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+
+def rank_between(before=None, after=None):
+    """
+    Build the shortest rank that sorts between two ranks.
+
+    Ranks are strings of base-36 digits compared lexicographically, and never
+    end with '0', so there is always room for another rank between two of them.
+    Appending to a column increments the first digit that can still grow, and
+    prepending decrements the first one that can still shrink, so cards added at
+    either end of a column keep their ranks short.
+
+    Args:
+        before (str | None): Rank to sort after, None for the start of the column.
+        after (str | None): Rank to sort before, None for the end of the column.
+
+    Raises:
+        ValueError: if ``before`` does not sort before ``after``.
+
+    Returns:
+        str: The new rank.
+    """
+    before = before or ''
+    if after is not None and after <= before:
+        raise ValueError(f'Rank {before!r} does not sort before {after!r}.')
+    if after is None:
+        for i, digit in enumerate(before):
+            if digit != DIGITS[-1]:
+                return before[:i] + DIGITS[DIGITS.index(digit) + 1]
+    elif not before:
+        for i, digit in enumerate(after):
+            if DIGITS.index(digit) > 1:
+                return after[:i] + DIGITS[DIGITS.index(digit) - 1]
+    rank = ''
+    i = 0
+    while True:
+        low = DIGITS.index(before[i]) if i < len(before) else 0
+        high = DIGITS.index(after[i]) if after is not None and i < len(after) else BASE
+        middle = (low + high) // 2
+        if middle > low:
+            return rank + DIGITS[middle]
+        rank += DIGITS[low]
+        if high > low:
+            # Everything starting with this prefix sorts before ``after``.
+            after = None
+        i += 1
+
+
+def spread_ranks(count):
+    """
+    Build ``count`` evenly spaced ranks of the smallest possible length.
+
+    Used to rebalance a column whose ranks grew long after many moves. The ranks
+    fill the middle half of their range, leaving room at both ends of the column.
+
+    Args:
+        count (int): Number of ranks.
+
+    Returns:
+        list[str]: Increasing ranks.
+    """
+    width = 1
+    while BASE ** width < 2 * (count + 1):
+        width += 1
+    step = BASE ** width // (2 * (count + 1))
+    ranks = []
+    for i in range(1, count + 1):
+        value = BASE ** width // 4 + i * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append(''.join(reversed(digits)).rstrip('0'))
+    return ranks
@@ -0,0 +1,92 @@
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import caches
+
+PRIMARY_PIN_CACHE_KEY = 'kanmind:primary-pin:{user_id}'
+
+_read_alias = ContextVar('kanmind_read_alias', default=None)
+
+
+def set_read_alias(alias):
+    """
+    Send the reads of the current request (or task) to a database alias.
+
+    Args:
+        alias (str | None): The alias to read from, None for the default routing.
+
+    Returns:
+        Token: Pass it to reset_read_alias() once the request is done.
+    """
+    return _read_alias.set(alias)
+
+
+def reset_read_alias(token):
+    """
+    Restore the read alias that was set before set_read_alias().
+    """
+    _read_alias.reset(token)
+
+
+def pin_cache():
+    """
+    Get the cache holding the primary pins, ``KANMIND_REPLICA_PIN_CACHE_ALIAS``.
+    Must be shared between server processes when there is more than one.
+    """
+    return caches[getattr(settings, 'KANMIND_REPLICA_PIN_CACHE_ALIAS', 'default')]
+
+
+def pin_to_primary(user_id):
+    """
+    Read from the primary for the next ``KANMIND_REPLICA_PIN_SECONDS`` seconds of the
+    user, so that they see their own writes before the replica caught up with them.
+
+    Args:
+        user_id (int): ID of the user who just wrote.
+    """
+    pin_cache().set(PRIMARY_PIN_CACHE_KEY.format(user_id=user_id), True, getattr(settings, 'KANMIND_REPLICA_PIN_SECONDS', 5))
+
+
+def replica_alias_for(user):
+    """
+    Get the alias the reads of a user should go to.
+
+    Args:
+        user (User): The requesting user.
+
+    Returns:
+        str | None: ``KANMIND_READ_REPLICA_ALIAS``, or None to read from the primary
+            when no replica is configured or the user wrote recently.
+    """
+    alias = getattr(settings, 'KANMIND_READ_REPLICA_ALIAS', None)
+    if alias is None or (user.is_authenticated and pin_cache().get(PRIMARY_PIN_CACHE_KEY.format(user_id=user.pk))):
+        return None
+    return alias
+
+
+async def areplica_alias_for(user):
+    """
+    Get the alias the reads of a user should go to, like replica_alias_for(), for async views.
+    """
+    alias = getattr(settings, 'KANMIND_READ_REPLICA_ALIAS', None)
+    if alias is None or (user.is_authenticated and await pin_cache().aget(PRIMARY_PIN_CACHE_KEY.format(user_id=user.pk))):
+        return None
+    return alias
+
+
+class ReplicaRouter:
+    """
+    Route the reads of a request to the alias its view selected with set_read_alias().
+
+    Views opt in with ReplicaReadMixin, which selects the replica for safe methods only,
+    so everything else, including every write, goes to the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
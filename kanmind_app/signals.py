@@ -0,0 +1,238 @@
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.db.models import F
+from django.dispatch import receiver
+from kanmind_app.access import invalidate_board_access
+from kanmind_app.events import publish_event
+from kanmind_app.middleware import install_query_recorder
+from kanmind_app.models import Board, BoardStats, Comment, Task, Tombstone
+
+
+def remember_deletion(origin, instance):
+    """
+    Remember an instance collected by a deletion on the deleted instance or queryset,
+    so that the handlers of the objects deleted in the same cascade can tell.
+
+    Args:
+        origin: The instance or queryset whose deletion sent the signal.
+        instance (Model): The collected instance.
+    """
+    if origin is not None:
+        origin.__dict__.setdefault('_deleted_ids', {}).setdefault(type(instance), set()).add(instance.pk)
+
+
+def deleted_ids(origin, model):
+    """
+    Get the IDs of the instances of a model deleted together with ``origin``.
+
+    Args:
+        origin: The instance or queryset whose deletion sent the signal.
+        model (type): The model to look up.
+
+    Returns:
+        set[int]: IDs collected by remember_deletion(), empty if none were.
+    """
+    return getattr(origin, '_deleted_ids', {}).get(model, set())
+
+
+@receiver(post_save, sender=Board)
+def create_board_stats(sender, instance, created, **kwargs):
+    """
+    Create an empty statistics record for every new board and tell its owner about it.
+    """
+    if created:
+        BoardStats.objects.create(board_id=instance.pk)
+        publish_event('board.created', instance.pk, {'board': instance.pk}, [instance.owner_id])
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    """
+    Count a new task, or move a changed task to its new board, status or priority counters.
+    Task.save() bumped the version of its board already, a task that moved to another
+    board leaves a tombstone on the previous one and its comments are stamped with the
+    sequence number of the task, so that delta syncs of the new board pick them up.
+    """
+    current = (instance.board_id, instance.status, instance.priority)
+    previous = None if created else getattr(instance, '_counted', None)
+    if created:
+        BoardStats.count_tasks([(current, 1)])
+    elif previous is None:
+        BoardStats.rebuild([instance.board_id])
+    elif previous != current:
+        BoardStats.count_tasks([(previous, -1), (current, 1)])
+    publish_event('task.created' if created else 'task.updated', instance.board_id, {'board': instance.board_id, 'task': instance.pk})
+    if previous and previous[0] != instance.board_id:
+        Comment.objects.filter(task_id=instance.pk).update(seq=instance.seq)
+        Tombstone.record('task', instance.pk, board_id=previous[0])
+        publish_event('task.deleted', previous[0], {'board': previous[0], 'task': instance.pk})
+    instance.remember_counters()
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Remove a deleted task from the counters of its board and leave a tombstone,
+    which bumps the board version, unless the board is deleted in the same cascade,
+    e.g. together with its owner.
+    """
+    if instance.board_id in deleted_ids(origin, Board):
+        return
+    counted = getattr(instance, '_counted', None) or (instance.board_id, instance.status, instance.priority)
+    BoardStats.count_tasks([(counted, -1)])
+    Tombstone.record('task', instance.pk, board_id=counted[0])
+    publish_event('task.deleted', counted[0], {'board': counted[0], 'task': instance.pk})
+
+
+@receiver(m2m_changed, sender=Board.members.through)
+def count_board_members(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Recount the members, bump the version, stamp ``members_seq`` with it and publish an
+    event for every board whose membership changed. The event also reaches the added or
+    removed users.
+
+    For ``user.boards.clear()`` the affected boards are collected before the clear.
+    """
+    if action == 'pre_clear' and reverse:
+        instance._cleared_board_ids = list(instance.boards.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        board_ids = [instance.pk]
+        user_ids = instance.__dict__.get('_cleared_member_ids', []) if action == 'post_clear' else pk_set
+    elif action == 'post_clear':
+        board_ids = instance.__dict__.pop('_cleared_board_ids', [])
+        user_ids = [instance.pk]
+    else:
+        board_ids = list(pk_set)
+        user_ids = [instance.pk]
+    BoardStats.refresh_member_count(board_ids)
+    Board.objects.filter(id__in=board_ids).update(version=F('version') + 1, members_seq=F('version') + 1)
+    for board_id in board_ids:
+        publish_event('board.members', board_id, {'board': board_id}, user_ids)
+
+
+@receiver(post_save, sender=Board)
+def publish_saved_board(sender, instance, created, **kwargs):
+    """
+    Publish an edited board, whose version Board.save() bumps, to the previous
+    and new owner as well when the owner changed.
+    """
+    if not created:
+        previous_owner_id = getattr(instance, '_loaded_owner_id', instance.owner_id)
+        user_ids = [previous_owner_id, instance.owner_id] if previous_owner_id != instance.owner_id else []
+        publish_event('board.updated', instance.pk, {'board': instance.pk}, user_ids)
+
+
+@receiver(post_save, sender=User)
+def bump_user_boards_version(sender, instance, created, **kwargs):
+    """
+    Bump the version of the boards of an edited user, whose name and email they show.
+
+    The ``last_login`` update of every login leaves the boards untouched.
+    """
+    update_fields = kwargs.get('update_fields')
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    Board.objects.for_user(instance).update(version=F('version') + 1)
+
+
+def publish_comment_event(type, comment, board_id):
+    """
+    Publish a comment change to the board of its task.
+    """
+    if board_id is not None:
+        publish_event(type, board_id, {'board': board_id, 'task': comment.task_id, 'comment': comment.pk})
+
+
+@receiver(post_save, sender=Comment)
+def publish_saved_comment(sender, instance, created, **kwargs):
+    """
+    Publish a saved comment, whose board Comment.save() bumped the version of already.
+    """
+    publish_comment_event('comment.created' if created else 'comment.updated', instance, getattr(instance, '_board_id', None))
+
+
+@receiver(post_delete, sender=Comment)
+def bury_deleted_comment(sender, instance, origin=None, **kwargs):
+    """
+    Leave a tombstone for a deleted comment, which bumps the version of its board, and
+    publish the change, unless its task is deleted in the same cascade: the task then
+    leaves a tombstone of its own, or its board is deleted as well.
+    """
+    if instance.task_id in deleted_ids(origin, Task):
+        return
+    board_id = Tombstone.record('comment', instance.pk, task_id=instance.task_id)
+    publish_comment_event('comment.deleted', instance, board_id)
+
+
+@receiver(post_save, sender=Board)
+def invalidate_owner_access(sender, instance, created, **kwargs):
+    """
+    Invalidate the cached board access of the owner of a new board, and of
+    the previous and new owner when the owner changed.
+    """
+    previous_owner_id = None if created else getattr(instance, '_loaded_owner_id', instance.owner_id)
+    if created or previous_owner_id != instance.owner_id:
+        invalidate_board_access([previous_owner_id, instance.owner_id])
+    instance._loaded_owner_id = instance.owner_id
+
+
+@receiver(pre_delete, sender=Board)
+def remember_board_members(sender, instance, origin=None, **kwargs):
+    """
+    Collect the members of a board before the deletion cascades over them, and
+    remember the board as deleted, see deleted_ids().
+    """
+    instance._deleted_member_ids = list(instance.members.values_list('id', flat=True))
+    remember_deletion(origin, instance)
+
+
+@receiver(pre_delete, sender=Task)
+def remember_deleted_task(sender, instance, origin=None, **kwargs):
+    """
+    Remember a task as deleted, so that its comments leave no tombstones of their own.
+    """
+    remember_deletion(origin, instance)
+
+
+@receiver(post_delete, sender=Board)
+def invalidate_deleted_board_access(sender, instance, **kwargs):
+    """
+    Invalidate the cached board access of the owner and members of a deleted board,
+    and tell them about the deletion.
+    """
+    user_ids = [instance.owner_id, *getattr(instance, '_deleted_member_ids', [])]
+    invalidate_board_access(user_ids)
+    publish_event('board.deleted', instance.pk, {'board': instance.pk}, user_ids)
+
+
+@receiver(m2m_changed, sender=Board.members.through)
+def invalidate_member_access(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidate the cached board access of every user whose membership changed.
+
+    For ``board.members.clear()`` the affected users are collected before the clear.
+    """
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_member_ids = list(instance.members.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        user_ids = [instance.pk]
+    elif action == 'post_clear':
+        user_ids = instance.__dict__.pop('_cleared_member_ids', [])
+    else:
+        user_ids = pk_set
+    invalidate_board_access(user_ids)
+
+
+@receiver(connection_created)
+def record_request_queries(sender, connection, **kwargs):
+    """
+    Let QueryTimingMiddleware count and time the queries of every new connection.
+    """
+    install_query_recorder(connection)
@@ -1,3 +1,1351 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync, sync_to_async
+import base64
+import csv
+import json
+import logging
+import runpy
+import tempfile
+import os
+import threading
+import tracemalloc
+from django.contrib.auth.models import User
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from unittest import mock, skipUnless
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from core.warmup import warm_up
+from kanmind_app.events import Broker, LocalBroker, Subscription, get_broker, reset_broker
+from kanmind_app.api.serializers import TaskDetailSerializer, TaskDetailValuesSerializer
+from kanmind_app.api.async_views import AsyncListView, AsyncReadView
+from kanmind_app.api.views import TaskBulkView
+from kanmind_app.exports import CSV_COLUMNS
+from kanmind_app.imports import BoardImport
+from kanmind_app.middleware import QueryTimingMiddleware, prune_profiles
+from kanmind_app.access import BoardAccess, access_cache_stats, get_board_access, reset_access_cache_stats
+from kanmind_app.models import Board, BoardStats, Comment, ImportJob, ImportRef, Task, Tombstone
+from kanmind_app.routers import ReplicaRouter, replica_alias_for, reset_read_alias, set_read_alias
 
-# Create your tests here.
+
+class KanmindTestData:
+    """
+    Board with an owner, a member, an outsider, tasks and comments.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'secret-pw')
+        cls.member = User.objects.create_user('member', 'member@example.com', 'secret-pw')
+        cls.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'secret-pw')
+        cls.board = Board.objects.create(title='Board', owner=cls.owner)
+        cls.board.members.add(cls.owner, cls.member)
+        cls.tasks = [
+            Task.objects.create(
+                board=cls.board, owner=cls.owner, title=f'Task {i}',
+                assignee=cls.member, reviewer=cls.owner,
+            )
+            for i in range(5)
+        ]
+        for task in cls.tasks:
+            Comment.objects.create(task=task, author=cls.member, content='Comment')
+        cls.task = cls.tasks[0]
+        cls.comment = cls.task.comments.get()
+
+    def setUp(self):
+        super().setUp()
+        self.clear_caches()
+
+    def clear_caches(self):
+        for cache in caches.all():
+            cache.clear()
+        reset_access_cache_stats()
+
+
+class BoardAccessTests(KanmindTestData, TestCase):
+    def test_load_splits_readable_and_owned_boards(self):
+        other = Board.objects.create(title='Other', owner=self.member)
+
+        access = BoardAccess.load(self.member)
+
+        self.assertEqual(access.readable_board_ids, {self.board.pk, other.pk})
+        self.assertEqual(access.owned_board_ids, {other.pk})
+
+    def test_access_is_loaded_once_per_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.member
+
+        with self.assertNumQueries(1):
+            first = get_board_access(request)
+            second = get_board_access(request)
+
+        self.assertIs(first, second)
+        self.assertFalse(first.can_read(self.board.pk + 1))
+
+    def test_access_is_cached_across_requests(self):
+        BoardAccess.load(self.member)
+
+        with self.assertNumQueries(0):
+            access = BoardAccess.load(self.member)
+
+        self.assertTrue(access.can_read(self.board.pk))
+        self.assertEqual(access_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_membership_changes_invalidate_cached_access(self):
+        BoardAccess.load(self.outsider)
+        self.board.members.add(self.outsider)
+        self.assertTrue(BoardAccess.load(self.outsider).can_read(self.board.pk))
+
+        self.outsider.boards.clear()
+        self.assertFalse(BoardAccess.load(self.outsider).can_read(self.board.pk))
+        self.assertEqual(access_cache_stats(), {'hits': 0, 'misses': 3})
+
+    def test_owner_change_and_deletion_invalidate_cached_access(self):
+        board = Board.objects.create(title='Other', owner=self.owner)
+        board.members.add(self.member)
+        self.assertTrue(BoardAccess.load(self.owner).owns(board.pk))
+
+        board = Board.objects.get(pk=board.pk)
+        board.owner = self.outsider
+        board.save()
+        self.assertFalse(BoardAccess.load(self.owner).owns(board.pk))
+        self.assertTrue(BoardAccess.load(self.outsider).owns(board.pk))
+
+        board_id = board.pk
+        self.assertTrue(BoardAccess.load(self.member).can_read(board_id))
+        board.delete()
+        self.assertFalse(BoardAccess.load(self.member).can_read(board_id))
+
+
+class BoardStatsTests(KanmindTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = Board.objects.create(title='Other', owner=self.owner)
+
+    def assertStats(self, board, **counters):
+        stats = BoardStats.objects.get(board=board)
+        self.assertEqual({field: getattr(stats, field) for field in counters}, counters)
+        self.assertEqual(BoardStats.drift([self.board.pk, self.other.pk]), [])
+
+    def test_counters_follow_every_task_change(self):
+        self.assertStats(self.board, ticket_count=5, tasks_to_do_count=5, tasks_medium_prio_count=5)
+
+        task = Task.objects.create(board=self.board, owner=self.owner, title='New', priority='high')
+        self.assertStats(self.board, ticket_count=6, tasks_to_do_count=6, tasks_high_prio_count=1)
+
+        task.status = 'review'
+        task.save()
+        self.assertStats(self.board, tasks_to_do_count=5, tasks_review_count=1)
+
+        task.priority = 'low'
+        task.save()
+        self.assertStats(self.board, tasks_high_prio_count=0, tasks_low_prio_count=1)
+
+        task.board = self.other
+        task.save()
+        self.assertStats(self.board, ticket_count=5, tasks_review_count=0, tasks_low_prio_count=0)
+        self.assertStats(self.other, ticket_count=1, tasks_review_count=1, tasks_low_prio_count=1)
+
+        Task.objects.get(pk=task.pk).delete()
+        self.assertStats(self.other, ticket_count=0, tasks_review_count=0, tasks_low_prio_count=0)
+
+    def test_member_count_follows_member_changes(self):
+        self.assertStats(self.board, member_count=2)
+
+        self.board.members.add(self.outsider)
+        self.assertStats(self.board, member_count=3)
+        self.board.members.remove(self.member)
+        self.assertStats(self.board, member_count=2)
+        self.outsider.boards.clear()
+        self.assertStats(self.board, member_count=1)
+
+    def test_deleting_a_board_owner_skips_the_counters_of_their_boards(self):
+        task = Task.objects.create(board=self.other, owner=self.member, title='Other')
+        Comment.objects.create(task=task, author=self.member, content='Other')
+        kept = Board.objects.create(title='Kept', owner=self.member)
+        Task.objects.create(board=kept, owner=self.owner, title='Owned elsewhere')
+
+        with transaction.atomic():
+            self.owner.delete()
+
+        self.assertFalse(Board.objects.filter(pk__in=[self.board.pk, self.other.pk]).exists())
+        self.assertFalse(BoardStats.objects.filter(board_id__in=[self.board.pk, self.other.pk]).exists())
+        self.assertEqual(BoardStats.drift([kept.pk]), [])
+
+    def test_check_reports_counters_skipped_by_queryset_updates(self):
+        Task.objects.filter(pk=self.task.pk).update(status='done')
+        out = StringIO()
+
+        with self.assertRaisesMessage(CommandError, '2 board statistics drifted.'):
+            call_command('rebuild_board_stats', '--check', stdout=out)
+        self.assertIn(f'Board {self.board.pk}: tasks_to_do_count is 5, expected 4', out.getvalue())
+        self.assertIn(f'Board {self.board.pk}: tasks_done_count is 0, expected 1', out.getvalue())
+
+        call_command('rebuild_board_stats', stdout=StringIO())
+        call_command('rebuild_board_stats', '--check', stdout=out)
+        self.assertStats(self.board, tasks_to_do_count=4, tasks_done_count=1)
+
+
+class EndpointQueryCountTests(KanmindTestData, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+
+    def assertQueries(self, expected, method, url, status_code=200, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, format='json', **kwargs)
+        self.assertEqual(response.status_code, status_code, response.content)
+        self.assertEqual(len(ctx.captured_queries), expected, '\n'.join(q['sql'] for q in ctx.captured_queries))
+        return response
+
+    def test_board_list(self):
+        self.assertQueries(2, 'get', '/api/boards/')
+
+    def test_board_detail(self):
+        self.assertQueries(5, 'get', f'/api/boards/{self.board.pk}/')
+
+    def assertBoardQueries(self):
+        self.clear_caches()
+        boards = self.assertQueries(2, 'get', '/api/boards/').json()
+        self.clear_caches()
+        board = self.assertQueries(5, 'get', f'/api/boards/{self.board.pk}/').json()
+        return boards, board
+
+    def test_board_queries_do_not_grow_with_the_data(self):
+        self.assertBoardQueries()
+
+        users = [User.objects.create_user(f'user{i}', f'user{i}@example.com') for i in range(5)]
+        self.board.members.add(*users)
+        for i in range(20):
+            Task.objects.create(board=self.board, owner=self.owner, title=f'More {i}', assignee=users[i % 5], reviewer=self.member)
+            Comment.objects.create(task=self.task, author=users[i % 5], content=f'More {i}')
+        for i in range(5):
+            Board.objects.create(title=f'More {i}', owner=self.owner).members.add(self.member, *users)
+
+        boards, board = self.assertBoardQueries()
+        self.assertEqual((len(boards), len(board['members']), len(board['tasks'])), (6, 7, 25))
+
+    def test_task_create(self):
+        self.assertQueries(9, 'post', '/api/tasks/', status_code=201, data={'board': self.board.pk, 'title': 'New'})
+
+    def test_task_create_on_foreign_board(self):
+        self.client.force_authenticate(self.outsider)
+        self.assertQueries(2, 'post', '/api/tasks/', status_code=403, data={'board': self.board.pk, 'title': 'New'})
+
+    def test_task_detail(self):
+        self.assertQueries(3, 'get', f'/api/tasks/{self.task.pk}/')
+
+    def test_task_update(self):
+        self.client.force_authenticate(self.owner)
+        self.assertQueries(8, 'patch', f'/api/tasks/{self.task.pk}/', data={'status': 'done'})
+
+    def test_task_move(self):
+        before, after = self.tasks[1:3]
+        self.assertQueries(9, 'post', f'/api/tasks/{self.tasks[4].pk}/move/', data={'before': before.pk, 'after': after.pk})
+
+    def test_assigned_and_reviewing_lists(self):
+        self.assertQueries(2, 'get', '/api/tasks/assigned-to-me/')
+        self.assertQueries(2, 'get', '/api/tasks/reviewing/')
+
+    def test_comment_list(self):
+        self.assertQueries(4, 'get', f'/api/tasks/{self.task.pk}/comments/')
+
+    def test_comment_create(self):
+        self.assertQueries(7, 'post', f'/api/tasks/{self.task.pk}/comments/', status_code=201, data={'content': 'Hi'})
+
+    def test_comment_update(self):
+        self.assertQueries(8, 'patch', f'/api/tasks/{self.task.pk}/comments/{self.comment.pk}/', data={'content': 'Edit'})
+
+
+class ConditionalGetTests(KanmindTestData, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+
+    def get_etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_board_is_not_modified(self):
+        url = f'/api/boards/{self.board.pk}/'
+        etag = self.get_etag(url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_task_comment_and_member_changes_change_the_board_etag(self):
+        url = f'/api/boards/{self.board.pk}/'
+        etags = [self.get_etag(url)]
+        self.task.status = 'done'
+        self.task.save()
+        etags.append(self.get_etag(url))
+        Comment.objects.create(task=self.task, author=self.owner, content='New')
+        etags.append(self.get_etag(url))
+        self.board.members.add(self.outsider)
+        etags.append(self.get_etag(url))
+
+        self.assertEqual(len(set(etags)), 4)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[0]).status_code, 200)
+
+    def test_saving_a_stale_board_keeps_its_version_increasing(self):
+        url = f'/api/boards/{self.board.pk}/'
+        board = Board.objects.get(pk=self.board.pk)
+        Task.objects.create(board=self.board, owner=self.owner, title='New')
+        etag = self.get_etag(url)
+        version = Board.objects.values_list('version', flat=True).get(pk=board.pk)
+
+        board.title = 'Renamed'
+        board.save()
+
+        self.assertEqual(board.version, version + 1)
+        self.assertEqual(Board.objects.values_list('version', flat=True).get(pk=board.pk), version + 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_lists_answer_not_modified_until_a_row_changes(self):
+        for url in ['/api/boards/', '/api/tasks/assigned-to-me/', f'/api/tasks/{self.task.pk}/comments/']:
+            etag = self.get_etag(url)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            Task.objects.create(board=self.board, owner=self.owner, title='New', assignee=self.member)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etags_read_no_more_rows_than_served(self):
+        for url, fingerprint in [('/api/tasks/?page_size=2', 'LIMIT 3'), ('/api/tasks/', 'COUNT(')]:
+            etag = self.get_etag(url)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(response.status_code, 304)
+            self.assertIn(fingerprint, ctx.captured_queries[-1]['sql'])
+            self.tasks[0].title = f'Renamed for {url}'
+            self.tasks[0].save()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_board_detail_is_rendered_once_per_version(self):
+        url = f'/api/boards/{self.board.pk}/'
+        fresh = self.client.get(url)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(url)
+
+        self.assertEqual(cached.content, fresh.content)
+        self.assertEqual(cached['ETag'], fresh['ETag'])
+        self.owner.username = 'renamed'
+        self.owner.save()
+        self.assertNotEqual(self.client.get(url).content, fresh.content)
+
+    def test_board_edited_through_a_stale_instance_is_rendered_again(self):
+        url = f'/api/boards/{self.board.pk}/'
+        board = Board.objects.get(pk=self.board.pk)
+        Task.objects.create(board=self.board, owner=self.owner, title='New')
+        self.client.get(url)
+
+        board.title = 'Renamed'
+        board.save()
+
+        self.assertEqual(json.loads(self.client.get(url).content)['title'], 'Renamed')
+
+    def test_outsider_is_not_served_a_cached_board(self):
+        url = f'/api/boards/{self.board.pk}/'
+        self.client.get(url)
+        self.client.force_authenticate(self.outsider)
+
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_outsider_gets_no_etag(self):
+        self.client.force_authenticate(self.outsider)
+
+        response = self.client.get(f'/api/tasks/{self.task.pk}/', HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(response.status_code, 403)
+
+
+class KeysetPaginationTests(KanmindTestData, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+        today = timezone.localdate()
+        extra = [
+            Task(board=self.board, owner=self.owner, title=f'Extra {i}', assignee=self.member)
+            for i in range(4)
+        ]
+        Task.objects.bulk_create(extra)
+        due_dates = [today, today, None, today + timedelta(days=1), None, today, None, None, today - timedelta(days=1)]
+        for task, due_date in zip(Task.objects.filter(assignee=self.member).order_by('id'), due_dates):
+            Task.objects.filter(pk=task.pk).update(due_date=due_date)
+
+    def walk(self, url, page_size):
+        """
+        Follow the ``next`` links from the first page, returning the IDs of every page.
+        """
+        pages = []
+        response = self.client.get(url, {'page_size': page_size})
+        while True:
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append([row['id'] for row in response.json()['results']])
+            if response.json()['next'] is None:
+                return pages
+            response = self.client.get(response.json()['next'])
+
+    def test_cursor_walks_ties_and_nulls_without_gaps_or_repeats(self):
+        expected = [
+            task.pk for task in sorted(
+                Task.objects.filter(assignee=self.member),
+                key=lambda task: (task.due_date is None, task.due_date or timezone.localdate(), task.pk),
+            )
+        ]
+        for page_size in range(1, len(expected) + 1):
+            pages = self.walk('/api/tasks/assigned-to-me/', page_size)
+
+            self.assertEqual([task_id for page in pages for task_id in page], expected, page_size)
+            self.assertTrue(all(len(page) == page_size for page in pages[:-1]))
+
+    def test_cursor_walks_comments_with_equal_timestamps(self):
+        Comment.objects.bulk_create(Comment(task=self.task, author=self.member, content=f'More {i}') for i in range(4))
+        Comment.objects.filter(task=self.task).update(created_at=timezone.now())
+        expected = list(Comment.objects.filter(task=self.task).order_by('id').values_list('id', flat=True))
+
+        for page_size in (1, 2, 3):
+            pages = self.walk(f'/api/tasks/{self.task.pk}/comments/', page_size)
+
+            self.assertEqual([comment_id for page in pages for comment_id in page], expected, page_size)
+
+    def test_malformed_cursors_are_not_found(self):
+        def encode(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+        cursors = ['not a cursor', encode({'due_date': None}), encode([None]), encode(['not a date', 1]), encode([None, 'x'])]
+        for cursor in cursors:
+            response = self.client.get('/api/tasks/assigned-to-me/', {'cursor': cursor})
+
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+
+
+class TaskBulkTests(KanmindTestData, APITestCase):
+    url = '/api/tasks/bulk/'
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.owner)
+
+    def test_creates_and_updates_with_a_constant_number_of_queries(self):
+        for count in (2, 10):
+            items = [{'board': self.board.pk, 'title': f'Bulk {i}', 'assignee_id': self.member.pk} for i in range(count)]
+            # Every update moves its task to another column, so all of them write the same fields.
+            items += [{'id': task.pk, 'status': 'done'} for task in (self.tasks[:1] if count == 2 else self.tasks[1:])]
+            self.clear_caches()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, items, format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), len(items))
+            if count == 2:
+                expected = len(queries)
+        self.assertEqual(len(queries), expected)
+
+        self.assertEqual(response.data[0]['assignee']['id'], self.member.pk)
+        self.assertEqual(self.board.tasks.filter(status='done').count(), 5)
+        self.assertEqual(BoardStats.drift([self.board.pk]), [])
+
+    def test_nothing_is_written_when_an_item_fails(self):
+        foreign = Board.objects.create(title='Foreign', owner=self.outsider)
+        items = [
+            {'board': self.board.pk, 'title': 'Fine'},
+            {'board': foreign.pk, 'title': 'Foreign'},
+            {'id': self.task.pk, 'reviewer_id': 0},
+            {'board': self.board.pk},
+        ]
+
+        response = self.client.post(self.url, items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('board', errors[1])
+        self.assertIn('reviewer_id', errors[2])
+        self.assertIn('title', errors[3])
+        self.assertFalse(Task.objects.filter(title='Fine').exists())
+
+    def test_only_the_fields_sent_are_written(self):
+        check_items = TaskBulkView.check_items
+
+        def check_then_write_concurrently(view, *args):
+            check_items(view, *args)
+            Task.objects.filter(pk=self.task.pk).update(title='Concurrent', priority='high')
+
+        items = [{'id': self.task.pk, 'status': 'done'}, {'id': self.tasks[1].pk, 'title': 'Renamed'}]
+        with mock.patch.object(TaskBulkView, 'check_items', autospec=True, side_effect=check_then_write_concurrently):
+            response = self.client.post(self.url, items, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertEqual((task.title, task.priority, task.status), ('Concurrent', 'high', 'done'))
+        self.assertEqual(Task.objects.get(pk=self.tasks[1].pk).title, 'Renamed')
+
+    def test_only_the_task_owner_can_update(self):
+        self.client.force_authenticate(self.member)
+
+        response = self.client.post(self.url, [{'id': self.task.pk, 'title': 'Taken'}], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('id', response.data['errors'][0])
+
+
+class TaskPositionTests(KanmindTestData, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+
+    def column(self, status='to-do'):
+        return list(self.board.tasks.filter(status=status).order_by('position').values_list('id', flat=True))
+
+    def move(self, task, **data):
+        return self.client.post(f'/api/tasks/{task.pk}/move/', data, format='json')
+
+    def test_new_tasks_are_appended_to_their_column(self):
+        self.assertEqual(self.column(), [task.pk for task in self.tasks])
+
+    def test_move_between_neighbours_writes_only_the_moved_task(self):
+        first, second, third, fourth, fifth = self.tasks
+        positions = dict(Task.objects.values_list('id', 'position'))
+
+        response = self.move(fifth, before=first.pk, after=second.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.column(), [first.pk, fifth.pk, second.pk, third.pk, fourth.pk])
+        changed = {pk for pk, position in Task.objects.values_list('id', 'position') if positions[pk] != position}
+        self.assertEqual(changed, {fifth.pk})
+
+    def test_move_to_another_column(self):
+        self.assertEqual(self.move(self.tasks[2], status='done').status_code, 200)
+        self.assertEqual(self.move(self.tasks[3], status='done', after=self.tasks[2].pk).status_code, 200)
+        self.assertEqual(self.move(self.tasks[0], status='done', before=self.tasks[3].pk).status_code, 200)
+
+        self.assertEqual(self.column('done'), [self.tasks[3].pk, self.tasks[0].pk, self.tasks[2].pk])
+        self.assertEqual(self.board.get_stats().tasks_done_count, 3)
+
+    def test_neighbour_must_be_in_the_target_column(self):
+        response = self.move(self.tasks[0], status='done', before=self.tasks[1].pk)
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_reversed_or_repeated_neighbours_are_rejected_before_any_write(self):
+        Task.objects.filter(pk__in=[self.tasks[0].pk, self.tasks[1].pk]).update(position='i')
+        positions = list(Task.objects.order_by('id').values_list('position', flat=True))
+
+        for before, after in [(self.tasks[3], self.tasks[1]), (self.tasks[1], self.tasks[0]), (self.tasks[2], self.tasks[2])]:
+            response = self.move(self.tasks[4], before=before.pk, after=after.pk)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(list(Task.objects.order_by('id').values_list('position', flat=True)), positions)
+
+    def test_neighbours_sharing_a_position_get_the_column_rebalanced(self):
+        Task.objects.filter(pk__in=[self.tasks[0].pk, self.tasks[1].pk]).update(position='i')
+
+        response = self.move(self.tasks[4], before=self.tasks[0].pk, after=self.tasks[1].pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.column(), [self.tasks[0].pk, self.tasks[4].pk, self.tasks[1].pk, self.tasks[2].pk, self.tasks[3].pk])
+
+    def test_rebalance_command_shortens_long_positions(self):
+        for task, position in zip(self.tasks, ['0001', '0002', '0003zzzzzzzz1', '0003zzzzzzzz2', '9']):
+            Task.objects.filter(pk=task.pk).update(position=position)
+
+        call_command('rebalance_task_positions', stdout=StringIO())
+
+        self.assertEqual(self.column(), [task.pk for task in self.tasks])
+        self.assertLessEqual(max(len(position) for position in self.board.tasks.values_list('position', flat=True)), 1)
+
+
+class BoardEventTests(KanmindTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        reset_broker()
+        self.broker = get_broker()
+        self.token = Token.objects.create(user=self.member)
+
+    async def read_events(self, response, count):
+        events = []
+        async for chunk in response.streaming_content:
+            if chunk.startswith(b'id:'):
+                events.append(chunk.decode())
+            if len(events) == count:
+                break
+        response.close()
+        return events
+
+    async def test_stream_resumes_with_the_events_of_readable_boards(self):
+        first = self.broker.publish('task.updated', self.board.pk, {'board': self.board.pk, 'task': 1})
+        self.broker.publish('task.updated', self.board.pk + 1, {'board': self.board.pk + 1, 'task': 2})
+        self.broker.publish('comment.created', self.board.pk, {'board': self.board.pk, 'task': 1, 'comment': 3})
+
+        response = await self.async_client.get('/api/events/', {'token': self.token.key}, headers={'Last-Event-ID': str(first.id - 1)})
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = await self.read_events(response, 2)
+        self.assertTrue(events[0].startswith(f'id: {first.id}\nevent: task.updated\n'))
+        self.assertIn('event: comment.created', events[1])
+        self.assertFalse(self.broker.subscriptions)
+
+    async def test_stream_requires_a_token(self):
+        response = await self.async_client.get('/api/events/', {'token': 'invalid'})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_is_refused_under_wsgi(self):
+        response = self.client.get('/api/events/', {'token': self.token.key})
+
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(self.broker.subscriptions)
+
+    async def test_lost_events_reset_the_client(self):
+        broker = LocalBroker(buffer_size=2)
+        for task_id in range(3):
+            broker.publish('task.updated', self.board.pk, {'board': self.board.pk, 'task': task_id})
+
+        subscription = broker.subscribe(last_event_id=0)
+
+        self.assertEqual((await subscription.get(timeout=1)).type, 'reset')
+        subscription.close()
+
+    async def test_event_ids_of_another_process_reset_the_client(self):
+        other = LocalBroker()
+        foreign = other.publish('task.updated', self.board.pk, {'board': self.board.pk, 'task': 1})
+        own = self.broker.publish('task.updated', self.board.pk, {'board': self.board.pk, 'task': 2})
+
+        subscription = self.broker.subscribe(last_event_id=foreign.id)
+        self.assertEqual((await subscription.get(timeout=1)).type, 'reset')
+        subscription.close()
+        subscription = self.broker.subscribe(last_event_id=own.id - 1)
+        self.assertEqual((await subscription.get(timeout=1)).id, own.id)
+        subscription.close()
+
+    def test_brokers_implement_every_method(self):
+        for base in (Broker, Subscription):
+            with self.assertRaises(TypeError):
+                base()
+
+    def test_changes_are_published_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.status = 'done'
+            self.task.save()
+            Comment.objects.create(task=self.task, author=self.member, content='New')
+            self.board.members.remove(self.member)
+
+        events = [(event.type, event.board_id, event.data, event.user_ids) for event in self.broker.buffer]
+        self.assertEqual(events[0], ('task.updated', self.board.pk, {'board': self.board.pk, 'task': self.task.pk}, frozenset()))
+        self.assertEqual(events[1][:2], ('comment.created', self.board.pk))
+        self.assertEqual(events[2], ('board.members', self.board.pk, {'board': self.board.pk}, frozenset([self.member.pk])))
+
+    def test_rolled_back_changes_are_not_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.task.delete()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertFalse(self.broker.buffer)
+
+
+class AsyncReadTests(KanmindTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.member)
+        self.headers = {'Authorization': f'Token {self.token.key}'}
+
+    async def test_async_reads_match_the_drf_views(self):
+        paths = ['boards/', f'boards/{self.board.pk}/', 'tasks/assigned-to-me/', 'tasks/reviewing/', f'tasks/{self.task.pk}/comments/']
+        for path in paths:
+            expected = await sync_to_async(self.client.get)(f'/api/{path}', headers=self.headers)
+            response = await self.async_client.get(f'/api/async/{path}', headers=self.headers)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, expected.content)
+
+    def test_async_lists_are_paginated_and_not_modified(self):
+        get = async_to_sync(self.async_client.get)
+        response = get('/api/async/tasks/assigned-to-me/', {'page_size': 2}, headers=self.headers)
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertIn('/api/async/tasks/assigned-to-me/', response.json()['next'])
+
+        response = get('/api/async/boards/', headers=self.headers)
+        with self.assertNumQueries(1):
+            not_modified = get('/api/async/boards/', headers={**self.headers, 'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_async_views_implement_every_hook(self):
+        for base in (AsyncReadView, AsyncListView):
+            with self.assertRaises(TypeError):
+                base()
+
+    async def test_async_reads_check_token_and_access(self):
+        outsider_token = await Token.objects.acreate(user=self.outsider)
+        outsider = {'Authorization': f'Token {outsider_token.key}'}
+        cases = [
+            (f'boards/{self.board.pk}/', {}, 401),
+            (f'boards/{self.board.pk}/', {'Authorization': 'Token invalid'}, 401),
+            (f'boards/{self.board.pk}/', outsider, 403),
+            (f'tasks/{self.task.pk}/comments/', outsider, 403),
+            ('boards/0/', self.headers, 404),
+            ('tasks/0/comments/', self.headers, 404),
+        ]
+        for path, headers, status in cases:
+            expected = await sync_to_async(self.client.get)(f'/api/{path}', headers=headers)
+            response = await self.async_client.get(f'/api/async/{path}', headers=headers)
+
+            self.assertEqual(response.status_code, status)
+            self.assertEqual(response.content, expected.content)
+
+
+class DeltaSyncTests(KanmindTestData, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+        self.url = f'/api/boards/{self.board.pk}/changes/'
+
+    def changes(self, since):
+        response = self.client.get(self.url, {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_sync_from_zero_returns_the_whole_board(self):
+        data = self.changes(0)
+
+        self.assertFalse(data['reset'])
+        self.assertEqual(len(data['tasks']), 5)
+        self.assertEqual(len(data['comments']), 5)
+        self.assertEqual(len(data['members']), 2)
+        self.assertEqual(self.changes(data['seq']), {**data, 'members': None, 'tasks': [], 'comments': []})
+
+    def test_deleting_users_leaves_no_tombstones_on_their_deleted_boards(self):
+        kept = Board.objects.create(title='Kept', owner=self.member)
+        kept_task = Task.objects.create(board=kept, owner=self.owner, title='Owned elsewhere')
+        Comment.objects.create(task=kept_task, author=self.member, content='Kept')
+        outsider_board = Board.objects.create(title='Outsider', owner=self.outsider)
+        Comment.objects.create(task=Task.objects.create(board=outsider_board, owner=self.outsider, title='Gone'), author=self.owner, content='Gone')
+        deleted_boards = [self.board.pk, outsider_board.pk]
+
+        with transaction.atomic():
+            self.owner.delete()
+            User.objects.filter(pk=self.outsider.pk).delete()
+
+        self.assertFalse(Tombstone.objects.filter(board_id__in=deleted_boards).exists())
+        self.assertFalse(BoardStats.objects.filter(board_id__in=deleted_boards).exists())
+        self.assertEqual(list(Tombstone.objects.values_list('board_id', 'model', 'object_id')), [(kept.pk, 'task', kept_task.pk)])
+
+    def test_only_changed_rows_and_deletions_are_returned(self):
+        seq = self.changes(0)['seq']
+        self.tasks[1].title = 'Renamed'
+        self.tasks[1].save()
+        comment = Comment.objects.create(task=self.tasks[2], author=self.owner, content='New')
+        deleted = {'tasks': [self.tasks[3].pk], 'comments': [self.comment.pk]}
+        self.tasks[3].delete()
+        self.comment.delete()
+
+        data = self.changes(seq)
+
+        self.assertEqual([task['id'] for task in data['tasks']], [self.tasks[1].pk])
+        self.assertEqual([row['id'] for row in data['comments']], [comment.pk])
+        self.assertEqual(data['deleted'], deleted)
+        self.assertIsNone(data['members'])
+
+        self.board.members.add(self.outsider)
+        self.assertEqual(len(self.changes(data['seq'])['members']), 3)
+
+    def test_seqs_keep_increasing_across_board_saves(self):
+        board = Board.objects.get(pk=self.board.pk)
+        seqs = []
+        for title in ['A', 'B', 'C']:
+            seqs.append(Task.objects.create(board=self.board, owner=self.owner, title=title).seq)
+            board.save()
+
+        self.assertEqual(seqs, sorted(set(seqs)))
+        self.assertEqual([task['title'] for task in self.changes(seqs[1])['tasks']], ['C'])
+
+    def test_comments_of_a_moved_task_are_synced_with_the_new_board(self):
+        other = Board.objects.create(title='Other', owner=self.member)
+        self.url = f'/api/boards/{other.pk}/changes/'
+        Board.objects.filter(pk=other.pk).update(version=100)
+        seq = self.changes(0)['seq']
+
+        self.task.board = other
+        self.task.save()
+        self.client.force_authenticate(self.owner)
+        other.members.add(self.owner)
+        self.assertEqual(self.client.post('/api/tasks/bulk/', [{'id': self.tasks[1].pk, 'board': other.pk}], format='json').status_code, 200)
+
+        data = self.changes(seq)
+        self.assertEqual([task['id'] for task in data['tasks']], [self.task.pk, self.tasks[1].pk])
+        self.assertEqual(sorted(row['id'] for row in data['comments']), [self.comment.pk, self.tasks[1].comments.get().pk])
+
+    def test_compacted_tombstones_reset_older_clients(self):
+        seq = self.changes(0)['seq']
+        self.tasks[0].delete()
+        Tombstone.objects.update(created_at=timezone.now() - timedelta(days=60))
+
+        call_command('compact_tombstones', days=30, stdout=StringIO())
+
+        data = self.changes(seq)
+        self.assertTrue(data['reset'])
+        self.assertEqual(len(data['tasks']), 4)
+        self.assertEqual(data['deleted'], {'tasks': [], 'comments': []})
+        self.assertFalse(self.changes(data['seq'])['reset'])
+
+    def test_since_is_required(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+
+@override_settings(KANMIND_READ_REPLICA_ALIAS='replica')
+class ReplicaRouterTests(KanmindTestData, APITestCase):
+    def test_router_reads_from_the_alias_selected_for_the_request(self):
+        router = ReplicaRouter()
+        token = set_read_alias('replica')
+        try:
+            self.assertEqual(router.db_for_read(Task), 'replica')
+            self.assertIsNone(router.db_for_write(Task))
+        finally:
+            reset_read_alias(token)
+        self.assertIsNone(router.db_for_read(Task))
+
+    def test_writers_read_from_the_primary_for_a_while(self):
+        self.assertEqual(replica_alias_for(self.owner), 'replica')
+        self.client.force_authenticate(self.owner)
+
+        response = self.client.patch(f'/api/tasks/{self.task.pk}/', {'title': 'Renamed'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(replica_alias_for(self.owner))
+        self.assertEqual(replica_alias_for(self.member), 'replica')
+        with override_settings(KANMIND_READ_REPLICA_ALIAS=None):
+            self.assertIsNone(replica_alias_for(self.member))
+
+
+@skipUnless('replica' in settings.DATABASES, 'Set KANMIND_SQLITE_REPLICA_PATH to test with a replica')
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Two databases standing in for primary and replica, the replica never receiving the writes.
+    """
+    # The test runner checks the databases of skipped classes as well.
+    databases = {'default', 'replica'} & set(settings.DATABASES)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'secret-pw')
+        Board.objects.create(title='Board', owner=self.user).members.add(self.user)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {Token.objects.create(user=self.user).key}'
+
+    def test_reads_go_to_the_replica_unless_the_user_just_wrote(self):
+        self.assertEqual(self.client.get('/api/boards/').json(), [])
+        self.assertEqual(self.client.get('/api/async/boards/').json(), [])
+
+        self.assertEqual(self.client.post('/api/boards/', {'title': 'New'}).status_code, 201)
+
+        self.assertEqual(len(self.client.get('/api/boards/').json()), 2)
+        self.assertEqual(len(self.client.get('/api/async/boards/').json()), 2)
+        caches['default'].clear()
+        self.assertEqual(self.client.get('/api/boards/').json(), [])
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def test_seeded_data_is_consistent_and_every_route_is_benchmarked(self):
+        call_command('seed_kanmind', users=6, boards=2, members=3, tasks=8, comments=1, stdout=StringIO())
+        board_ids = list(Board.objects.values_list('id', flat=True))
+        self.assertEqual(BoardStats.drift(board_ids), [])
+        self.assertEqual(Task.objects.filter(seq=0).count(), 0)
+
+        output = StringIO()
+        call_command('bench_endpoints', iterations=1, warmup=0, stdout=output)
+
+        report = json.loads(output.getvalue())
+        self.assertEqual(report['dataset']['boards'], 2)
+        failed = [(result['name'], result['method'], result['statuses']) for result in report['results'] if not all(int(code) < 400 for code in result['statuses'])]
+        self.assertEqual(failed, [])
+        self.assertEqual(Board.objects.count(), 2)
+
+
+class ConcurrentWriteTests(TransactionTestCase):
+    """
+    Writers and readers of one board in several threads, like the workers of a threaded server.
+    """
+    threads = 8
+    writes = 10
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'secret-pw')
+        self.board = Board.objects.create(title='Board', owner=self.owner)
+        self.board.members.add(self.owner)
+
+    def run_threads(self, work):
+        errors = []
+
+        def run(number):
+            try:
+                work(number)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(number,)) for number in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_concurrent_writes_neither_fail_nor_lose_updates(self):
+        def work(number):
+            for i in range(self.writes):
+                task = Task.objects.create(board=self.board, owner=self.owner, title=f'Task {number}-{i}')
+                Comment.objects.create(task=task, author=self.owner, content='Comment')
+                list(Board.objects.for_user(self.owner).select_related('stats'))
+
+        self.assertEqual(self.run_threads(work), [])
+
+        count = self.threads * self.writes
+        self.assertEqual(BoardStats.objects.get(board=self.board).ticket_count, count)
+        self.assertEqual(Task.objects.values('seq').distinct().count(), count)
+        self.assertEqual(Comment.objects.count(), count)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite pragmas')
+    def test_sqlite_connections_use_wal(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax')
+class QueryPlanTests(KanmindTestData, APITestCase):
+    """
+    Every SELECT run by an endpoint must be answered through an index, never a full scan.
+    GET /api/tasks/ is not covered, it lists every task by design.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+
+    def assertNoFullScan(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        for query in ctx.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plan = [row[3] for row in cursor.fetchall()]
+            scans = [step for step in plan if step.startswith('SCAN ')]
+            self.assertEqual(scans, [], f'{url}\n{query["sql"]}\n' + '\n'.join(plan))
+        return response
+
+    def test_board_endpoints(self):
+        self.assertNoFullScan('/api/boards/')
+        self.assertNoFullScan(f'/api/boards/{self.board.pk}/')
+        self.assertNoFullScan(f'/api/boards/{self.board.pk}/changes/?since=1')
+
+    def test_task_endpoints(self):
+        self.assertNoFullScan(f'/api/tasks/{self.task.pk}/')
+        self.assertNoFullScan('/api/tasks/reviewing/')
+        page = self.assertNoFullScan('/api/tasks/assigned-to-me/?page_size=2')
+        self.assertNoFullScan(page.data['next'])
+
+    def test_comment_endpoints(self):
+        self.assertNoFullScan(f'/api/tasks/{self.task.pk}/comments/?page_size=1')
+        self.assertNoFullScan(f'/api/tasks/{self.task.pk}/comments/{self.comment.pk}/')
+
+    def test_email_check(self):
+        self.assertNoFullScan('/api/email-check/?email=OWNER@example.com')
+
+
+class GunicornConfigTests(TestCase):
+    def load_config(self):
+        with mock.patch.dict(os.environ, {'KANMIND_WORKER_CLASS': 'uvicorn'}):
+            return runpy.run_path(str(settings.BASE_DIR / 'core' / 'gunicorn.conf.py'))
+
+    def test_tokens_are_redacted_from_the_access_log(self):
+        redact_tokens = self.load_config()['RedactTokenFilter']()
+        key = 'a' * 40
+        uvicorn_record = logging.LogRecord('uvicorn.access', logging.INFO, '', 0, '%s - "%s %s HTTP/%s" %d', ('127.0.0.1:5000', 'GET', f'/api/events/?last_event_id=4&token={key}', '1.1', 200), None)
+        gunicorn_record = logging.LogRecord('gunicorn.access', logging.INFO, '', 0, '"%(r)s" %(q)s', ({'r': f'GET /api/events/?token={key} HTTP/1.1', 'q': f'token={key}'},), None)
+
+        for record in (uvicorn_record, gunicorn_record):
+            self.assertTrue(redact_tokens.filter(record))
+            self.assertNotIn(key, record.getMessage())
+        self.assertIn('/api/events/?last_event_id=4&token=[redacted] HTTP/1.1', uvicorn_record.getMessage())
+
+    def test_first_request_of_asgi_workers_is_logged_once(self):
+        config = self.load_config()
+        requests = []
+
+        async def application(scope, receive, send):
+            requests.append(scope['type'])
+
+        worker = mock.Mock(pid=7, wsgi=application, forked_at=config['STARTED'], first_request_at=None)
+        config['post_worker_init'](worker)
+        for scope_type in ('lifespan', 'http', 'http'):
+            async_to_sync(worker.wsgi)({'type': scope_type}, None, None)
+
+        self.assertEqual(requests, ['lifespan', 'http', 'http'])
+        worker.log.info.assert_called_once()
+        self.assertIn('Worker %s got its first request', worker.log.info.call_args.args[0])
+
+
+class WarmUpTests(TestCase):
+    def test_warm_up_times_every_step(self):
+        timings = warm_up()
+
+        self.assertEqual(list(timings), ['urls', 'models', 'serializers', 'database'])
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+
+
+class QueryTimingTests(KanmindTestData, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+
+    def timing(self, response):
+        return dict(metric.split(';', 1) for metric in response['Server-Timing'].split(', '))
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('kanmind_app.timing', 'INFO') as logs:
+            response = self.client.get(f'/api/boards/{self.board.pk}/')
+
+        self.assertEqual(list(self.timing(response)), ['total', 'db', 'view', 'render'])
+        self.assertIn('desc="5 queries"', self.timing(response)['db'])
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual((line['url_name'], line['status'], line['queries']), ('board-detail', 200, 5))
+
+    def test_async_view_queries_are_counted(self):
+        token = Token.objects.create(user=self.member)
+        response = async_to_sync(self.async_client.get)('/api/async/boards/', headers={'Authorization': f'Token {token.key}'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('desc="0 queries"', self.timing(response)['db'])
+
+    @override_settings(KANMIND_TIMING_DUPLICATE_QUERIES=5)
+    def test_repeated_queries_are_flagged(self):
+        def view(request):
+            for task in self.tasks:
+                list(Comment.objects.filter(task_id=task.pk))
+            list(Task.objects.filter(pk__in=[1, 2]))
+            list(Task.objects.filter(pk__in=[1, 2, 3]))
+            return HttpResponse()
+
+        with self.assertLogs('kanmind_app.timing', 'INFO') as logs:
+            QueryTimingMiddleware(view)(RequestFactory().get('/'))
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertEqual([duplicate['count'] for duplicate in line['duplicate_queries']], [5])
+        self.assertIn('kanmind_app_comment', line['duplicate_queries'][0]['sql'])
+
+
+class ProfilingTests(KanmindTestData, APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(KANMIND_PROFILE_DIR=self.directory, KANMIND_PROFILE_RATES={})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get_profiled(self, user, path, **headers):
+        token, _ = Token.objects.get_or_create(user=user)
+        return self.client.get(path, headers={'Authorization': f'Token {token.key}', **headers})
+
+    def test_staff_header_profiles_a_request(self):
+        User.objects.filter(pk=self.member.pk).update(is_staff=True)
+        with self.assertLogs('kanmind_app.profiling', 'INFO'):
+            response = self.get_profiled(self.member, f'/api/boards/{self.board.pk}/', **{'X-Kanmind-Profile': '1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['X-Kanmind-Profile'].startswith('board-detail.'))
+        self.assertTrue((self.directory / response['X-Kanmind-Profile']).exists())
+
+    def test_header_of_other_users_is_ignored(self):
+        response = self.get_profiled(self.member, f'/api/boards/{self.board.pk}/', **{'X-Kanmind-Profile': '1'})
+
+        self.assertNotIn('X-Kanmind-Profile', response)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_sampling_by_url_name_and_summary(self):
+        with override_settings(KANMIND_PROFILE_RATES={'tasklist-comments': 1}), self.assertLogs('kanmind_app.profiling', 'INFO'):
+            self.get_profiled(self.member, f'/api/tasks/{self.task.pk}/comments/')
+            self.get_profiled(self.member, f'/api/tasks/{self.task.pk}/comments/')
+            self.get_profiled(self.member, '/api/boards/')
+        output = StringIO()
+        call_command('profile_summary', limit=5, stdout=output)
+
+        self.assertEqual(len(list(self.directory.glob('tasklist-comments.*.prof'))), 2)
+        self.assertIn('tasklist-comments: 2 requests', output.getvalue())
+        self.assertNotIn('board-list-create', output.getvalue())
+
+    def test_prune_keeps_the_newest_profiles(self):
+        for i in range(4):
+            path = self.directory / f'board-detail.{i}.1.prof'
+            path.write_bytes(b'x' * 100)
+            os.utime(path, (i, i))
+        prune_profiles(self.directory, 250)
+
+        self.assertEqual(sorted(path.name for path in self.directory.iterdir()), ['board-detail.2.1.prof', 'board-detail.3.1.prof'])
+
+
+class TaskValuesSerializationTests(KanmindTestData, APITestCase):
+    def setUp(self):
+        super().setUp()
+        Task.objects.filter(pk=self.tasks[1].pk).update(description=None, due_date=timezone.localdate())
+        Task.objects.filter(pk=self.tasks[2].pk).update(assignee=None, description='Ünïcode "quoted" & <escaped>')
+        for days in [None, 3, 1]:
+            due_date = timezone.localdate() + timedelta(days=days) if days else None
+            Task.objects.create(board=self.board, owner=self.member, title='Reviewed', reviewer=self.member, status='review', due_date=due_date)
+        self.client.force_authenticate(self.member)
+
+    def test_fast_path_matches_the_serializer_byte_for_byte(self):
+        queryset = Task.objects.filter(board=self.board).with_details().order_by('id')
+        expected = JSONRenderer().render(TaskDetailSerializer(queryset, many=True).data)
+        fast = JSONRenderer().render(TaskDetailValuesSerializer(queryset.values(*TaskDetailValuesSerializer.values), many=True).data)
+
+        self.assertEqual(fast, expected)
+
+    def test_endpoints_render_the_serializer_output(self):
+        for path, lookup in [('assigned-to-me', {'assignee': self.member}), ('reviewing', {'reviewer': self.member})]:
+            for params in [{}, {'page_size': 2}]:
+                response = self.client.get(f'/api/tasks/{path}/', params)
+                results = response.json()['results'] if params else response.json()
+                tasks = Task.objects.filter(**lookup).with_details().in_bulk()
+                ids = [task['id'] for task in results]
+
+                self.assertEqual(len(ids), 2 if params else len(tasks))
+                self.assertEqual(results, TaskDetailSerializer([tasks[pk] for pk in ids], many=True).data)
+
+    def test_benchmark_compares_both_paths(self):
+        output = StringIO()
+        call_command('bench_task_serialization', rows=10, iterations=1, stdout=output)
+
+        self.assertIn('8 tasks', output.getvalue())
+        self.assertIn('faster', output.getvalue())
+
+
+class BoardExportTests(KanmindTestData, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+        self.url = f'/api/boards/{self.board.pk}/export/'
+
+    @override_settings(KANMIND_EXPORT_BATCH_SIZE=2)
+    def test_ndjson_is_streamed_in_batches(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        # Members, then 3 batches of tasks and 3 of comments, the last ones short.
+        with self.assertNumQueries(7):
+            records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        self.assertEqual(records[0], {'type': 'board', 'id': self.board.pk, 'title': 'Board', 'owner': 'owner@example.com', 'members': ['owner@example.com', 'member@example.com']})
+        self.assertEqual([record['id'] for record in records if record['type'] == 'task'], [task.pk for task in self.tasks])
+        self.assertEqual(records[1]['assignee'], 'member@example.com')
+        comments = [record for record in records if record['type'] == 'comment']
+        self.assertEqual(len(comments), 5)
+        self.assertEqual((comments[0]['task'], comments[0]['author']), (self.task.pk, 'member@example.com'))
+
+    def test_csv(self):
+        Task.objects.filter(pk=self.task.pk).update(reviewer=None, due_date=timezone.localdate())
+        response = self.client.get(self.url, {'fmt': 'csv'})
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="board-{self.board.pk}.csv"')
+        self.assertEqual(list(rows[0]), CSV_COLUMNS)
+        self.assertEqual(rows[0]['members'], 'owner@example.com member@example.com')
+        self.assertEqual((rows[1]['reviewer'], rows[1]['due_date']), ('', timezone.localdate().isoformat()))
+        self.assertEqual([row['type'] for row in rows].count('comment'), 5)
+
+    @override_settings(KANMIND_EXPORT_BATCH_SIZE=100)
+    def test_asgi_stream_holds_one_batch_at_a_time(self):
+        Task.objects.bulk_create(
+            Task(board=self.board, owner=self.owner, title=f'Bulk {i}', description='x' * 200, position=f'z{i}')
+            for i in range(8000)
+        )
+        token = Token.objects.create(user=self.member)
+
+        async def export():
+            response = await self.async_client.get(self.url, headers={'Authorization': f'Token {token.key}'})
+            self.assertTrue(response.is_async)
+            size = 0
+            tracemalloc.start()
+            try:
+                # Iterated like the ASGI handler sends it.
+                async for chunk in response:
+                    size += len(chunk)
+                return size, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        size, peak = async_to_sync(export)()
+        self.assertGreater(size, 2_000_000)
+        self.assertLess(peak, size / 4)
+
+    def test_format_and_access_are_checked(self):
+        self.assertEqual(self.client.get(self.url, {'fmt': 'xml'}).status_code, 400)
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class BoardImportTests(KanmindTestData, APITestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_authenticate(self.owner)
+
+    def export(self, fmt='ndjson'):
+        response = self.client.get(f'/api/boards/{self.board.pk}/export/', {'fmt': fmt})
+        return b''.join(response.streaming_content)
+
+    def upload(self, content, fmt='ndjson'):
+        return self.client.post('/api/imports/', {'file': SimpleUploadedFile(f'board.{fmt}', content), 'format': fmt}, format='multipart')
+
+    def test_export_round_trip(self):
+        for fmt in ['ndjson', 'csv']:
+            response = self.upload(self.export(fmt), fmt)
+
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(
+                [response.data[field] for field in ('status', 'boards_created', 'tasks_created', 'comments_created', 'errors')],
+                ['done', 1, 5, 5, []],
+            )
+            board = Board.objects.latest('id')
+            self.assertEqual(board.owner, self.owner)
+            self.assertEqual(set(board.members.all()), {self.owner, self.member})
+            self.assertEqual(list(board.tasks.order_by('id').values_list('title', 'assignee', 'position')), list(self.board.tasks.order_by('id').values_list('title', 'assignee', 'position')))
+            self.assertEqual(Comment.objects.filter(task__board=board, author=self.member).count(), 5)
+            self.assertEqual(BoardStats.drift([board.pk]), [])
+            seqs = set(board.tasks.values_list('seq', flat=True)) | set(Comment.objects.filter(task__board=board).values_list('seq', flat=True))
+            self.assertEqual(seqs, {board.version - 1, board.version})
+
+    def test_row_errors(self):
+        rows = [
+            {'type': 'board', 'id': 1, 'title': 'Imported', 'members': ['member@example.com']},
+            {'type': 'task', 'id': 1, 'board': 1, 'title': 'Fine', 'assignee': 'MEMBER@example.com'},
+            {'type': 'task', 'id': 1, 'board': 1, 'title': 'Duplicate'},
+            {'type': 'task', 'id': 2, 'board': 2, 'title': 'No board'},
+            {'type': 'task', 'id': 3, 'board': 1, 'title': 'Outsider', 'reviewer': 'outsider@example.com'},
+            {'type': 'task', 'id': 4, 'board': 1, 'title': 'Bad status', 'status': 'later'},
+            {'type': 'comment', 'task': 1, 'author': 'nobody@example.com', 'content': 'Hi'},
+            {'type': 'comment', 'task': 1, 'content': 'By the importer'},
+            {'type': 'sticker'},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n'
+        response = self.upload(content.encode())
+
+        self.assertEqual((response.data['tasks_created'], response.data['comments_created'], response.data['error_count']), (1, 1, 7))
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4, 5, 6, 7, 9, 10])
+        self.assertEqual(response.data['errors'][2]['errors'], {'reviewer': ['outsider@example.com is not a member of the board.']})
+        task = Task.objects.get(title='Fine')
+        self.assertEqual((task.assignee, task.owner, task.comments.get().author), (self.member, self.owner, self.owner))
+
+    def test_rows_with_a_list_or_object_as_type_are_rejected(self):
+        rows = [{'type': ['task'], 'title': 'List'}, {'type': {'task': 1}, 'title': 'Object'}]
+        response = self.upload('\n'.join(json.dumps(row) for row in rows).encode())
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1, 2])
+        self.assertEqual(response.data['errors'][0]['errors'], {'type': ['Must be one of board, task, comment.']})
+
+    def test_resumed_import_rejects_rows_of_deleted_boards_and_tasks(self):
+        rows = [
+            {'type': 'board', 'id': 1, 'title': 'Kept'},
+            {'type': 'board', 'id': 2, 'title': 'Deleted'},
+            {'type': 'task', 'id': 1, 'board': 1, 'title': 'Deleted'},
+            {'type': 'task', 'id': 2, 'board': 2, 'title': 'Orphan'},
+            {'type': 'comment', 'task': 1, 'content': 'Orphan'},
+        ]
+        job = ImportJob.objects.create(user=self.owner, format='ndjson', file=SimpleUploadedFile('board.ndjson', '\n'.join(json.dumps(row) for row in rows).encode()))
+
+        def interrupt(job):
+            raise RuntimeError('Worker killed')
+
+        with self.assertRaises(RuntimeError):
+            BoardImport(job, batch_size=3).run(progress=interrupt)
+        Task.objects.get(title='Deleted').delete()
+        Board.objects.get(title='Deleted').delete()
+        response = self.client.post(f'/api/imports/{job.pk}/resume/')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.data['status'], response.data['tasks_created'], response.data['comments_created']), ('done', 1, 0))
+        self.assertEqual(response.data['errors'], [
+            {'row': 4, 'errors': {'board': ['The board no longer exists.']}},
+            {'row': 5, 'errors': {'task': ['The task no longer exists.']}},
+        ])
+
+    def test_failed_import_answers_with_the_failed_job(self):
+        with mock.patch.object(BoardImport, 'create_tasks', side_effect=IntegrityError('NOT NULL constraint failed')):
+            response = self.upload(self.export())
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.data['status'], response.data['detail']), ('failed', 'The import failed: NOT NULL constraint failed'))
+        self.assertEqual(ImportJob.objects.get(pk=response.data['id']).status, 'failed')
+
+    def test_users_are_looked_up_once_per_batch(self):
+        def queries(tasks):
+            rows = [{'type': 'board', 'id': 1, 'title': 'Imported', 'members': ['member@example.com']}]
+            rows += [{'type': 'task', 'id': i, 'board': 1, 'title': f'Task {i}', 'assignee': 'member@example.com'} for i in range(tasks)]
+            job = ImportJob.objects.create(user=self.owner, format='ndjson', file=SimpleUploadedFile('tasks.ndjson', '\n'.join(json.dumps(row) for row in rows).encode()))
+            with CaptureQueriesContext(connection) as captured:
+                BoardImport(job, batch_size=1000).run()
+            self.assertEqual(job.tasks_created, tasks)
+            return [query['sql'] for query in captured if 'LOWER("auth_user"."email")' in query['sql']]
+
+        self.assertEqual(len(queries(3)), 1)
+        self.assertEqual(len(queries(300)), 1)
+
+    def test_interrupted_import_resumes(self):
+        content = self.export()
+        job = ImportJob.objects.create(user=self.owner, format='ndjson', file=SimpleUploadedFile('board.ndjson', content))
+
+        def interrupt(job):
+            raise RuntimeError('Worker killed')
+
+        with self.assertRaises(RuntimeError):
+            BoardImport(job, batch_size=4).run(progress=interrupt)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_done, job.tasks_created), ('failed', 4, 3))
+
+        response = self.client.post(f'/api/imports/{job.pk}/resume/')
+        self.assertEqual((response.data['status'], response.data['rows_done'], response.data['tasks_created'], response.data['comments_created']), ('done', 11, 5, 5))
+        self.assertEqual(ImportRef.objects.filter(job=job).count(), 6)
+        self.assertEqual(self.client.get(f'/api/imports/{job.pk}/').data['status'], 'done')
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(f'/api/imports/{job.pk}/').status_code, 404)
+
+    def test_import_command(self):
+        path = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'board.csv'
+        path.write_bytes(self.export('csv'))
+        output = StringIO()
+        call_command('import_kanmind', str(path), user='owner@example.com', batch_size=5, stdout=output)
+
+        self.assertIn('5 rows:', output.getvalue())
+        self.assertIn('1 boards, 5 tasks, 5 comments, 0 rows rejected', output.getvalue())